@@ -51,6 +51,10 @@ class API(wsgi.Router):
                                  "/resource_types",
                                  action="list_resource_types",
                                  conditions={'method': 'GET'})
+            stack_mapper.connect("work_queue",
+                                 "/work_queue",
+                                 action="show_work_queue",
+                                 conditions={'method': 'GET'})
 
             # Stack collection
             stack_mapper.connect("stack_index",
@@ -112,6 +116,10 @@ class API(wsgi.Router):
                                "/resources/{resource_name}/metadata",
                                action="metadata",
                                conditions={'method': 'GET'})
+            res_mapper.connect("resource_members",
+                               "/resources/{resource_name}/members",
+                               action="members",
+                               conditions={'method': 'GET'})
 
         # Events
         events_resource = events.create_resource(conf)
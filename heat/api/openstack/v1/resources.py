@@ -100,6 +100,21 @@ class ResourceController(object):
 
         return {engine_api.RES_METADATA: res[engine_api.RES_METADATA]}
 
+    @util.identified_stack
+    def members(self, req, identity, resource_name):
+        """
+        Lists the members of a group resource
+        """
+
+        try:
+            members = self.engine.list_group_members(req.context,
+                                                     identity,
+                                                     resource_name)
+        except rpc_common.RemoteError as ex:
+            return util.remote_error(ex)
+
+        return {'members': members}
+
 
 def create_resource(options):
     """
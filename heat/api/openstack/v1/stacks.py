@@ -316,6 +316,20 @@ class StackController(object):
 
         return {'resource_types': types}
 
+    @util.tenant_local
+    def show_work_queue(self, req):
+        """
+        Returns the number of stack operations running in the engine and the
+        depth of the queue of operations waiting to run.
+        """
+
+        try:
+            stats = self.engine.show_work_queue(req.context)
+        except rpc_common.RemoteError as ex:
+            raise exc.HTTPInternalServerError(str(ex))
+
+        return {'work_queue': stats}
+
 
 def create_resource(options):
     """
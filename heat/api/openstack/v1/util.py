@@ -96,6 +96,7 @@ def remote_error(ex):
         'PhysicalResourceNotFound': exc.HTTPNotFound,
         'InvalidTenant': exc.HTTPForbidden,
         'StackExists': exc.HTTPConflict,
+        'ConcurrentUpdate': exc.HTTPConflict,
     }
 
     Exc = error_map.get(ex.exc_type, exc.HTTPInternalServerError)
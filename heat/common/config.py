@@ -95,7 +95,49 @@ engine_opts = [
                help='Driver to use for controlling instances'),
     cfg.ListOpt('plugin_dirs',
                 default=['/usr/lib64/heat', '/usr/lib/heat'],
-                help='List of directories to search for Plugins')]
+                help='List of directories to search for Plugins'),
+    cfg.BoolOpt('compress_instance_userdata',
+                default=False,
+                help='Gzip the cloud-init userdata passed to new instances'),
+    cfg.IntOpt('instance_group_batch_size',
+               default=10,
+               help='Maximum number of instance group members created or '
+                    'deleted in each batch when resizing a group'),
+    cfg.IntOpt('instance_group_concurrency',
+               default=5,
+               help='Maximum number of instance group members created or '
+                    'deleted concurrently within a batch'),
+    cfg.IntOpt('attribute_cache_ttl',
+               default=600,
+               help='Seconds for which resource attribute values looked up '
+                    'from other services are cached in the database'),
+    cfg.IntOpt('resource_poll_interval',
+               default=1,
+               help='Seconds between polls of resources which are waiting '
+                    'for an operation to complete'),
+    cfg.IntOpt('max_concurrent_stack_operations',
+               default=50,
+               help='Maximum number of stack operations run concurrently by '
+                    'the engine, or 0 for no limit. Further operations are '
+                    'queued, with deletes and alarm actions ahead of others '
+                    'and each tenant served in turn'),
+    cfg.BoolOpt('resume_stack_operations',
+                default=False,
+                help='Resume stack operations left in progress when the '
+                     'engine starts. Only enable this when a single engine '
+                     'serves the database, since each engine resumes every '
+                     'stack found in progress')]
+
+urlfetch_opts = [
+    cfg.IntOpt('max_template_size',
+               default=524288,
+               help='Maximum size in bytes of a template fetched from a URL'),
+    cfg.IntOpt('template_fetch_timeout',
+               default=30,
+               help='Timeout in seconds for fetching a template from a URL'),
+    cfg.IntOpt('template_cache_size',
+               default=100,
+               help='Number of templates fetched from URLs to keep cached')]
 
 rpc_opts = [
     cfg.StrOpt('host',
@@ -111,6 +153,7 @@ rpc_opts = [
 def register_api_opts():
     cfg.CONF.register_opts(bind_opts)
     cfg.CONF.register_opts(rpc_opts)
+    cfg.CONF.register_opts(urlfetch_opts)
     rpc.set_defaults(control_exchange='heat')
 
 
@@ -119,6 +162,7 @@ def register_engine_opts():
     cfg.CONF.register_opts(db_opts)
     cfg.CONF.register_opts(service_opts)
     cfg.CONF.register_opts(rpc_opts)
+    cfg.CONF.register_opts(urlfetch_opts)
     rpc.set_defaults(control_exchange='heat')
 
 
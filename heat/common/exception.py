@@ -226,6 +226,10 @@ class ResourceNotAvailable(OpenstackException):
     message = _("The Resource (%(resource_name)s) is not available.")
 
 
+class ConcurrentUpdate(OpenstackException):
+    message = _("%(name)s was updated concurrently by another request.")
+
+
 class PhysicalResourceNotFound(OpenstackException):
     message = _("The Resource (%(resource_id)s) could not be found.")
 
@@ -13,6 +13,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import copy
+import hashlib
 import re
 import yaml
 import json
@@ -28,26 +30,61 @@ def _construct_yaml_str(self, node):
 yaml.Loader.add_constructor(u'tag:yaml.org,2002:str', _construct_yaml_str)
 yaml.SafeLoader.add_constructor(u'tag:yaml.org,2002:str', _construct_yaml_str)
 
+# Use the libyaml based loader where PyYAML was built with it
+if hasattr(yaml, 'CLoader'):
+    _yaml_loader = yaml.CLoader
+    _yaml_loader.add_constructor(u'tag:yaml.org,2002:str',
+                                 _construct_yaml_str)
+else:
+    _yaml_loader = yaml.Loader
+
+# Maximum number of parsed templates to cache
+_PARSE_CACHE_SIZE = 50
+
+_parse_cache = {}
+_parse_cache_order = []
+
+
+def _parse_yaml(tmpl_str):
+    try:
+        tpl = yaml.load(tmpl_str, Loader=_yaml_loader)
+    except yaml.scanner.ScannerError as e:
+        raise ValueError(e)
+    else:
+        if tpl is None:
+            tpl = {}
+        default_for_missing(tpl, u'HeatTemplateFormatVersion',
+                            HEAT_VERSIONS)
+    return tpl
+
 
 def parse(tmpl_str):
     '''
     Takes a string and returns a dict containing the parsed structure.
     This includes determination of whether the string is using the
     JSON or YAML format.
+
+    Parsed YAML templates are cached by the hash of their contents, so the
+    dict returned is a copy which the caller is free to modify. JSON is not
+    cached, since it parses faster than the copy can be made.
     '''
     if tmpl_str.startswith('{'):
-        tpl = json.loads(tmpl_str)
+        return json.loads(tmpl_str)
+
+    if isinstance(tmpl_str, unicode):
+        key = hashlib.sha1(tmpl_str.encode('utf-8')).hexdigest()
     else:
-        try:
-            tpl = yaml.load(tmpl_str)
-        except yaml.scanner.ScannerError as e:
-            raise ValueError(e)
-        else:
-            if tpl is None:
-                tpl = {}
-            default_for_missing(tpl, u'HeatTemplateFormatVersion',
-                                HEAT_VERSIONS)
-    return tpl
+        key = hashlib.sha1(tmpl_str).hexdigest()
+
+    if key in _parse_cache:
+        _parse_cache_order.remove(key)
+    else:
+        _parse_cache[key] = _parse_yaml(tmpl_str)
+        if len(_parse_cache_order) >= _PARSE_CACHE_SIZE:
+            del _parse_cache[_parse_cache_order.pop(0)]
+    _parse_cache_order.append(key)
+
+    return copy.deepcopy(_parse_cache[key])
 
 
 def default_for_missing(tpl, version_param, versions):
@@ -17,13 +17,97 @@
 Utility for fetching a resource (e.g. a template) from a URL.
 '''
 
+import re
+import time
 import urllib2
 import urlparse
 
+from heat.openstack.common import cfg
 from heat.openstack.common import log as logging
 
 logger = logging.getLogger(__name__)
 
+_CHUNK_SIZE = 65536
+
+_MAX_AGE_RE = re.compile(r'max-age\s*=\s*(\d+)')
+
+
+class _CacheEntry(object):
+    def __init__(self, data, etag, last_modified, expires):
+        self.data = data
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires = expires
+
+    def fresh(self):
+        return time.time() < self.expires
+
+
+class _LRUCache(object):
+    '''
+    A cache of fetched data, keyed by URL, which discards the least recently
+    used entries once it holds more than template_cache_size of them.
+    '''
+    def __init__(self):
+        self._entries = {}
+        self._order = []
+
+    def get(self, url):
+        entry = self._entries.get(url)
+        if entry is not None:
+            self._order.remove(url)
+            self._order.append(url)
+        return entry
+
+    def put(self, url, entry):
+        if url in self._entries:
+            self._order.remove(url)
+        self._entries[url] = entry
+        self._order.append(url)
+
+        while len(self._order) > max(0, cfg.CONF.template_cache_size):
+            del self._entries[self._order.pop(0)]
+
+    def clear(self):
+        self._entries.clear()
+        del self._order[:]
+
+
+_cache = _LRUCache()
+
+
+def _read(response):
+    '''
+    Read the body of a response, raising an IOError if it is larger than
+    max_template_size.
+    '''
+    max_size = cfg.CONF.max_template_size
+    too_large = IOError('Template exceeds maximum allowed size (%d bytes)' %
+                        max_size)
+
+    length = response.info().getheader('Content-Length')
+    if length is not None and length.isdigit() and int(length) > max_size:
+        raise too_large
+
+    chunks = []
+    size = 0
+    while True:
+        chunk = response.read(_CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_size:
+            raise too_large
+        chunks.append(chunk)
+
+    return ''.join(chunks)
+
+
+def _max_age(headers):
+    '''Return the max-age from the Cache-Control header, or 0 if none.'''
+    match = _MAX_AGE_RE.search(headers.getheader('Cache-Control') or '')
+    return match and int(match.group(1)) or 0
+
 
 def get(url):
     '''
@@ -31,6 +115,10 @@ def get(url):
 
     The URL must use the http: or https: schemes.
     Raise an IOError if getting the data fails.
+
+    Data served with an ETag or Last-Modified header is cached, and a cached
+    copy is revalidated with a conditional request unless it is still fresh
+    according to the Cache-Control max-age.
     '''
     logger.info(_('Fetching data from %s') % url)
 
@@ -39,5 +127,34 @@ def get(url):
     if components.scheme not in ('http', 'https'):
         raise urllib2.URLError('Invalid URL scheme %s' % components.scheme)
 
-    response = urllib2.urlopen(url)
-    return response.read()
+    cached = _cache.get(url)
+    if cached is not None and cached.fresh():
+        return cached.data
+
+    request = urllib2.Request(url)
+    if cached is not None:
+        if cached.etag:
+            request.add_header('If-None-Match', cached.etag)
+        if cached.last_modified:
+            request.add_header('If-Modified-Since', cached.last_modified)
+
+    try:
+        response = urllib2.urlopen(request,
+                                   timeout=cfg.CONF.template_fetch_timeout)
+    except urllib2.HTTPError as ex:
+        if ex.code == 304 and cached is not None:
+            logger.debug('Cached data from %s not modified' % url)
+            cached.expires = time.time() + _max_age(ex.info())
+            return cached.data
+        raise
+
+    data = _read(response)
+
+    headers = response.info()
+    etag = headers.getheader('ETag')
+    last_modified = headers.getheader('Last-Modified')
+    if etag or last_modified:
+        _cache.put(url, _CacheEntry(data, etag, last_modified,
+                                    time.time() + _max_age(headers)))
+
+    return data
@@ -71,8 +71,27 @@ def resource_get_all(context):
     return IMPL.resource_get_all(context)
 
 
-def resource_create(context, values):
-    return IMPL.resource_create(context, values)
+def resource_create(context, values, event_values=None):
+    return IMPL.resource_create(context, values, event_values)
+
+
+def resource_state_set(context, resource_id, stack_id, values,
+                       event_values=None):
+    return IMPL.resource_state_set(context, resource_id, stack_id, values,
+                                   event_values)
+
+
+def resource_version_get(context, resource_id):
+    return IMPL.resource_version_get(context, resource_id)
+
+
+def resource_get_versioned(context, resource_id, attribute):
+    return IMPL.resource_get_versioned(context, resource_id, attribute)
+
+
+def resource_update_versioned(context, resource_id, version, values):
+    return IMPL.resource_update_versioned(context, resource_id, version,
+                                          values)
 
 
 def resource_get_all_by_stack(context, stack_id):
@@ -89,6 +108,22 @@ def resource_get_by_physical_resource_id(context, physical_resource_id):
                                                      physical_resource_id)
 
 
+def group_member_create(context, values):
+    return IMPL.group_member_create(context, values)
+
+
+def group_member_get_all_by_group(context, group_id):
+    return IMPL.group_member_get_all_by_group(context, group_id)
+
+
+def group_member_update(context, member_id, values):
+    return IMPL.group_member_update(context, member_id, values)
+
+
+def group_member_delete(context, member_id):
+    return IMPL.group_member_delete(context, member_id)
+
+
 def stack_get(context, stack_id, admin=False):
     return IMPL.stack_get(context, stack_id, admin)
 
@@ -105,6 +140,18 @@ def stack_get_all_by_tenant(context):
     return IMPL.stack_get_all_by_tenant(context)
 
 
+def stack_version_get(context, stack_id):
+    return IMPL.stack_version_get(context, stack_id)
+
+
+def stack_get_versioned(context, stack_id, attribute):
+    return IMPL.stack_get_versioned(context, stack_id, attribute)
+
+
+def stack_update_versioned(context, stack_id, version, values):
+    return IMPL.stack_update_versioned(context, stack_id, version, values)
+
+
 def stack_create(context, values):
     return IMPL.stack_create(context, values)
 
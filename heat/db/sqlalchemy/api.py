@@ -14,12 +14,19 @@
 #    under the License.
 
 '''Implementation of SQLAlchemy backend.'''
+import hashlib
+import json
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm.session import Session
 
+from heat.common.exception import Duplicate
 from heat.common.exception import NotFound
 from heat.db.sqlalchemy import models
 from heat.db.sqlalchemy.session import get_session
 from heat.common import crypt
+from heat.openstack.common import timeutils
 
 
 def model_query(context, *args):
@@ -51,13 +58,70 @@ def raw_template_get_all(context):
     return results
 
 
+def _content_hash(data):
+    canonical = json.dumps(data, sort_keys=True)
+    return hashlib.sha1(canonical).hexdigest()
+
+
 def raw_template_create(context, values):
+    '''
+    Store a raw template, reusing an existing row if one with identical
+    content is already stored. Rows are reference counted by the stacks
+    using them; the returned row holds a reference which is handed over to
+    the stack that is stored with it in stack_create/stack_update.
+    '''
+    content_hash = _content_hash(values['template'])
+    session = _session(context)
+
+    candidates = model_query(context, models.RawTemplate).\
+        filter_by(content_hash=content_hash).all()
+    for raw_template_ref in candidates:
+        # The row may be deleted by its last stack meanwhile, in which case
+        # no reference is taken
+        if (raw_template_ref.template == values['template'] and
+                _raw_template_ref(session, raw_template_ref.id)):
+            return raw_template_ref
+
     raw_template_ref = models.RawTemplate()
     raw_template_ref.update(values)
-    raw_template_ref.save(_session(context))
+    raw_template_ref.content_hash = content_hash
+    raw_template_ref.refcount = 1
+    raw_template_ref.save(session)
     return raw_template_ref
 
 
+def _raw_template_ref(session, template_id):
+    '''
+    Take a reference to a raw template, returning False if it does not
+    exist.
+    '''
+    if template_id is None:
+        return False
+    count = session.query(models.RawTemplate).\
+        filter_by(id=template_id).\
+        update({'refcount': models.RawTemplate.refcount + 1},
+               synchronize_session='evaluate')
+    return count > 0
+
+
+def _raw_template_release(session, template_id):
+    '''
+    Drop a stack's reference to a raw template, deleting the template once
+    no stack uses it any more.
+    '''
+    if template_id is None:
+        return
+    session.query(models.RawTemplate).\
+        filter_by(id=template_id).\
+        update({'refcount': models.RawTemplate.refcount - 1},
+               synchronize_session='evaluate')
+    # Only delete the row if no reference was taken since
+    session.query(models.RawTemplate).\
+        filter_by(id=template_id).\
+        filter(models.RawTemplate.refcount <= 0).\
+        delete(synchronize_session='evaluate')
+
+
 def resource_get(context, resource_id):
     result = model_query(context, models.Resource).get(resource_id)
 
@@ -96,13 +160,102 @@ def resource_get_all(context):
     return results
 
 
-def resource_create(context, values):
-    resource_ref = models.Resource()
-    resource_ref.update(values)
-    resource_ref.save(_session(context))
+def _stack_touch(session, stack_id, now):
+    '''
+    Update the timestamp of a stack whose resources have changed, and
+    discard its stored output values.
+    '''
+    session.query(models.Stack).\
+        filter_by(id=stack_id).\
+        update({'updated_at': now,
+                'version': models.Stack.version + 1,
+                'output_values': None},
+               synchronize_session='evaluate')
+
+
+def resource_create(context, values, event_values=None):
+    '''
+    Create a resource, add an event (if event_values are given) and update
+    the timestamp of its stack in a single transaction.
+    '''
+    session = _session(context)
+
+    with session.begin(subtransactions=True):
+        resource_ref = models.Resource()
+        resource_ref.update(values)
+        resource_ref.save(session)
+
+        if event_values is not None:
+            _event_create(session, event_values)
+
+        _stack_touch(session, resource_ref.stack_id, timeutils.utcnow())
+
     return resource_ref
 
 
+def resource_state_set(context, resource_id, stack_id, values,
+                       event_values=None):
+    '''
+    Update a resource, add an event (if event_values are given) and update
+    the timestamp of its stack in a single transaction, using UPDATE
+    statements rather than loading the resource and stack rows first.
+    '''
+    session = _session(context)
+    now = timeutils.utcnow()
+
+    with session.begin(subtransactions=True):
+        values = dict(values, updated_at=now,
+                      version=models.Resource.version + 1)
+        count = session.query(models.Resource).\
+            filter_by(id=resource_id).\
+            update(values, synchronize_session='evaluate')
+        if not count:
+            raise NotFound("resource with id %s not found" % resource_id)
+
+        if event_values is not None:
+            _event_create(session, event_values)
+
+        if stack_id is not None:
+            _stack_touch(session, stack_id, now)
+
+
+def resource_version_get(context, resource_id):
+    result = model_query(context, models.Resource.version).\
+        filter_by(id=resource_id).first()
+
+    if not result:
+        raise NotFound("resource with id %s not found" % resource_id)
+
+    return result.version
+
+
+def resource_get_versioned(context, resource_id, attribute):
+    '''
+    Return the version of a resource row and the value of one attribute,
+    read together in a single query.
+    '''
+    result = model_query(context, models.Resource.version,
+                         getattr(models.Resource, attribute)).\
+        filter_by(id=resource_id).first()
+
+    if not result:
+        raise NotFound("resource with id %s not found" % resource_id)
+
+    return result[0], result[1]
+
+
+def resource_update_versioned(context, resource_id, version, values):
+    '''
+    Update a resource row only if its version is still the one given,
+    returning whether it was updated.
+    '''
+    values = dict(values, version=models.Resource.version + 1)
+    count = model_query(context, models.Resource).\
+        filter_by(id=resource_id, version=version).\
+        update(values, synchronize_session='evaluate')
+    return count > 0
+
+
 def resource_get_all_by_stack(context, stack_id):
     results = model_query(context, models.Resource).\
         filter_by(stack_id=stack_id).all()
@@ -113,6 +266,46 @@ def resource_get_all_by_stack(context, stack_id):
     return results
 
 
+def group_member_get(context, member_id):
+    result = model_query(context, models.GroupMember).get(member_id)
+
+    if not result:
+        raise NotFound("group member with id %s not found" % member_id)
+
+    return result
+
+
+def group_member_create(context, values):
+    member_ref = models.GroupMember()
+    member_ref.update(values)
+    try:
+        member_ref.save(_session(context))
+    except IntegrityError as ex:
+        # The name is already taken by another member of the group
+        raise Duplicate(str(ex))
+    return member_ref
+
+
+def group_member_get_all_by_group(context, group_id):
+    results = model_query(context, models.GroupMember).\
+        filter_by(group_id=group_id).all()
+    return results
+
+
+def group_member_update(context, member_id, values):
+    member = group_member_get(context, member_id)
+    member.update(values)
+    member.save(_session(context))
+    return member
+
+
+def group_member_delete(context, member_id):
+    member = group_member_get(context, member_id)
+    session = Session.object_session(member)
+    session.delete(member)
+    session.flush()
+
+
 def stack_get_by_name(context, stack_name, owner_id=None):
     query = model_query(context, models.Stack).\
         filter_by(tenant=context.tenant_id).\
@@ -150,9 +343,47 @@ def stack_get_all_by_tenant(context):
     return results
 
 
+def stack_version_get(context, stack_id):
+    result = model_query(context, models.Stack.version).\
+        filter_by(id=stack_id).first()
+
+    if not result:
+        raise NotFound("stack with id %s not found" % stack_id)
+
+    return result.version
+
+
+def stack_get_versioned(context, stack_id, attribute):
+    '''
+    Return the version of a stack row and the value of one attribute, read
+    together in a single query.
+    '''
+    result = model_query(context, models.Stack.version,
+                         getattr(models.Stack, attribute)).\
+        filter_by(id=stack_id).first()
+
+    if not result:
+        raise NotFound("stack with id %s not found" % stack_id)
+
+    return result[0], result[1]
+
+
+def stack_update_versioned(context, stack_id, version, values):
+    '''
+    Update a stack row only if its version is still the one given,
+    returning whether it was updated.
+    '''
+    values = dict(values, version=models.Stack.version + 1)
+    count = model_query(context, models.Stack).\
+        filter_by(id=stack_id, version=version).\
+        update(values, synchronize_session='evaluate')
+    return count > 0
+
+
 def stack_create(context, values):
     stack_ref = models.Stack()
     stack_ref.update(values)
+    # The stack takes over the reference from raw_template_create
     stack_ref.save(_session(context))
     return stack_ref
 
@@ -164,18 +395,25 @@ def stack_update(context, stack_id, values):
         raise NotFound('Attempt to update a stack with id: %s %s' %
                       (stack_id, 'that does not exist'))
 
-    old_template_id = stack.raw_template_id
+    old_raw_id = stack.raw_template_id
+    old_pending_id = stack.pending_raw_template_id
 
     stack.update(values)
     stack.save(_session(context))
 
-    # When the raw_template ID changes, we delete the old template
-    # after storing the new template ID
-    if stack.raw_template_id != old_template_id:
-        session = Session.object_session(stack)
-        rt = raw_template_get(context, old_template_id)
-        session.delete(rt)
-        session.flush()
+    # A new raw_template ID comes with the reference taken for it by
+    # raw_template_create, except when the pending template of an update
+    # becomes current: that is referenced again until the pending ID is
+    # cleared. Old templates are released after the new IDs are stored,
+    # deleting them if nothing else uses them.
+    session = Session.object_session(stack)
+    if stack.raw_template_id != old_raw_id:
+        if stack.raw_template_id == old_pending_id:
+            _raw_template_ref(session, stack.raw_template_id)
+        _raw_template_release(session, old_raw_id)
+    if stack.pending_raw_template_id != old_pending_id:
+        _raw_template_release(session, old_pending_id)
+    session.flush()
 
 
 def stack_delete(context, stack_id):
@@ -186,21 +424,33 @@ def stack_delete(context, stack_id):
 
     session = Session.object_session(s)
 
-    for e in s.events:
-        session.delete(e)
+    # Count the references that the events hold to each properties
+    # snapshot, then delete the events in bulk
+    properties_refs = session.query(models.Event.properties_id,
+                                    func.count(models.Event.id)).\
+        filter_by(stack_id=stack_id).\
+        group_by(models.Event.properties_id).all()
+    session.query(models.Event).\
+        filter_by(stack_id=stack_id).\
+        delete(synchronize_session='evaluate')
 
     for r in s.resources:
         session.delete(r)
 
-    rt = s.raw_template
     uc = s.user_creds
+    template_ids = (s.raw_template_id, s.pending_raw_template_id)
 
     session.delete(s)
-    session.delete(rt)
     session.delete(uc)
 
     session.flush()
 
+    # Release the templates and event properties once nothing in the
+    # stack refers to them
+    for template_id in template_ids:
+        _raw_template_release(session, template_id)
+    _event_properties_release(session, properties_refs)
+
 
 def user_creds_create(context):
     values = context.to_dict()
@@ -254,13 +504,94 @@ def event_get_all_by_stack(context, stack_id):
     return results
 
 
-def event_create(context, values):
+# The ids of recently stored event properties snapshots, by content hash,
+# so that a reference to a known snapshot is taken in a single UPDATE
+_event_properties_ids = {}
+EVENT_PROPERTIES_CACHE_SIZE = 1000
+
+
+def _event_properties_take(session, properties_id, content_hash):
+    '''
+    Take a reference to an event properties snapshot, returning False if it
+    does not exist (e.g. it was deleted by its last event meanwhile).
+    '''
+    if properties_id is None:
+        return False
+    count = session.query(models.EventProperties).\
+        filter_by(id=properties_id, content_hash=content_hash).\
+        update({'refcount': models.EventProperties.refcount + 1},
+               synchronize_session='evaluate')
+    return count > 0
+
+
+def _event_properties_ref(session, properties):
+    '''
+    Return the id of a stored snapshot of the given resource properties,
+    holding a reference to it, storing it only if no snapshot with the same
+    content hash exists already.
+    '''
+    content_hash = _content_hash(properties)
+
+    properties_id = _event_properties_ids.get(content_hash)
+    if not _event_properties_take(session, properties_id, content_hash):
+        result = session.query(models.EventProperties.id).\
+            filter_by(content_hash=content_hash).first()
+        properties_id = result and result.id
+        if not _event_properties_take(session, properties_id, content_hash):
+            props_ref = models.EventProperties()
+            props_ref.properties = properties
+            props_ref.content_hash = content_hash
+            props_ref.refcount = 1
+            props_ref.save(session)
+            properties_id = props_ref.id
+
+        if len(_event_properties_ids) >= EVENT_PROPERTIES_CACHE_SIZE:
+            _event_properties_ids.clear()
+        _event_properties_ids[content_hash] = properties_id
+
+    return properties_id
+
+
+def _event_properties_release(session, reference_counts):
+    '''
+    Drop references to event properties snapshots, given as a list of
+    (properties id, number of references) pairs, deleting the snapshots
+    that no event uses any more.
+    '''
+    reference_counts = [(properties_id, count)
+                        for properties_id, count in reference_counts
+                        if properties_id is not None]
+    if not reference_counts:
+        return
+    for properties_id, count in reference_counts:
+        session.query(models.EventProperties).\
+            filter_by(id=properties_id).\
+            update({'refcount': models.EventProperties.refcount - count},
+                   synchronize_session='evaluate')
+    # Only delete the rows if no reference was taken since
+    properties_ids = [properties_id for properties_id, c in reference_counts]
+    session.query(models.EventProperties).\
+        filter(models.EventProperties.id.in_(properties_ids)).\
+        filter(models.EventProperties.refcount <= 0).\
+        delete(synchronize_session='fetch')
+
+
+def _event_create(session, values):
+    values = dict(values)
+    properties = values.pop('resource_properties', None)
+
     event_ref = models.Event()
     event_ref.update(values)
-    event_ref.save(_session(context))
+    if properties is not None:
+        event_ref.properties_id = _event_properties_ref(session, properties)
+    event_ref.save(session)
     return event_ref
 
 
+def event_create(context, values):
+    return _event_create(_session(context), values)
+
+
 def watch_rule_get(context, watch_rule_id):
     result = model_query(context, models.WatchRule).\
         filter_by(id=watch_rule_id).first()
@@ -0,0 +1,30 @@
+from sqlalchemy import *
+from migrate import *
+
+
+def upgrade(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+
+    # The resource table must be loaded for the foreign key to resolve
+    resource = Table('resource', meta, autoload=True)
+
+    group_member = Table(
+        'group_member', meta,
+        Column('id', Integer, primary_key=True),
+        Column('created_at', DateTime(timezone=False)),
+        Column('updated_at', DateTime(timezone=False)),
+        Column('name', String(length=255), nullable=False),
+        Column('state', String(length=255)),
+        Column('physical_resource_id', String(length=255)),
+        Column('group_id', Integer, ForeignKey("resource.id"),
+               nullable=False),
+    )
+
+    group_member.create()
+
+
+def downgrade(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+
+    group_member = Table('group_member', meta, autoload=True)
+    group_member.drop()
@@ -0,0 +1,40 @@
+import hashlib
+import json
+
+from sqlalchemy import *
+from migrate import *
+
+
+def upgrade(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+
+    raw_template = Table('raw_template', meta, autoload=True)
+    stack = Table('stack', meta, autoload=True)
+
+    Column('content_hash', String(length=40)).create(raw_template)
+    Column('refcount', Integer, nullable=False,
+           server_default='0').create(raw_template)
+    Index('ix_raw_template_content_hash',
+          raw_template.c.content_hash).create(migrate_engine)
+
+    # Hash the existing templates and count the stacks using each of them
+    for row in migrate_engine.execute(raw_template.select()).fetchall():
+        canonical = json.dumps(json.loads(row.template), sort_keys=True)
+        refcount = migrate_engine.execute(
+            select([func.count(stack.c.id)]).where(
+                stack.c.raw_template_id == row.id)).scalar()
+        migrate_engine.execute(
+            raw_template.update().where(raw_template.c.id == row.id).values(
+                content_hash=hashlib.sha1(canonical).hexdigest(),
+                refcount=refcount))
+
+
+def downgrade(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+
+    raw_template = Table('raw_template', meta, autoload=True)
+
+    Index('ix_raw_template_content_hash',
+          raw_template.c.content_hash).drop(migrate_engine)
+    raw_template.c.refcount.drop()
+    raw_template.c.content_hash.drop()
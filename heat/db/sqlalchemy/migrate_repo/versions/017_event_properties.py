@@ -0,0 +1,84 @@
+import hashlib
+import json
+import pickle
+
+from sqlalchemy import *
+from migrate import *
+
+
+def upgrade(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+
+    event = Table('event', meta, autoload=True)
+
+    event_properties = Table(
+        'event_properties', meta,
+        Column('id', Integer, primary_key=True),
+        Column('created_at', DateTime(timezone=False)),
+        Column('updated_at', DateTime(timezone=False)),
+        Column('properties', Text),
+        Column('content_hash', String(length=40), index=True),
+        Column('refcount', Integer, nullable=False, server_default='0'),
+    )
+    event_properties.create()
+
+    Column('properties_id', Integer,
+           ForeignKey('event_properties.id')).create(event)
+
+    # Move the pickled properties into shared JSON snapshots
+    snapshots = {}
+    for row in migrate_engine.execute(select([
+            event.c.id, event.c.created_at,
+            event.c.resource_properties])).fetchall():
+        if row.resource_properties is None:
+            continue
+        properties = pickle.loads(str(row.resource_properties))
+        data = json.dumps(properties, sort_keys=True)
+        content_hash = hashlib.sha1(data).hexdigest()
+
+        if content_hash in snapshots:
+            props_id = snapshots[content_hash]
+            migrate_engine.execute(
+                event_properties.update().where(
+                    event_properties.c.id == props_id).values(
+                        refcount=event_properties.c.refcount + 1))
+        else:
+            result = migrate_engine.execute(
+                event_properties.insert().values(
+                    created_at=row.created_at,
+                    properties=data,
+                    content_hash=content_hash,
+                    refcount=1))
+            props_id = result.inserted_primary_key[0]
+            snapshots[content_hash] = props_id
+
+        migrate_engine.execute(
+            event.update().where(event.c.id == row.id).values(
+                properties_id=props_id))
+
+    event.c.resource_properties.drop()
+
+
+def downgrade(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+
+    event = Table('event', meta, autoload=True)
+    event_properties = Table('event_properties', meta, autoload=True)
+
+    Column('resource_properties', PickleType).create(event)
+
+    # Compressed snapshots are zlib data, base64-encoded after a prefix
+    def load(data):
+        if data.startswith('zlib:'):
+            data = data[len('zlib:'):].decode('base64').decode('zlib')
+        return json.loads(data)
+
+    query = select([event.c.id, event_properties.c.properties],
+                   event.c.properties_id == event_properties.c.id)
+    for row in migrate_engine.execute(query).fetchall():
+        migrate_engine.execute(
+            event.update().where(event.c.id == row.id).values(
+                resource_properties=load(row.properties)))
+
+    event.c.properties_id.drop()
+    event_properties.drop()
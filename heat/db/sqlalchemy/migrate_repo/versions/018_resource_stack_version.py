@@ -0,0 +1,19 @@
+from sqlalchemy import *
+from migrate import *
+
+
+def upgrade(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+
+    for table_name in ('stack', 'resource'):
+        table = Table(table_name, meta, autoload=True)
+        Column('version', Integer, nullable=False,
+               server_default='0').create(table)
+
+
+def downgrade(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+
+    for table_name in ('stack', 'resource'):
+        table = Table(table_name, meta, autoload=True)
+        table.c.version.drop()
@@ -0,0 +1,16 @@
+from sqlalchemy import *
+from migrate import *
+
+
+def upgrade(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+
+    resource = Table('resource', meta, autoload=True)
+    Column('attr_cache', Text).create(resource)
+
+
+def downgrade(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+
+    resource = Table('resource', meta, autoload=True)
+    resource.c.attr_cache.drop()
@@ -0,0 +1,20 @@
+from sqlalchemy import *
+from migrate import *
+
+
+def upgrade(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+
+    Table('raw_template', meta, autoload=True)
+    stack = Table('stack', meta, autoload=True)
+    Column('pending_raw_template_id', Integer,
+           ForeignKey('raw_template.id')).create(stack)
+    Column('pending_parameters', Text).create(stack)
+
+
+def downgrade(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+
+    stack = Table('stack', meta, autoload=True)
+    stack.c.pending_parameters.drop()
+    stack.c.pending_raw_template_id.drop()
@@ -0,0 +1,20 @@
+from sqlalchemy import *
+from migrate import *
+
+
+def upgrade(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+
+    group_member = Table('group_member', meta, autoload=True)
+    Index('uniq_group_member0group_id0name',
+          group_member.c.group_id, group_member.c.name,
+          unique=True).create()
+
+
+def downgrade(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+
+    group_member = Table('group_member', meta, autoload=True)
+    Index('uniq_group_member0group_id0name',
+          group_member.c.group_id, group_member.c.name,
+          unique=True).drop()
@@ -16,11 +16,16 @@ SQLAlchemy models for heat data.
 """
 
 from sqlalchemy import *
+from sqlalchemy import event
 from sqlalchemy.orm import relationship, backref, object_mapper
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.mutable import Mutable
 from sqlalchemy import types as types
 from json import dumps, loads
+import base64
+import zlib
+from heat.common import exception
 from heat.openstack.common import uuidutils
 from heat.openstack.common import timeutils
 from heat.db.sqlalchemy.session import get_session
@@ -29,16 +34,89 @@ from sqlalchemy.orm.session import Session
 BASE = declarative_base()
 
 
-class Json(types.TypeDecorator, types.MutableType):
+class Json(types.TypeDecorator):
     impl = types.Text
 
     def process_bind_param(self, value, dialect):
         return dumps(value)
 
     def process_result_value(self, value, dialect):
+        # Columns added by a migration are NULL in rows written before it
+        if value is None:
+            return None
         return loads(value)
 
 
+class CompressedJson(Json):
+    """
+    JSON stored zlib-compressed (and base64-encoded, to remain valid text)
+    once its serialised form is larger than COMPRESS_THRESHOLD bytes.
+    """
+    COMPRESS_THRESHOLD = 4096
+    PREFIX = 'zlib:'
+
+    def process_bind_param(self, value, dialect):
+        data = dumps(value)
+        if len(data) <= self.COMPRESS_THRESHOLD:
+            return data
+        return self.PREFIX + base64.b64encode(zlib.compress(data))
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if value.startswith(self.PREFIX):
+            value = zlib.decompress(base64.b64decode(value[len(self.PREFIX):]))
+        return loads(value)
+
+
+class MutableDict(Mutable, dict):
+    """
+    A dict which notifies its parent object when its items are changed, so
+    that Json columns need not be copied and compared on every flush.
+    Changes to nested values are not tracked; assign the top-level item (or
+    the whole dict) again to record them.
+    """
+
+    @classmethod
+    def coerce(cls, key, value):
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, dict):
+            return cls(value)
+        return Mutable.coerce(key, value)
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        self.changed()
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self.changed()
+
+    def clear(self):
+        dict.clear(self)
+        self.changed()
+
+    def update(self, *args, **kwargs):
+        dict.update(self, *args, **kwargs)
+        self.changed()
+
+    def setdefault(self, key, default=None):
+        result = dict.setdefault(self, key, default)
+        self.changed()
+        return result
+
+    def pop(self, key, *args):
+        result = dict.pop(self, key, *args)
+        self.changed()
+        return result
+
+    def popitem(self):
+        result = dict.popitem(self)
+        self.changed()
+        return result
+
+
 class HeatBase(object):
     """Base class for Heat Models."""
     __table_args__ = {'mysql_engine': 'InnoDB'}
@@ -136,7 +214,9 @@ class RawTemplate(BASE, HeatBase):
 
     __tablename__ = 'raw_template'
     id = Column(Integer, primary_key=True)
-    template = Column(Json)
+    template = Column(CompressedJson)
+    content_hash = Column(String(40), index=True)
+    refcount = Column(Integer, nullable=False, default=0)
 
 
 class Stack(BASE, HeatBase):
@@ -150,18 +230,29 @@ class Stack(BASE, HeatBase):
         Integer,
         ForeignKey('raw_template.id'),
         nullable=False)
-    raw_template = relationship(RawTemplate, backref=backref('stack'))
+    raw_template = relationship(
+        RawTemplate, backref=backref('stack'),
+        primaryjoin='Stack.raw_template_id == RawTemplate.id')
     username = Column(String)
     tenant = Column(String)
     status = Column('status', String)
     status_reason = Column('status_reason', String)
-    parameters = Column('parameters', Json)
+    parameters = Column('parameters', MutableDict.as_mutable(Json))
     user_creds_id = Column(
         Integer,
         ForeignKey('user_creds.id'),
         nullable=False)
     owner_id = Column(Integer, nullable=True)
     timeout = Column(Integer)
+    version = Column(Integer, nullable=False, default=0)
+    # output values stored when the stack is created or updated
+    output_values = Column('output_values', Json)
+    # the template and parameters of an update in progress
+    pending_raw_template_id = Column(
+        Integer,
+        ForeignKey('raw_template.id'),
+        nullable=True)
+    pending_parameters = Column('pending_parameters', Json)
 
 
 class UserCreds(BASE, HeatBase):
@@ -185,6 +276,20 @@ class UserCreds(BASE, HeatBase):
     stack = relationship(Stack, backref=backref('user_creds'))
 
 
+class EventProperties(BASE, HeatBase):
+    """
+    Represents a snapshot of a resource's properties, shared by all of the
+    events recording the same properties.
+    """
+
+    __tablename__ = 'event_properties'
+
+    id = Column(Integer, primary_key=True)
+    properties = Column(CompressedJson)
+    content_hash = Column(String(40), index=True)
+    refcount = Column(Integer, nullable=False, default=0)
+
+
 class Event(BASE, HeatBase):
     """Represents an event generated by the heat engine."""
 
@@ -199,7 +304,14 @@ class Event(BASE, HeatBase):
     physical_resource_id = Column(String)
     resource_status_reason = Column(String)
     resource_type = Column(String)
-    resource_properties = Column(PickleType)
+    properties_id = Column(Integer, ForeignKey('event_properties.id'))
+    properties = relationship(EventProperties, lazy='joined')
+
+    @property
+    def resource_properties(self):
+        if self.properties is None:
+            return {}
+        return self.properties.properties
 
 
 class Resource(BASE, HeatBase):
@@ -213,10 +325,31 @@ class Resource(BASE, HeatBase):
     nova_instance = Column('nova_instance', String)
     state_description = Column('state_description', String)
     # odd name as "metadata" is reserved
-    rsrc_metadata = Column('rsrc_metadata', Json)
+    rsrc_metadata = Column('rsrc_metadata', MutableDict.as_mutable(Json))
+    # resolved attribute values, cached to avoid looking them up again
+    attr_cache = Column('attr_cache', MutableDict.as_mutable(Json))
 
     stack_id = Column(String, ForeignKey('stack.id'), nullable=False)
     stack = relationship(Stack, backref=backref('resources'))
+    version = Column(Integer, nullable=False, default=0)
+
+
+class GroupMember(BASE, HeatBase):
+    """Represents a member of a resource group, e.g. an InstanceGroup."""
+
+    __tablename__ = 'group_member'
+    __table_args__ = (UniqueConstraint('group_id', 'name'),
+                      HeatBase.__table_args__)
+
+    id = Column(Integer, primary_key=True)
+    name = Column('name', String, nullable=False)
+    state = Column('state', String)
+    physical_resource_id = Column('physical_resource_id', String)
+
+    group_id = Column(Integer, ForeignKey('resource.id'), nullable=False)
+    group = relationship(Resource,
+                         backref=backref('group_members',
+                                         cascade='all,delete-orphan'))
 
 
 class WatchRule(BASE, HeatBase):
@@ -226,7 +359,7 @@ class WatchRule(BASE, HeatBase):
 
     id = Column(Integer, primary_key=True)
     name = Column('name', String, nullable=False)
-    rule = Column('rule', Json)
+    rule = Column('rule', MutableDict.as_mutable(Json))
     state = Column('state', String)
     last_evaluated = Column(DateTime, default=timeutils.utcnow)
 
@@ -240,10 +373,24 @@ class WatchData(BASE, HeatBase):
     __tablename__ = 'watch_data'
 
     id = Column(Integer, primary_key=True)
-    data = Column('data', Json)
+    data = Column('data', MutableDict.as_mutable(Json))
 
     watch_rule_id = Column(
         Integer,
         ForeignKey('watch_rule.id'),
         nullable=False)
     watch_rule = relationship(WatchRule, backref=backref('watch_data'))
+
+
+def _increment_version(mapper, connection, target):
+    # Increment in SQL rather than from the loaded value, so that an update
+    # through a stale object can't reuse a version another engine has seen
+    session = Session.object_session(target)
+    if session.is_modified(target, include_collections=False):
+        target.version = type(target).version + 1
+
+
+# The version is incremented on every update, so that cached data for a
+# stack or resource can be checked cheaply for changes
+for _versioned in (Stack, Resource):
+    event.listen(_versioned, 'before_update', _increment_version)
@@ -43,11 +43,13 @@ def format_stack_outputs(stack, outputs):
     Return a representation of the given output template for the given stack
     that matches the API output expectations.
     '''
+    values = stack.output_values()
+
     def format_stack_output(k):
         return {OUTPUT_DESCRIPTION: outputs[k].get('Description',
                                                    'No description given'),
                 OUTPUT_KEY: k,
-                OUTPUT_VALUE: stack.output(k)}
+                OUTPUT_VALUE: values[k]}
 
     return [format_stack_output(key) for key in outputs]
 
@@ -106,6 +108,20 @@ def format_stack_resource(resource, detail=True):
     return res
 
 
+def format_group_member(member):
+    '''
+    Return a representation of the given group member database record that
+    matches the API output expectations.
+    '''
+    return {
+        MEMBER_NAME: member.name,
+        MEMBER_PHYSICAL_ID: member.physical_resource_id or '',
+        MEMBER_STATUS: member.state,
+        MEMBER_UPDATED_TIME: timeutils.isotime(member.updated_at or
+                                               member.created_at),
+    }
+
+
 def format_event(event):
     stack_identifier = event.stack.identifier()
 
@@ -0,0 +1,104 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+'''
+A cache of data read from the database rows of engine objects (stacks and
+resources). Engine objects are loaded afresh for each operation, so data read
+once is trusted for the rest of the operation and repeated reads are answered
+from memory. Code that waits for another request to change a row must clear()
+the cache before each read.
+
+Writes are made conditional on the version of the row that the cached data
+was read from, so that a change made meanwhile by another engine is detected
+instead of being overwritten.
+'''
+
+from heat.common import exception
+
+_CACHE_ATTR = '_db_cache'
+
+# Columns that change whenever a row is updated
+_ON_UPDATE = ('updated_at',)
+
+
+class _Entry(object):
+    def __init__(self, obj_id, version):
+        self.id = obj_id
+        self.version = version
+        self.values = {}
+
+
+def _entry(obj):
+    entry = obj.__dict__.get(_CACHE_ATTR)
+    if entry is None or entry.id != obj.id:
+        return None
+    return entry
+
+
+def get(obj, attribute, db_get):
+    '''
+    Return the value of an attribute of the database row for obj, reading it
+    with db_get (which returns the version of the row and the value) only if
+    it is not cached yet.
+    '''
+    entry = _entry(obj)
+    if entry is not None and attribute in entry.values:
+        return entry.values[attribute]
+
+    version, value = db_get(obj.context, obj.id, attribute)
+    if entry is None or entry.version != version:
+        # The row has changed since the other cached values were read
+        entry = _Entry(obj.id, version)
+        obj.__dict__[_CACHE_ATTR] = entry
+    entry.values[attribute] = value
+    return value
+
+
+def update(obj, attribute, value, db_get, db_update):
+    '''
+    Write the value of an attribute to the database row for obj with
+    db_update, provided that the row has not changed since the cached data
+    was read. Otherwise the cache is cleared and ConcurrentUpdate is raised,
+    so that the caller may read the latest data and try again.
+    '''
+    entry = _entry(obj)
+    if entry is None:
+        get(obj, attribute, db_get)
+        entry = _entry(obj)
+
+    if not db_update(obj.context, obj.id, entry.version, {attribute: value}):
+        clear(obj)
+        raise exception.ConcurrentUpdate(name=obj.name)
+
+    changed(obj)
+    entry.values[attribute] = value
+
+
+def changed(obj):
+    '''
+    Record a single update of the database row for obj made by this engine
+    which did not modify any of the cached attributes (other than those that
+    change with every update).
+    '''
+    entry = _entry(obj)
+    if entry is not None:
+        entry.version += 1
+        for attribute in _ON_UPDATE:
+            entry.values.pop(attribute, None)
+
+
+def clear(obj):
+    '''Discard any cached data for obj.'''
+    obj.__dict__.pop(_CACHE_ATTR, None)
@@ -111,6 +111,10 @@ class Dependencies(object):
 
         return self
 
+    def requires(self, source):
+        '''List the keys that the specified node requires.'''
+        return iter(self.deps[source])
+
     def __getitem__(self, last):
         '''
         Return a partial dependency graph consisting of the specified node and
@@ -63,8 +63,8 @@ class Event(object):
 
         return event
 
-    def store(self):
-        '''Store the Event in the database'''
+    def db_values(self):
+        '''Return the values with which to store the Event in the database'''
         ev = {
             'logical_resource_id': self.resource.name,
             'physical_resource_id': self.physical_resource_id,
@@ -80,10 +80,14 @@ class Event(object):
         if self.timestamp is not None:
             ev['created_at'] = self.timestamp
 
+        return ev
+
+    def store(self):
+        '''Store the Event in the database'''
         if self.id is not None:
             logger.warning('Duplicating event')
 
-        new_ev = db_api.event_create(self.context, ev)
+        new_ev = db_api.event_create(self.context, self.db_values())
         self.id = new_ev.id
         return self.id
 
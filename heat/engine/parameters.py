@@ -34,6 +34,9 @@ PARAMETER_TYPES = (
 )
 (PARAM_STACK_NAME, PARAM_REGION) = ('AWS::StackName', 'AWS::Region')
 
+# Compiled AllowedPattern expressions, keyed by pattern string
+_patterns = {}
+
 
 class Parameter(object):
     '''A template parameter.'''
@@ -177,7 +180,9 @@ class StringParam(Parameter):
 
         if PATTERN in self.schema:
             pattern = self.schema[PATTERN]
-            match = re.match(pattern, value)
+            if pattern not in _patterns:
+                _patterns[pattern] = re.compile(pattern)
+            match = _patterns[pattern].match(value)
             if match is None or match.end() != length:
                 message = '"%s" does not match %s "%s"' % (value,
                                                            PATTERN,
@@ -190,6 +195,10 @@ class StringParam(Parameter):
 class CommaDelimitedListParam(Parameter, collections.Sequence):
     '''A template parameter of type "CommaDelimitedList".'''
 
+    def __init__(self, name, schema, value=None):
+        self._items = None
+        super(CommaDelimitedListParam, self).__init__(name, schema, value)
+
     def _validate(self, value):
         '''Check that the supplied value is compatible with the constraints'''
         try:
@@ -197,16 +206,22 @@ class CommaDelimitedListParam(Parameter, collections.Sequence):
         except AttributeError:
             raise ValueError('Value must be a comma-delimited list string')
 
-        for li in self:
+        for li in sp:
             Parameter._validate(self, li)
 
+    def _list(self):
+        '''Return the value as a list, splitting it only once'''
+        if self._items is None:
+            self._items = self.value().split(',')
+        return self._items
+
     def __len__(self):
         '''Return the length of the list'''
-        return len(self.value().split(','))
+        return len(self._list())
 
     def __getitem__(self, index):
         '''Return an item from the list'''
-        return self.value().split(',')[index]
+        return self._list()[index]
 
 
 class Parameters(collections.Mapping):
@@ -15,13 +15,17 @@
 
 import eventlet
 import functools
+import hashlib
+import json
 
 from heat.common import exception
+from heat.engine import dbcache
 from heat.engine import dependencies
 from heat.common import identifier
 from heat.engine import resource
 from heat.engine import template
 from heat.engine import timestamp
+from heat.engine import update
 from heat.engine.parameters import Parameters
 from heat.engine.template import Template
 from heat.engine.clients import Clients
@@ -47,8 +51,12 @@ class Stack(object):
     UPDATE_COMPLETE = 'UPDATE_COMPLETE'
     UPDATE_FAILED = 'UPDATE_FAILED'
 
-    created_time = timestamp.Timestamp(db_api.stack_get, 'created_at')
-    updated_time = timestamp.Timestamp(db_api.stack_get, 'updated_at')
+    created_time = timestamp.CachedTimestamp(db_api.stack_get_versioned,
+                                             db_api.stack_update_versioned,
+                                             'created_at')
+    updated_time = timestamp.CachedTimestamp(db_api.stack_get_versioned,
+                                             db_api.stack_update_versioned,
+                                             'updated_at')
 
     def __init__(self, context, stack_name, tmpl, parameters=None,
                  stack_id=None, state=None, state_description='',
@@ -75,10 +83,12 @@ class Stack(object):
             parameters = Parameters(self.name, self.t)
         self.parameters = parameters
 
-        if resolve_data:
-            self.outputs = self.resolve_static_data(self.t[template.OUTPUTS])
-        else:
-            self.outputs = {}
+        self._resolve_data = resolve_data
+        self._outputs = None
+        # (stack version, output values), memoized by output_values()
+        self._output_cache = None
+        # Changes whenever resolving runtime data may give a new result
+        self._resolution_epoch = 0
 
         template_resources = self.t[template.RESOURCES]
         self.resources = dict((name,
@@ -107,9 +117,12 @@ class Stack(object):
 
         template = Template.load(context, stack.raw_template_id)
         params = Parameters(stack.name, template, stack.parameters)
-        stack = cls(context, stack.name, template, params,
-                    stack.id, stack.status, stack.status_reason, stack.timeout,
-                    resolve_data)
+        db_stack = stack
+        stack = cls(context, db_stack.name, template, params,
+                    db_stack.id, db_stack.status, db_stack.status_reason,
+                    db_stack.timeout, resolve_data)
+        if db_stack.output_values is not None:
+            stack._output_cache = (db_stack.version, db_stack.output_values)
 
         return stack
 
@@ -134,6 +147,7 @@ class Stack(object):
         }
         if self.id:
             db_api.stack_update(self.context, self.id, s)
+            dbcache.clear(self)
         else:
             new_s = db_api.stack_create(self.context, s)
             self.id = new_s.id
@@ -172,6 +186,7 @@ class Stack(object):
     def __setitem__(self, key, value):
         '''Set the resource with the specified name to a specific value'''
         self.resources[key] = value
+        self.resolution_changed()
 
     def __contains__(self, key):
         '''Determine whether the stack contains the specified resource'''
@@ -210,9 +225,22 @@ class Stack(object):
         if self.id is None:
             return
 
+        # Store the output values of a complete stack, so that describing
+        # it needs no further resolution
+        values = None
+        if new_status in (self.CREATE_COMPLETE, self.UPDATE_COMPLETE):
+            try:
+                values = self._resolve_outputs()
+            except Exception as ex:
+                logger.exception('Resolving outputs of stack %s' % self.name)
+
         stack = db_api.stack_get(self.context, self.id)
         stack.update_and_save({'status': new_status,
-                               'status_reason': reason})
+                               'status_reason': reason,
+                               'output_values': values})
+        dbcache.clear(self)
+        self._output_cache = values is not None and (stack.version,
+                                                     values) or None
 
     def create(self):
         '''
@@ -231,6 +259,9 @@ class Stack(object):
             try:
                 for res in self:
                     if stack_status != self.CREATE_FAILED:
+                        if res.state == res.CREATE_COMPLETE:
+                            # Created before the operation was interrupted
+                            continue
                         result = res.create()
                         if result:
                             stack_status = self.CREATE_FAILED
@@ -269,92 +300,38 @@ class Stack(object):
         else:
             self.state_set(self.UPDATE_IN_PROGRESS, 'Stack update started')
 
-        # Now make the resources match the new stack definition
-        failures = []
+        self._set_pending_update(newstack)
+        self._update(newstack)
+
+    def _set_pending_update(self, newstack):
+        '''
+        Record the definition that the stack is being updated to, so that the
+        update can be resumed if it is interrupted. Pass None to clear it.
+        '''
+        if newstack is None:
+            values = {'pending_raw_template_id': None,
+                      'pending_parameters': None}
+        else:
+            values = {
+                'pending_raw_template_id': newstack.t.store(self.context),
+                'pending_parameters': newstack.parameters.user_parameters()}
+        db_api.stack_update(self.context, self.id, values)
+        dbcache.clear(self)
+
+    def _update(self, newstack):
+        plan = self.update_plan(newstack)
+
         with eventlet.Timeout(self.timeout_mins * 60) as tmo:
             try:
-                # First delete any resources which are not in newstack
-                for res in reversed(self):
-                    if not res.name in newstack.keys():
-                        logger.debug("resource %s not found in updated stack"
-                                     % res.name + " definition, deleting")
-                        result = res.destroy()
-                        if result:
-                            failures.append('Resource %s delete failed'
-                                            % res.name)
-                        else:
-                            del self.resources[res.name]
-
-                # Then create any which are defined in newstack but not self
-                for res in newstack:
-                    if not res.name in self.keys():
-                        logger.debug("resource %s not found in current stack"
-                                     % res.name + " definition, adding")
-                        res.stack = self
-                        self[res.name] = res
-                        result = self[res.name].create()
-                        if result:
-                            failures.append('Resource %s create failed'
-                                            % res.name)
-
-                # Now (the hard part :) update existing resources
-                # The Resource base class allows equality-test of resources,
-                # based on the parsed template snippet for the resource.
-                # If this  test fails, we call the underlying resource.update
-                #
-                # FIXME : Implement proper update logic for the resources
-                # AWS define three update strategies, applied depending
-                # on the resource and what is being updated within a
-                # resource :
-                # - Update with no interruption
-                # - Update with some interruption
-                # - Update requires replacement
-                #
-                # Currently all resource have a default handle_update method
-                # which returns "requires replacement" (res.UPDATE_REPLACE)
-                for res in newstack:
-                    # Compare resolved pre/post update resource snippets,
-                    # note the new resource snippet is resolved in the context
-                    # of the existing stack (which is the stack being updated)
-                    old_snippet = self.resolve_runtime_data(self[res.name].t)
-                    new_snippet = self.resolve_runtime_data(res.t)
-                    if old_snippet != new_snippet:
-
-                        # Can fail if underlying resource class does not
-                        # implement update logic or update requires replacement
-                        retval = self[res.name].update(new_snippet)
-                        if retval == self[res.name].UPDATE_COMPLETE:
-                            logger.info("Resource %s for stack %s updated" %
-                                        (res.name, self.name))
-                        elif retval == self[res.name].UPDATE_REPLACE:
-                            logger.info("Resource %s for stack %s" %
-                                        (res.name, self.name) +
-                                        " update requires replacement")
-                            # Resource requires replacement for update
-                            result = self[res.name].destroy()
-                            if result:
-                                failures.append('Resource %s delete failed'
-                                                % res.name)
-                            else:
-                                res.stack = self
-                                self[res.name] = res
-                                result = self[res.name].create()
-                                if result:
-                                    failures.append('Resource %s create failed'
-                                                    % res.name)
-                        else:
-                            logger.warning("Cannot update resource %s," %
-                                           res.name + " reason %s" % retval)
-                            failures.append('Resource %s update failed'
-                                            % res.name)
+                failures = plan.execute()
 
                 # Set stack status values
                 if not failures:
                     # flip the template & parameters to the newstack values
                     self.t = newstack.t
                     self.parameters = newstack.parameters
-                    template_outputs = self.t[template.OUTPUTS]
-                    self.outputs = self.resolve_static_data(template_outputs)
+                    self._outputs = None
+                    self._output_cache = None
                     self.dependencies = self._get_dependencies(
                         self.resources.itervalues())
                     self.store()
@@ -368,13 +345,87 @@ class Stack(object):
             except eventlet.Timeout as t:
                 if t is tmo:
                     stack_status = self.UPDATE_FAILED
-                    reason = 'Timed out waiting for %s' % str(res)
+                    reason = 'Timed out waiting for %s' % ', '.join(
+                        sorted(plan.running))
                 else:
                     # not my timeout
                     raise
 
+        self._set_pending_update(None)
         self.state_set(stack_status, reason)
 
+    def resume(self):
+        '''
+        Continue an operation that was interrupted while the stack was in
+        progress, e.g. by the engine being restarted. Resources whose own
+        operations were interrupted are marked as failed and retried, while
+        those that had completed are reused.
+        '''
+        interrupted = {
+            resource.Resource.CREATE_IN_PROGRESS:
+            resource.Resource.CREATE_FAILED,
+            resource.Resource.UPDATE_IN_PROGRESS:
+            resource.Resource.UPDATE_FAILED,
+            resource.Resource.DELETE_IN_PROGRESS:
+            resource.Resource.DELETE_FAILED,
+        }
+        for res in self:
+            if res.state in interrupted:
+                res.state_set(interrupted[res.state], 'Operation interrupted')
+
+        logger.info('Resuming %s of stack %s' % (self.state, self.name))
+        if self.state == self.CREATE_IN_PROGRESS:
+            # The physical state of a resource that was not created is
+            # unknown, so clean it up before creating it again
+            for res in reversed(self):
+                if res.id is not None and res.state != res.CREATE_COMPLETE:
+                    res.destroy()
+            self.create()
+        elif self.state == self.UPDATE_IN_PROGRESS:
+            self._resume_update()
+        elif self.state == self.DELETE_IN_PROGRESS:
+            self.delete()
+
+    def _resume_update(self):
+        db_stack = db_api.stack_get(self.context, self.id)
+        if db_stack.pending_raw_template_id is None:
+            self.state_set(self.UPDATE_FAILED, 'Update interrupted')
+            return
+
+        tmpl = Template.load(self.context, db_stack.pending_raw_template_id)
+        params = Parameters(self.name, tmpl,
+                            db_stack.pending_parameters or {})
+        newstack = Stack(self.context, self.name, tmpl, params,
+                         timeout_mins=self.timeout_mins)
+
+        # Adopt any resources that were created by the interrupted update,
+        # so that they are not created again
+        for res in newstack:
+            if res.name in self:
+                continue
+            db_res = db_api.resource_get_by_name_and_stack(self.context,
+                                                           res.name, self.id)
+            if db_res is None:
+                continue
+            res.stack = self
+            res.id = db_res.id
+            res.resource_id = db_res.nova_instance
+            res.state = db_res.state
+            res.state_description = db_res.state_description
+            if res.state == res.CREATE_COMPLETE:
+                self[res.name] = res
+            else:
+                res.destroy()
+
+        self._update(newstack)
+
+    def update_plan(self, newstack):
+        '''
+        Return the plan for updating this stack to match newstack. Its
+        report() method gives a dry-run report of the update.
+        '''
+        return update.UpdatePlan(self, newstack)
+
     def delete(self):
         '''
         Delete all of the resources, and then the stack itself.
@@ -396,12 +447,43 @@ class Stack(object):
             self.state_set(self.DELETE_COMPLETE, 'Deleted successfully')
             db_api.stack_delete(self.context, self.id)
 
+    @property
+    def outputs(self):
+        '''
+        The Outputs section of the template, with static data resolved. This
+        is only done when first needed.
+        '''
+        if self._outputs is None:
+            if self._resolve_data:
+                self._outputs = self.resolve_static_data(
+                    self.t[template.OUTPUTS])
+            else:
+                self._outputs = {}
+        return self._outputs
+
+    def _resolve_outputs(self):
+        return dict((key, self.resolve_runtime_data(
+                     self.outputs[key].get('Value', '')))
+                    for key in self.outputs)
+
+    def output_values(self):
+        '''
+        Get a dict of the values of all stack outputs. The values are
+        memoized until the stack changes in the database.
+        '''
+        if self.id is None:
+            return self._resolve_outputs()
+
+        version = db_api.stack_version_get(self.context, self.id)
+        if self._output_cache is None or self._output_cache[0] != version:
+            self._output_cache = (version, self._resolve_outputs())
+        return self._output_cache[1]
+
     def output(self, key):
         '''
         Get the value of the specified stack output.
         '''
-        value = self.outputs[key].get('Value', '')
-        return self.resolve_runtime_data(value)
+        return self.output_values()[key]
 
     def restart_resource(self, resource_name):
         '''
@@ -436,6 +518,44 @@ class Stack(object):
     def resolve_runtime_data(self, snippet):
         return resolve_runtime_data(self.t, self.resources, snippet)
 
+    def resource_digests(self):
+        '''
+        Return a dict mapping resource names to a digest of each resource's
+        statically-resolved snippet combined with the digests of the
+        resources it references. If two stacks give the same digest for a
+        resource, resolving its runtime data gives the same result in both.
+        '''
+        digests = {}
+
+        def digest(name):
+            if name not in digests:
+                if name not in self.resources:
+                    return ''
+                # Guard against reference cycles through Fn::GetAtt
+                digests[name] = ''
+                snippet = self.resources[name].t
+                d = hashlib.sha1(_snippet_digest(snippet))
+                for ref in sorted(_references(snippet)):
+                    d.update('%s:%s' % (ref, digest(ref)))
+                digests[name] = d.hexdigest()
+            return digests[name]
+
+        for name in self.resources:
+            digest(name)
+        return digests
+
+    def resolution_epoch(self):
+        '''
+        Return a value which changes whenever resolve_runtime_data() may
+        produce a different result from the same snippet, i.e. whenever a
+        resource is added, removed or changes state.
+        '''
+        return self._resolution_epoch
+
+    def resolution_changed(self):
+        '''Start a new resolution epoch.'''
+        self._resolution_epoch += 1
+
 
 def resolve_static_data(template, parameters, snippet):
     '''
@@ -466,6 +586,32 @@ def resolve_runtime_data(template, resources, snippet):
                       template.resolve_base64])
 
 
+def _snippet_digest(snippet):
+    '''Return a canonical digest of a template snippet.'''
+    return hashlib.sha1(json.dumps(snippet, sort_keys=True)).hexdigest()
+
+
+def _references(snippet):
+    '''
+    Return the set of names referred to by Ref, Fn::GetAtt or DependsOn in a
+    template snippet.
+    '''
+    refs = set()
+    if isinstance(snippet, dict):
+        for key, value in snippet.items():
+            if key in ('Ref', 'DependsOn') and isinstance(value, basestring):
+                refs.add(value)
+            elif (key == 'Fn::GetAtt' and isinstance(value, list) and
+                    value and isinstance(value[0], basestring)):
+                refs.add(value[0])
+            else:
+                refs.update(_references(value))
+    elif isinstance(snippet, list):
+        for item in snippet:
+            refs.update(_references(item))
+    return refs
+
+
 def transform(data, transformations):
     '''
     Apply each of the transformation functions in the supplied list to the data
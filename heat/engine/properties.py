@@ -1,4 +1,5 @@
 import collections
+import copy
 import re
 
 
@@ -21,6 +22,32 @@ SCHEMA_TYPES = (
 )
 
 
+# Compiled patterns, keyed by pattern string
+_patterns = {}
+
+# Property objects for each schema, keyed by the id() of the schema dict. The
+# schema itself is kept in the entry so that its id() cannot be reused.
+_compiled_schemas = {}
+
+
+def _compile_pattern(pattern):
+    if pattern not in _patterns:
+        _patterns[pattern] = re.compile(pattern)
+    return _patterns[pattern]
+
+
+def compile_schema(schema):
+    '''
+    Return a dict of Property objects for a properties schema. Schemas are
+    normally class attributes, so each one is checked and compiled only once.
+    '''
+    entry = _compiled_schemas.get(id(schema))
+    if entry is None or entry[0] is not schema:
+        entry = (schema, dict((k, Property(s, k)) for k, s in schema.items()))
+        _compiled_schemas[id(schema)] = entry
+    return entry[1]
+
+
 class Property(object):
     def __init__(self, schema, name=None):
         self.schema = schema
@@ -32,6 +59,16 @@ class Property(object):
         assert self.type() in SCHEMA_TYPES,\
             'Unknown property type "%s"' % self.type()
 
+        self._pattern = None
+        if PATTERN in self.schema:
+            self._pattern = _compile_pattern(self.schema[PATTERN])
+
+        self._items = None
+        if self.type() == LIST and SCHEMA in self.schema:
+            self._items = Property(self.schema[SCHEMA])
+        elif self.type() == MAP and SCHEMA in self.schema:
+            compile_schema(self.schema[SCHEMA])
+
     def required(self):
         return self.schema.get(REQUIRED, False)
 
@@ -80,12 +117,11 @@ class Property(object):
 
         self._check_allowed(value)
 
-        if PATTERN in self.schema:
-            pattern = self.schema[PATTERN]
-            match = re.match(pattern, value)
+        if self._pattern is not None:
+            match = self._pattern.match(value)
             if match is None or match.end() != len(value):
                 raise ValueError('"%s" does not match pattern "%s"' %
-                                 (value, pattern))
+                                 (value, self.schema[PATTERN]))
 
         return value
 
@@ -109,9 +145,8 @@ class Property(object):
         for v in value:
             self._check_allowed(v)
 
-        if SCHEMA in self.schema:
-            prop = Property(self.schema[SCHEMA])
-            children = [prop.validate_data(d) for d in value]
+        if self._items is not None:
+            children = [self._items.validate_data(d) for d in value]
         else:
             children = value
 
@@ -146,10 +181,19 @@ class Property(object):
 
 class Properties(collections.Mapping):
 
-    def __init__(self, schema, data, resolver=lambda d: d, parent_name=None):
-        self.props = dict((k, Property(s, k)) for k, s in schema.items())
+    def __init__(self, schema, data, resolver=lambda d: d, parent_name=None,
+                 epoch=lambda: None):
+        '''
+        Validated property values are memoized for as long as the epoch
+        function returns the same value, since until then the resolver will
+        produce the same result from the same data.
+        '''
+        self.props = compile_schema(schema)
         self.resolve = resolver
         self.data = data
+        self.epoch = epoch
+        # key -> (epoch, copy of the raw data, validated value)
+        self._values = {}
         if parent_name is None:
             self.error_prefix = ''
         else:
@@ -174,11 +218,22 @@ class Properties(collections.Mapping):
         prop = self.props[key]
 
         if key in self.data:
-            value = self.resolve(self.data[key])
-            try:
-                return prop.validate_data(value)
-            except ValueError as e:
-                raise ValueError(self.error_prefix + '%s %s' % (key, str(e)))
+            raw = self.data[key]
+            epoch = self.epoch()
+            cached = self._values.get(key)
+            if cached is None or cached[0] != epoch or cached[1] != raw:
+                try:
+                    value = prop.validate_data(self.resolve(raw))
+                except ValueError as e:
+                    raise ValueError(self.error_prefix +
+                                     '%s %s' % (key, str(e)))
+                cached = (epoch, copy.deepcopy(raw), value)
+                self._values[key] = cached
+            value = cached[2]
+            if isinstance(value, (dict, list)):
+                # Don't let callers modify the memoized value
+                return copy.deepcopy(value)
+            return value
         elif prop.has_default():
             return prop.default()
         elif prop.required():
@@ -14,16 +14,21 @@
 #    under the License.
 
 import base64
-from datetime import datetime
+import copy
+import functools
+import time
 from eventlet.support import greenlets as greenlet
 
+from heat.engine import dbcache
 from heat.engine import event
+from heat.engine import scheduler
 from heat.common import exception
 from heat.db import api as db_api
 from heat.common import identifier
 from heat.engine import timestamp
 from heat.engine.properties import Properties
 
+from heat.openstack.common import cfg
 from heat.openstack.common import log as logging
 
 logger = logging.getLogger(__name__)
@@ -53,8 +58,10 @@ def _register_class(resource_type, resource_class):
 
 class Metadata(object):
     '''
-    A descriptor for accessing the metadata of a resource while ensuring the
-    most up-to-date data is always obtained from the database.
+    A descriptor for accessing the metadata of a resource, which is read from
+    the database and then cached for the rest of the operation. Writes fail
+    with ConcurrentUpdate if the resource was changed by another request
+    since the metadata was read.
     '''
 
     def __get__(self, resource, resource_class):
@@ -63,16 +70,18 @@ class Metadata(object):
             return None
         if resource.id is None:
             return resource.parsed_template('Metadata')
-        rs = db_api.resource_get(resource.stack.context, resource.id)
-        rs.refresh(attrs=['rsrc_metadata'])
-        return rs.rsrc_metadata
+        metadata = dbcache.get(resource, 'rsrc_metadata',
+                               db_api.resource_get_versioned)
+        # Callers may modify the returned data, so don't hand out the cache
+        return copy.deepcopy(metadata)
 
     def __set__(self, resource, metadata):
         '''Update the metadata for the owning resource.'''
         if resource.id is None:
             raise exception.ResourceNotAvailable(resource_name=resource.name)
-        rs = db_api.resource_get(resource.stack.context, resource.id)
-        rs.update_and_save({'rsrc_metadata': metadata})
+        dbcache.update(resource, 'rsrc_metadata', copy.deepcopy(metadata),
+                       db_api.resource_get_versioned,
+                       db_api.resource_update_versioned)
 
 
 class Resource(object):
@@ -96,8 +105,12 @@ class Resource(object):
     # If True, this resource must be created before it can be referenced.
     strict_dependency = True
 
-    created_time = timestamp.Timestamp(db_api.resource_get, 'created_at')
-    updated_time = timestamp.Timestamp(db_api.resource_get, 'updated_at')
+    created_time = timestamp.CachedTimestamp(db_api.resource_get_versioned,
+                                             db_api.resource_update_versioned,
+                                             'created_at')
+    updated_time = timestamp.CachedTimestamp(db_api.resource_get_versioned,
+                                             db_api.resource_update_versioned,
+                                             'updated_at')
 
     metadata = Metadata()
 
@@ -109,6 +122,12 @@ class Resource(object):
     # supported for handle_update, used by update_template_diff_properties
     update_allowed_properties = ()
 
+    # Resource implementations which define check_create_complete() may set
+    # the seconds between polls (None to poll every resource_poll_interval)
+    # and the seconds allowed for creation to complete (None for no limit)
+    create_poll_interval = None
+    create_timeout = None
+
     def __new__(cls, name, json, stack):
         '''Create a new Resource of the appropriate class for its type.'''
 
@@ -131,7 +150,8 @@ class Resource(object):
         self.properties = Properties(self.properties_schema,
                                      self.t.get('Properties', {}),
                                      self.stack.resolve_runtime_data,
-                                     self.name)
+                                     self.name,
+                                     self.stack.resolution_epoch)
 
         resource = db_api.resource_get_by_name_and_stack(self.context,
                                                          name, stack.id)
@@ -272,6 +292,12 @@ class Resource(object):
         '''
         Create the resource. Subclasses should provide a handle_create() method
         to customise creation.
+
+        A handle_create() which starts creation without waiting for it to
+        finish should be paired with a check_create_complete() method, which
+        is passed the return value of handle_create() and returns True once
+        creation is complete. It is polled by the scheduler's reactor, and
+        should raise an exception if creation fails.
         '''
         if self.state in (self.CREATE_IN_PROGRESS, self.CREATE_COMPLETE):
             return 'Resource creation already requested'
@@ -283,8 +309,16 @@ class Resource(object):
             if err:
                 return err
             self.state_set(self.CREATE_IN_PROGRESS)
+            create_data = None
             if callable(getattr(self, 'handle_create', None)):
-                self.handle_create()
+                create_data = self.handle_create()
+            if callable(getattr(self, 'check_create_complete', None)):
+                scheduler.reactor.wait(
+                    functools.partial(self.check_create_complete, create_data),
+                    name=str(self),
+                    interval=self.create_poll_interval,
+                    timeout=self.create_timeout,
+                    on_progress=self._report_progress)
         except Exception as ex:
             # If we get a GreenletExit exception, the create thread has
             # been killed so we should raise allowing this thread to exit
@@ -317,7 +351,8 @@ class Resource(object):
             properties = Properties(self.properties_schema,
                                     json_snippet.get('Properties', {}),
                                     self.stack.resolve_runtime_data,
-                                    self.name)
+                                    self.name,
+                                    self.stack.resolution_epoch)
             err = properties.validate()
             if err:
                 raise ValueError(err)
@@ -398,69 +433,143 @@ class Resource(object):
 
     def resource_id_set(self, inst):
         self.resource_id = inst
+        self.stack.resolution_changed()
         if self.id is not None:
             try:
                 rs = db_api.resource_get(self.context, self.id)
                 rs.update_and_save({'nova_instance': self.resource_id})
+                dbcache.clear(self)
             except Exception as ex:
                 logger.warn('db error %s' % str(ex))
 
-    def _store(self):
-        '''Create the resource in the database'''
+    def cached_attribute(self, key, expire=True):
+        '''
+        Return the value of an attribute stored with cache_attribute(), or
+        None if there is none or (unless expire is False) it is older than
+        attribute_cache_ttl.
+        '''
+        if self.id is None:
+            return None
+        try:
+            cache = dbcache.get(self, 'attr_cache',
+                                db_api.resource_get_versioned)
+        except Exception as ex:
+            logger.warn('db error %s' % str(ex))
+            return None
+
+        entry = (cache or {}).get(key)
+        if entry is None:
+            return None
+        if (expire and
+                time.time() - entry['time'] > cfg.CONF.attribute_cache_ttl):
+            return None
+        return entry['value']
+
+    def cache_attribute(self, key, value):
+        '''
+        Store the value of an attribute looked up from another service, so
+        that it can be reused after the stack is next loaded.
+        '''
+        if self.id is None:
+            return
+
+        def store():
+            cache = dict(dbcache.get(self, 'attr_cache',
+                                     db_api.resource_get_versioned) or {})
+            cache[key] = {'value': value, 'time': time.time()}
+            dbcache.update(self, 'attr_cache', cache,
+                           db_api.resource_get_versioned,
+                           db_api.resource_update_versioned)
+
+        try:
+            try:
+                store()
+            except exception.ConcurrentUpdate:
+                # Add to the attributes stored by the other request
+                store()
+        except Exception as ex:
+            logger.warn('db error %s' % str(ex))
+
+    def _store(self, add_event=False):
+        '''
+        Create the resource in the database, adding the event for its
+        initial state (if add_event is True) and updating the stack's
+        timestamp in the same transaction.
+        '''
         try:
             rs = {'state': self.state,
+                  'state_description': self.state_description,
                   'stack_id': self.stack.id,
                   'nova_instance': self.resource_id,
                   'name': self.name,
                   'rsrc_metadata': self.metadata,
                   'stack_name': self.stack.name}
+            ev = add_event and self._event(self.state,
+                                           self.state_description) or None
 
-            new_rs = db_api.resource_create(self.context, rs)
+            new_rs = db_api.resource_create(self.context, rs,
+                                            ev and ev.db_values())
             self.id = new_rs.id
-
-            self.stack.updated_time = datetime.utcnow()
+            dbcache.clear(self.stack)
 
         except Exception as ex:
             logger.error('DB error %s' % str(ex))
 
+    def _event(self, new_state, reason):
+        return event.Event(self.context, self.stack, self,
+                           new_state, reason,
+                           self.resource_id, self.properties)
+
     def _add_event(self, new_state, reason):
         '''Add a state change event to the database'''
-        ev = event.Event(self.context, self.stack, self,
-                         new_state, reason,
-                         self.resource_id, self.properties)
+        ev = self._event(new_state, reason)
 
         try:
             ev.store()
         except Exception as ex:
             logger.error('DB error %s' % str(ex))
 
-    def _store_or_update(self, new_state, reason):
+    def _store_or_update(self, new_state, reason, add_event=False):
         self.state = new_state
         self.state_description = reason
 
         if self.id is not None:
+            # Update the resource, add the event and touch the stack's
+            # timestamp in a single transaction
             try:
-                rs = db_api.resource_get(self.context, self.id)
-                rs.update_and_save({'state': self.state,
-                                    'state_description': reason,
-                                    'nova_instance': self.resource_id})
-
-                self.stack.updated_time = datetime.utcnow()
+                ev = add_event and self._event(new_state, reason) or None
+                db_api.resource_state_set(
+                    self.context, self.id, self.stack.id,
+                    {'state': self.state,
+                     'state_description': reason,
+                     'nova_instance': self.resource_id},
+                    ev and ev.db_values())
+                dbcache.changed(self)
+                dbcache.clear(self.stack)
             except Exception as ex:
                 logger.error('DB error %s' % str(ex))
+            return
 
         # store resource in DB on transition to CREATE_IN_PROGRESS
         # all other transistions (other than to DELETE_COMPLETE)
-        # should be handled by the update_and_save above..
-        elif new_state == self.CREATE_IN_PROGRESS:
-            self._store()
+        # should be handled by the resource_state_set above..
+        if new_state == self.CREATE_IN_PROGRESS:
+            self._store(add_event)
+        elif add_event:
+            self._add_event(new_state, reason)
 
-    def state_set(self, new_state, reason="state changed"):
-        old_state = self.state
-        self._store_or_update(new_state, reason)
+    def _report_progress(self, elapsed, polls):
+        '''
+        Record the progress of an operation polled by the reactor as the
+        description of the current state.
+        '''
+        self._store_or_update(self.state,
+                              'in progress for %d seconds (%d checks)' %
+                              (elapsed, polls))
 
-        if new_state != old_state:
-            self._add_event(new_state, reason)
+    def state_set(self, new_state, reason="state changed"):
+        self._store_or_update(new_state, reason, new_state != self.state)
+        self.stack.resolution_changed()
 
     def FnGetRefId(self):
         '''
@@ -490,6 +599,13 @@ class Resource(object):
         raise NotImplementedError("Update not implemented for Resource %s"
                                   % type(self))
 
+    def group_members(self):
+        '''
+        Return the database records of the members of a group resource, or
+        None for resources which are not groups.
+        '''
+        return None
+
     def metadata_update(self, metadata):
         '''
         No-op for resources which don't explicitly override this method
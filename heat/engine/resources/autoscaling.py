@@ -13,16 +13,68 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import itertools
+import re
+
+import eventlet
+
 from heat.common import exception
+from heat.db import api as db_api
+from heat.engine import clients
 from heat.engine.resources import instance
 from heat.engine import resource
+from heat.engine import scheduler
 
+from heat.openstack.common import cfg
 from heat.openstack.common import log as logging
 from heat.openstack.common import timeutils
 from heat.engine.properties import Properties
 
 logger = logging.getLogger(__name__)
 
+# Key of the warm pool occupancy in the metadata of a group
+WARM_POOL_METADATA = 'WarmPool'
+
+# ISO 8601 duration, as used for the PauseTime of a rolling update
+_PAUSE_TIME_RE = re.compile(r'^PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?$')
+
+
+def _rolling_update_policy(json_snippet):
+    '''
+    Return the (MaxBatchSize, PauseTime in seconds) of the
+    AutoScalingRollingUpdate UpdatePolicy in a group's template snippet, or
+    None if the group has no rolling update policy.
+    '''
+    update_policy = json_snippet.get('UpdatePolicy') or {}
+    policy = update_policy.get('AutoScalingRollingUpdate')
+    if policy is None:
+        return None
+
+    try:
+        batch_size = int(policy.get('MaxBatchSize', 1))
+    except (TypeError, ValueError):
+        raise ValueError('MaxBatchSize must be an integer')
+    if batch_size < 1:
+        raise ValueError('MaxBatchSize must be at least 1')
+
+    match = _PAUSE_TIME_RE.match(policy.get('PauseTime', 'PT0S'))
+    if match is None:
+        raise ValueError('PauseTime must be an ISO 8601 duration, e.g. PT5M')
+    hours, minutes, seconds = [int(g or 0) for g in match.groups()]
+
+    return batch_size, (hours * 60 + minutes) * 60 + seconds
+
+
+def _checked_rolling_update_policy(json_snippet):
+    '''
+    As _rolling_update_policy(), but raise an Error describing the problem if
+    the policy is invalid.
+    '''
+    try:
+        return _rolling_update_policy(json_snippet)
+    except ValueError as ex:
+        raise exception.Error('Invalid UpdatePolicy: %s' % str(ex))
+
 
 class CooldownMixin(object):
     '''
@@ -40,9 +92,11 @@ class CooldownMixin(object):
 
         metadata = self.metadata
         if metadata and cooldown != 0:
-            last_adjust = metadata.keys()[0]
-            if not timeutils.is_older_than(last_adjust, cooldown):
-                inprogress = True
+            adjustments = [k for k in metadata if k != WARM_POOL_METADATA]
+            if adjustments:
+                last_adjust = adjustments[0]
+                if not timeutils.is_older_than(last_adjust, cooldown):
+                    inprogress = True
         return inprogress
 
     def _cooldown_timestamp(self, reason):
@@ -51,8 +105,73 @@ class CooldownMixin(object):
         # we could maintain event history here, but since we only need
         # the latest event for cooldown, just store that for now
         metadata = {timeutils.strtime(): reason}
+        metadata.update(self._cooldown_preserved_metadata())
         self.metadata = metadata
 
+    def _cooldown_preserved_metadata(self):
+        '''
+        Return any existing metadata which should be kept when the cooldown
+        timestamp is saved.
+        '''
+        return {}
+
+
+class GroupedInstanceMixin(object):
+    '''
+    Mixed into the AWS::EC2::Instance resource class to supress event
+    transitions, since the scaling-group instances are not "real" resources,
+    ie defined in the template, which causes problems for event handling
+    since we can't look up the resources via parser.Stack
+    '''
+    def state_set(self, new_state, reason="state changed"):
+        self._store_or_update(new_state, reason)
+
+    def standby(self):
+        '''
+        Suspend the server, so that it is kept booted and ready to be
+        activated. Returns an error string on failure, otherwise None.
+        '''
+        return self._server_action('suspend', 'SUSPENDED')
+
+    def activate(self):
+        '''
+        Resume a server previously suspended by standby(). Returns an error
+        string on failure, otherwise None.
+        '''
+        return self._server_action('resume', 'ACTIVE')
+
+    def _server_action(self, action, status):
+        if self.resource_id is None:
+            return None
+        try:
+            server = self.nova().servers.get(self.resource_id)
+            getattr(server, action)()
+            server.get()
+            while server.status != status:
+                if server.status == 'ERROR':
+                    return '%s of instance[%s] failed' % (action, self.name)
+                eventlet.sleep(1)
+                server.get()
+        except clients.novaclient.exceptions.ClientException as ex:
+            return str(ex)
+
+
+# The GroupedInstanceMixin subclasses, by the Instance class they extend
+_grouped_instance_classes = {}
+
+
+def _grouped_instance_class(instance_class):
+    '''
+    Return the class of the members of a group, with GroupedInstanceMixin
+    mixed into the registered AWS::EC2::Instance class.
+    '''
+    if instance_class not in _grouped_instance_classes:
+        class GroupedInstance(GroupedInstanceMixin, instance_class):
+            pass
+
+        _grouped_instance_classes[instance_class] = GroupedInstance
+    return _grouped_instance_classes[instance_class]
+
 
 class InstanceGroup(resource.Resource):
     tags_schema = {'Key': {'Type': 'String',
@@ -72,56 +191,319 @@ class InstanceGroup(resource.Resource):
                             'Schema': tags_schema}}
     }
 
-    def __init__(self, name, json_snippet, stack):
-        super(InstanceGroup, self).__init__(name, json_snippet, stack)
-        # resource_id is a list of resources
+    # States of members that are booted but held in standby in the warm
+    # pool, rather than serving as part of the group
+    MEMBER_POOL_IN_PROGRESS = 'POOL_IN_PROGRESS'
+    MEMBER_POOLED = 'POOLED'
+    # A member of the warm pool which could not be booted or deleted, and
+    # remains to be cleaned up
+    MEMBER_POOL_FAILED = 'POOL_FAILED'
+    MEMBER_POOL_STATES = (MEMBER_POOL_IN_PROGRESS, MEMBER_POOLED,
+                          MEMBER_POOL_FAILED)
+
+    # Number of times a new member's name may be found to have been taken
+    # by a concurrent operation on the group before giving up
+    MAX_NAME_CONFLICTS = 10
+
+    # template keys and properties supported for handle_update,
+    # note trailing comma is required for a single item to get a tuple
+    update_allowed_keys = ('Properties', 'UpdatePolicy',)
+    update_allowed_properties = ('Size', 'LoadBalancerNames',
+                                 'LaunchConfigurationName',)
+
+    def validate(self):
+        res = super(InstanceGroup, self).validate()
+        if res:
+            return res
+
+        try:
+            _rolling_update_policy(self.t)
+        except ValueError as ex:
+            return {'Error': 'Invalid UpdatePolicy: %s' % str(ex)}
 
     def handle_create(self):
         self.resize(int(self.properties['Size']), raise_on_error=True)
 
     def handle_update(self, json_snippet):
-        # TODO(asalkeld) if the only thing that has changed is the size then
-        # call resize. Maybe have an attribute of the properties that can mark
-        # it "update-able" so each resource doesn't have to figure this out.
-        return self.UPDATE_REPLACE
+        # Check the new UpdatePolicy before changing anything
+        rolling_update = _checked_rolling_update_policy(json_snippet)
 
-    def _make_instance(self, name):
+        try:
+            tmpl_diff = self.update_template_diff(json_snippet)
+        except NotImplementedError:
+            logger.error("Could not update %s, invalid key" % self.name)
+            return self.UPDATE_REPLACE
+
+        try:
+            prop_diff = self.update_template_diff_properties(json_snippet)
+        except NotImplementedError:
+            logger.error("Could not update %s, invalid Property" % self.name)
+            return self.UPDATE_REPLACE
 
-        Instance = resource.get_class('AWS::EC2::Instance')
+        if 'LaunchConfigurationName' in prop_diff and rolling_update is None:
+            # Without a rolling update policy, the whole group is replaced
+            return self.UPDATE_REPLACE
+
+        # If Properties has changed, update self.properties, so we
+        # get the new values during any subsequent adjustment
+        if prop_diff:
+            self.properties = Properties(self.properties_schema,
+                                         json_snippet.get('Properties', {}),
+                                         self.stack.resolve_runtime_data,
+                                         self.name,
+                                         self.stack.resolution_epoch)
 
-        class GroupedInstance(Instance):
-            '''
-            Subclass instance.Instance to supress event transitions, since the
-            scaling-group instances are not "real" resources, ie defined in the
-            template, which causes problems for event handling since we can't
-            look up the resources via parser.Stack
-            '''
-            def state_set(self, new_state, reason="state changed"):
-                self._store_or_update(new_state, reason)
+            if 'LaunchConfigurationName' in prop_diff:
+                self.replace_members(*rolling_update)
+            if 'Size' in prop_diff:
+                self.resize(int(self.properties['Size']), raise_on_error=True)
+            if 'LoadBalancerNames' in prop_diff:
+                self._lb_reload()
+
+        return self.UPDATE_COMPLETE
+
+    def _make_instance(self, name):
+        GroupedInstance = _grouped_instance_class(
+            resource.get_class('AWS::EC2::Instance'))
 
         conf = self.properties['LaunchConfigurationName']
-        instance_definition = self.stack.t['Resources'][conf]
+        instance_definition = self.stack[conf].t
         return GroupedInstance(name, instance_definition, self.stack)
 
+    @staticmethod
+    def _member_index(name):
+        '''Return the index from the name of a member, e.g. 3 for "Group-3"'''
+        return int(name.rpartition('-')[2])
+
+    def _all_members(self):
+        '''
+        Return the database records of the members of the group, including
+        any in the warm pool, ordered by the index in their names.
+        '''
+        if self.id is None:
+            return []
+
+        members = db_api.group_member_get_all_by_group(self.context, self.id)
+        if not members and self.resource_id is not None:
+            members = self._import_legacy_members()
+
+        return sorted(members, key=lambda m: self._member_index(m.name))
+
+    def _members(self):
+        '''Return the database records of the active members of the group.'''
+        return [m for m in self._all_members()
+                if m.state not in self.MEMBER_POOL_STATES]
+
+    def _pool_members(self):
+        '''Return the database records of the members in the warm pool.'''
+        return [m for m in self._all_members()
+                if m.state in self.MEMBER_POOL_STATES]
+
+    def _new_member_names(self, count):
+        '''
+        Return names for count new members, numbered after the highest
+        existing one.
+        '''
+        members = self._all_members()
+        if members:
+            first = self._member_index(members[-1].name) + 1
+        else:
+            first = 0
+        return ['%s-%d' % (self.name, x) for x in range(first, first + count)]
+
+    def _reserve_members(self, count, state):
+        '''
+        Record count new members in the group, so that their names are
+        reserved, and return their database records. A name taken by a
+        concurrent operation on the group is skipped in favour of the next.
+        '''
+        members = []
+        conflicts = 0
+        while len(members) < count:
+            for name in self._new_member_names(count - len(members)):
+                try:
+                    members.append(db_api.group_member_create(self.context, {
+                        'group_id': self.id,
+                        'name': name,
+                        'state': state}))
+                except exception.Duplicate:
+                    conflicts += 1
+                    if conflicts > self.MAX_NAME_CONFLICTS:
+                        for member in members:
+                            db_api.group_member_delete(self.context,
+                                                       member.id)
+                        raise exception.Error('Unable to reserve names for '
+                                              'new members of %s' % self.name)
+                    break
+        return members
+
+    def _import_legacy_members(self):
+        '''
+        Groups created before the group_member table existed store the member
+        names as a comma-delimited list in resource_id; move them into the
+        table.
+        '''
+        members = []
+        for name in self.resource_id.split(','):
+            rs = db_api.resource_get_by_name_and_stack(self.context, name,
+                                                       self.stack.id)
+            members.append(db_api.group_member_create(self.context, {
+                'group_id': self.id,
+                'name': name,
+                'state': rs and rs.state,
+                'physical_resource_id': rs and rs.nova_instance}))
+
+        self.resource_id_set(None)
+        return members
+
+    def group_members(self):
+        '''
+        Return the database records of the members of the group, including
+        any in the warm pool.
+        '''
+        return self._all_members()
+
+    def get_instance_names(self):
+        '''Return the names of the members of the group, in index order.'''
+        return [m.name for m in self._members()]
+
+    @staticmethod
+    def _batches(names):
+        '''
+        Split a list of member names into the batches in which they should be
+        created or deleted.
+        '''
+        batch_size = max(1, cfg.CONF.instance_group_batch_size)
+        for start in range(0, len(names), batch_size):
+            yield names[start:start + batch_size]
+
+    def _run_batched(self, names, action):
+        '''
+        Run action (a function taking a member name and returning an error
+        string or None) on each of the named members, concurrently within
+        each batch. Yields a (name, error_str) tuple as each member completes.
+        No further batches are started once a member has failed.
+        '''
+        pool = eventlet.GreenPool(max(1, cfg.CONF.instance_group_concurrency))
+
+        def run(name):
+            return name, action(name)
+
+        for batch in self._batches(names):
+            failed = False
+            for name, error_str in pool.imap(run, batch):
+                failed = failed or error_str is not None
+                yield name, error_str
+            if failed:
+                break
+
+    def _create_members(self, count, pooled=False):
+        '''
+        Create count new members, recording all of them in the group before
+        any is created so that their names are reserved. If pooled is True,
+        the members are put in standby in the warm pool. Yields a
+        (name, error_str) tuple as each member completes.
+        '''
+        if pooled:
+            state = self.MEMBER_POOL_IN_PROGRESS
+        else:
+            state = self.CREATE_IN_PROGRESS
+        members = dict((m.name, m)
+                       for m in self._reserve_members(count, state))
+        names = sorted(members, key=self._member_index)
+
+        def create_member(name):
+            logger.info('creating inst %s' % name)
+            member = members.pop(name)
+            inst = self._make_instance(name)
+            error_str = inst.create()
+            if error_str is None and pooled:
+                error_str = inst.standby()
+
+            if error_str is None:
+                state = pooled and self.MEMBER_POOLED or self.CREATE_COMPLETE
+            elif pooled:
+                # A failed pool member is of no use, so get rid of it now
+                if inst.destroy() is None:
+                    db_api.group_member_delete(self.context, member.id)
+                    return error_str
+                state = self.MEMBER_POOL_FAILED
+            else:
+                # A failed member may still have a server, so it is kept
+                # in the group to be cleaned up on delete
+                state = self.CREATE_FAILED
+            db_api.group_member_update(self.context, member.id, {
+                'state': state,
+                'physical_resource_id': inst.resource_id})
+            return error_str
+
+        for result in self._run_batched(names, create_member):
+            yield result
+
+        # Release the names of any members not started after a failure
+        for member in members.values():
+            db_api.group_member_delete(self.context, member.id)
+
+    def _promote_members(self, members):
+        '''
+        Activate the given members of the warm pool and move them into the
+        group. Yields a (name, error_str) tuple as each member completes.
+        '''
+        member_ids = dict((m.name, m.id) for m in members)
+
+        def promote_member(name):
+            logger.info('promoting pooled inst %s' % name)
+            error_str = self._make_instance(name).activate()
+            if error_str is None:
+                state = self.CREATE_COMPLETE
+            else:
+                state = self.CREATE_FAILED
+            db_api.group_member_update(self.context, member_ids[name],
+                                       {'state': state})
+            return error_str
+
+        return self._run_batched([m.name for m in members], promote_member)
+
+    def _delete_members(self, members):
+        '''
+        Delete the given members, removing each from the group once it has
+        been deleted. Yields a (name, error_str) tuple as each member
+        completes.
+        '''
+        member_ids = dict((m.name, m.id) for m in members)
+        pooled = set(m.name for m in members
+                     if m.state in self.MEMBER_POOL_STATES)
+
+        def delete_member(name):
+            logger.info('deleting inst %s' % name)
+            error_str = self._make_instance(name).destroy()
+            if error_str is None:
+                db_api.group_member_delete(self.context, member_ids[name])
+            else:
+                # A member of the warm pool must stay out of the group
+                if name in pooled:
+                    state = self.MEMBER_POOL_FAILED
+                else:
+                    state = self.DELETE_FAILED
+                db_api.group_member_update(self.context, member_ids[name],
+                                           {'state': state})
+            return error_str
+
+        return self._run_batched([m.name for m in members], delete_member)
+
     def handle_delete(self):
-        if self.resource_id is not None:
-            inst_list = self.resource_id.split(',')
-            logger.debug('handle_delete %s' % str(inst_list))
-            for victim in inst_list:
-                logger.debug('handle_delete %s' % victim)
-                inst = self._make_instance(victim)
-                error_str = inst.destroy()
-                if error_str is not None:
-                    # try suck out the grouped resouces failure reason
-                    # and re-raise
-                    raise exception.NestedResourceFailure(message=error_str)
+        members = self._all_members()
+        logger.debug('handle_delete %s' % [m.name for m in members])
+        for name, error_str in self._delete_members(members):
+            if error_str is not None:
+                # try suck out the grouped resouces failure reason
+                # and re-raise
+                raise exception.NestedResourceFailure(message=error_str)
 
     def resize(self, new_capacity, raise_on_error=False):
-        inst_list = []
-        if self.resource_id is not None:
-            inst_list = sorted(self.resource_id.split(','))
+        members = self._members()
 
-        capacity = len(inst_list)
+        capacity = len(members)
         if new_capacity == capacity:
             logger.debug('no change in capacity %d' % capacity)
             return
@@ -129,39 +511,164 @@ class InstanceGroup(resource.Resource):
                                                            new_capacity))
 
         if new_capacity > capacity:
-            # grow
-            for x in range(capacity, new_capacity):
-                name = '%s-%d' % (self.name, x)
-                inst = self._make_instance(name)
-                inst_list.append(name)
-                self.resource_id_set(','.join(inst_list))
-                logger.info('creating inst')
-                error_str = inst.create()
-                if raise_on_error and error_str is not None:
-                    # try suck out the grouped resouces failure reason
-                    # and re-raise
-                    raise exception.NestedResourceFailure(message=error_str)
+            # grow, taking members from the warm pool before booting new ones
+            pooled = [m for m in self._pool_members()
+                      if m.state == self.MEMBER_POOLED]
+            pooled = pooled[:new_capacity - capacity]
+            results = itertools.chain(
+                self._promote_members(pooled),
+                self._create_members(new_capacity - capacity - len(pooled)))
         else:
             # shrink (kill largest numbered first)
-            del_list = inst_list[new_capacity:]
-            for victim in reversed(del_list):
-                inst = self._make_instance(victim)
-                inst.destroy()
-                inst_list.remove(victim)
-                self.resource_id_set(','.join(inst_list))
+            results = self._delete_members(
+                list(reversed(members[new_capacity:])))
+
+        self._check_results('resize', results, raise_on_error)
 
         # notify the LoadBalancer to reload it's config to include
         # the changes in instances we have just made.
+        self._lb_reload()
+
+        if new_capacity > capacity and pooled:
+            self._record_pool_occupancy()
+
+    def replace_members(self, batch_size, pause_time=0):
+        '''
+        Replace the members of the group with ones built from the current
+        launch configuration, batch_size members at a time, pausing for
+        pause_time seconds between batches. The replacements in each batch
+        are created before the members they replace are deleted, so the group
+        never falls below its capacity.
+        '''
+        old_members = self._members()
+        logger.debug('replacing %d members of %s in batches of %d' %
+                     (len(old_members), self.name, batch_size))
+
+        for start in range(0, len(old_members), batch_size):
+            if start and pause_time:
+                eventlet.sleep(pause_time)
+
+            batch = old_members[start:start + batch_size]
+            self._check_results('rolling update',
+                                self._create_members(len(batch)), True)
+            self._check_results('rolling update',
+                                self._delete_members(list(reversed(batch))),
+                                True)
+            self._lb_reload()
+
+        if self._pool_members():
+            # The warm pool was booted from the old launch configuration
+            self._check_results('rolling update',
+                                self._delete_members(self._pool_members()),
+                                False)
+            self._schedule_refill()
+
+    def _check_results(self, operation, results, raise_on_error):
+        '''
+        Wait for the (name, error_str) results of an operation on members of
+        the group, then log and optionally raise any errors.
+        '''
+        errors = []
+        completed = []
+        for name, error_str in results:
+            if error_str is None:
+                completed.append(name)
+            else:
+                errors.append(error_str)
+
+        if errors:
+            message = '; '.join(errors)
+            if completed:
+                message += ' (completed members: %s)' % ', '.join(completed)
+            logger.error('%s of %s failed: %s' % (operation, self.name,
+                                                  message))
+            if raise_on_error:
+                # try suck out the grouped resouces failure reason
+                # and re-raise
+                raise exception.NestedResourceFailure(message=message)
+
+    def _lb_reload(self):
+        '''
+        Notify the LoadBalancers of the group of its current members.
+        '''
         if self.properties['LoadBalancerNames']:
-            # convert the list of instance names into a list of instance id's
-            id_list = []
-            for inst_name in inst_list:
-                inst = self._make_instance(inst_name)
-                id_list.append(inst.FnGetRefId())
+            # convert the list of members into a list of instance id's
+            id_list = [m.physical_resource_id or m.name
+                       for m in self._members()]
 
             for lb in self.properties['LoadBalancerNames']:
                 self.stack[lb].reload(id_list)
 
+    def _warm_pool_size(self):
+        '''Return the number of members to hold in the warm pool.'''
+        return 0
+
+    def fill_pool(self):
+        '''
+        Boot or delete members of the warm pool so that it holds the
+        configured number of members, and record its occupancy in the
+        metadata and events of the group.
+        '''
+        size = self._warm_pool_size()
+        pool = self._pool_members()
+
+        # Try again to clean up members that failed to boot or delete
+        failed = [m for m in pool if m.state == self.MEMBER_POOL_FAILED]
+        pool = [m for m in pool if m.state != self.MEMBER_POOL_FAILED]
+        results = list(self._delete_members(failed))
+
+        if len(pool) < size:
+            results.extend(self._create_members(size - len(pool),
+                                                pooled=True))
+        else:
+            results.extend(self._delete_members(list(reversed(pool[size:]))))
+
+        for name, error_str in results:
+            if error_str is not None:
+                logger.warn('warm pool of %s not filled: %s' %
+                            (self.name, error_str))
+
+        self._record_pool_occupancy()
+
+    def _refill_pool(self):
+        '''
+        Replace any members taken from the warm pool. A failure is logged
+        rather than failing the operation which emptied the pool.
+        '''
+        if not self._warm_pool_size():
+            return
+        try:
+            self.fill_pool()
+        except Exception:
+            logger.exception('Failed to fill the warm pool of %s' % self.name)
+
+    def _schedule_refill(self):
+        '''
+        Queue a refill of the warm pool as a stack operation of its own, so
+        that booting the pool does not hold up the scaling operation which
+        emptied it. It is cancelled along with the other operations on the
+        stack.
+        '''
+        if not self._warm_pool_size():
+            return
+        scheduler.work_queue.submit(scheduler.WorkQueue.NORMAL,
+                                    self.context.tenant_id, self.stack.id,
+                                    self._refill_pool)
+
+    def _record_pool_occupancy(self):
+        '''
+        Record the number of members available in the warm pool in the
+        metadata and events of the group.
+        '''
+        size = self._warm_pool_size()
+        available = len([m for m in self._pool_members()
+                         if m.state == self.MEMBER_POOLED])
+        metadata = dict(self.metadata or {})
+        metadata[WARM_POOL_METADATA] = {'Size': size, 'Available': available}
+        self.metadata = metadata
+        self._add_event(self.state, 'warm pool has %d of %d members' %
+                        (available, size))
+
     def FnGetRefId(self):
         return unicode(self.name)
 
@@ -189,18 +696,17 @@ class AutoScalingGroup(InstanceGroup, CooldownMixin):
                             'Implemented': False},
         'LoadBalancerNames': {'Type': 'List'},
         'Tags': {'Type': 'List', 'Schema': {'Type': 'Map',
-                                            'Schema': tags_schema}}
+                                            'Schema': tags_schema}},
+        'WarmPoolSize': {'Type': 'Number'}
     }
 
     # template keys and properties supported for handle_update,
     # note trailing comma is required for a single item to get a tuple
-    update_allowed_keys = ('Properties',)
+    update_allowed_keys = ('Properties', 'UpdatePolicy',)
     update_allowed_properties = ('MaxSize', 'MinSize',
-                                 'Cooldown', 'DesiredCapacity',)
-
-    def __init__(self, name, json_snippet, stack):
-        super(AutoScalingGroup, self).__init__(name, json_snippet, stack)
-        # resource_id is a list of resources
+                                 'Cooldown', 'DesiredCapacity',
+                                 'WarmPoolSize', 'LoadBalancerNames',
+                                 'LaunchConfigurationName',)
 
     def handle_create(self):
 
@@ -212,7 +718,22 @@ class AutoScalingGroup(InstanceGroup, CooldownMixin):
         self.adjust(num_to_create, adjustment_type='ExactCapacity',
                     raise_on_error=True)
 
+    def _warm_pool_size(self):
+        return max(0, int(self.properties['WarmPoolSize'] or 0))
+
+    def _cooldown_preserved_metadata(self):
+        # Don't lose the warm pool occupancy
+        if not self._warm_pool_size():
+            return {}
+        metadata = self.metadata or {}
+        if WARM_POOL_METADATA not in metadata:
+            return {}
+        return {WARM_POOL_METADATA: metadata[WARM_POOL_METADATA]}
+
     def handle_update(self, json_snippet):
+        # Check the new UpdatePolicy before changing anything
+        rolling_update = _checked_rolling_update_policy(json_snippet)
+
         try:
             tmpl_diff = self.update_template_diff(json_snippet)
         except NotImplementedError:
@@ -225,21 +746,27 @@ class AutoScalingGroup(InstanceGroup, CooldownMixin):
             logger.error("Could not update %s, invalid Property" % self.name)
             return self.UPDATE_REPLACE
 
+        if 'LaunchConfigurationName' in prop_diff and rolling_update is None:
+            # Without a rolling update policy, the whole group is replaced
+            return self.UPDATE_REPLACE
+
         # If Properties has changed, update self.properties, so we
         # get the new values during any subsequent adjustment
         if prop_diff:
             self.properties = Properties(self.properties_schema,
                                          json_snippet.get('Properties', {}),
                                          self.stack.resolve_runtime_data,
-                                         self.name)
+                                         self.name,
+                                         self.stack.resolution_epoch)
+
+            if 'LaunchConfigurationName' in prop_diff:
+                self.replace_members(*rolling_update)
+            if 'LoadBalancerNames' in prop_diff:
+                self._lb_reload()
 
             # Get the current capacity, we may need to adjust if
             # MinSize or MaxSize has changed
-            inst_list = []
-            if self.resource_id is not None:
-                inst_list = sorted(self.resource_id.split(','))
-
-            capacity = len(inst_list)
+            capacity = len(self.get_instance_names())
 
             # Figure out if an adjustment is required
             new_capacity = None
@@ -257,6 +784,9 @@ class AutoScalingGroup(InstanceGroup, CooldownMixin):
                 self.adjust(new_capacity, adjustment_type='ExactCapacity',
                             raise_on_error=True)
 
+            if 'WarmPoolSize' in prop_diff:
+                self.fill_pool()
+
         return self.UPDATE_COMPLETE
 
     def adjust(self, adjustment, adjustment_type='ChangeInCapacity',
@@ -266,11 +796,7 @@ class AutoScalingGroup(InstanceGroup, CooldownMixin):
                         (self.name, self.properties['Cooldown']))
             return
 
-        inst_list = []
-        if self.resource_id is not None:
-            inst_list = sorted(self.resource_id.split(','))
-
-        capacity = len(inst_list)
+        capacity = len(self.get_instance_names())
         if adjustment_type == 'ChangeInCapacity':
             new_capacity = capacity + adjustment
         elif adjustment_type == 'ExactCapacity':
@@ -281,18 +807,18 @@ class AutoScalingGroup(InstanceGroup, CooldownMixin):
 
         if new_capacity > int(self.properties['MaxSize']):
             logger.warn('can not exceed %s' % self.properties['MaxSize'])
-            return
-        if new_capacity < int(self.properties['MinSize']):
+        elif new_capacity < int(self.properties['MinSize']):
             logger.warn('can not be less than %s' % self.properties['MinSize'])
-            return
-
-        if new_capacity == capacity:
+        elif new_capacity == capacity:
             logger.debug('no change in capacity %d' % capacity)
-            return
+        else:
+            self.resize(new_capacity, raise_on_error=raise_on_error)
 
-        self.resize(new_capacity, raise_on_error=raise_on_error)
+            self._cooldown_timestamp("%s : %s" % (adjustment_type,
+                                                  adjustment))
 
-        self._cooldown_timestamp("%s : %s" % (adjustment_type, adjustment))
+        # Fill the warm pool, replacing any members taken from it
+        self._schedule_refill()
 
     def FnGetRefId(self):
         return unicode(self.name)
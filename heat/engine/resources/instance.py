@@ -20,6 +20,7 @@ from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 import pkgutil
 from urlparse import urlparse
+import zlib
 
 from heat.engine import clients
 from heat.engine import resource
@@ -32,6 +33,56 @@ from heat.openstack.common import log as logging
 logger = logging.getLogger(__name__)
 
 
+# MIME parts built from the static heat/cloudinit files, shared by every
+# instance in the process; see _static_userdata_parts()
+_static_parts = None
+
+
+def _make_subpart(content, filename, subtype=None):
+    if subtype is None:
+        subtype = os.path.splitext(filename)[0]
+    msg = MIMEText(content, _subtype=subtype)
+    msg.add_header('Content-Disposition', 'attachment',
+                   filename=filename)
+    return msg
+
+
+def _static_userdata_parts():
+    '''
+    Return a dict of the MIME parts for the cloudinit files shipped with
+    heat, keyed by filename. The files are read and the parts built only
+    once per process, since they are identical for every instance.
+    '''
+    global _static_parts
+
+    if _static_parts is None:
+        def read_cloudinit_file(fn):
+            return pkgutil.get_data('heat', 'cloudinit/%s' % fn)
+
+        attachments = [(read_cloudinit_file('config'), 'cloud-config'),
+                       (read_cloudinit_file('part-handler.py'),
+                        'part-handler.py'),
+                       (read_cloudinit_file('loguserdata.py'),
+                        'loguserdata.py', 'x-shellscript')]
+
+        _static_parts = dict((args[1], _make_subpart(*args))
+                             for args in attachments)
+
+    return _static_parts
+
+
+def _compress(data):
+    '''
+    Return the gzip-compressed form of a userdata blob, which cloud-init
+    detects and decompresses on boot.
+    '''
+    # Setting 16 in wbits produces a gzip header (with a zero timestamp, so
+    # the output is identical for identical input) rather than a zlib one.
+    # GzipFile can't be used as it has no mtime argument in Python 2.6.
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
 class Restarter(resource.Resource):
     properties_schema = {'InstanceId': {'Type': 'String',
                                         'Required': True}}
@@ -128,8 +179,12 @@ class Instance(resource.Resource):
 
     def _ipaddress(self):
         '''
-        Return the server's IP address, fetching it from Nova if necessary
+        Return the server's IP address, fetching it from Nova if it is not
+        known or cached
         '''
+        if self.ipaddress is None:
+            self.ipaddress = self.cached_attribute('ipaddress')
+
         if self.ipaddress is None:
             try:
                 server = self.nova().servers.get(self.resource_id)
@@ -137,6 +192,8 @@ class Instance(resource.Resource):
                 logger.warn('Instance IP address not found (%s)' % str(ex))
             else:
                 self._set_ipaddress(server.networks)
+                if self.ipaddress is not None:
+                    self.cache_attribute('ipaddress', self.ipaddress)
 
         return self.ipaddress or '0.0.0.0'
 
@@ -162,24 +219,9 @@ class Instance(resource.Resource):
     def _build_userdata(self, userdata):
         if not self.mime_string:
             # Build mime multipart data blob for cloudinit userdata
+            static_parts = _static_userdata_parts()
 
-            def make_subpart(content, filename, subtype=None):
-                if subtype is None:
-                    subtype = os.path.splitext(filename)[0]
-                msg = MIMEText(content, _subtype=subtype)
-                msg.add_header('Content-Disposition', 'attachment',
-                               filename=filename)
-                return msg
-
-            def read_cloudinit_file(fn):
-                return pkgutil.get_data('heat', 'cloudinit/%s' % fn)
-
-            attachments = [(read_cloudinit_file('config'), 'cloud-config'),
-                           (read_cloudinit_file('part-handler.py'),
-                            'part-handler.py'),
-                           (userdata, 'cfn-userdata', 'x-cfninitdata'),
-                           (read_cloudinit_file('loguserdata.py'),
-                            'loguserdata.py', 'x-shellscript')]
+            attachments = [(userdata, 'cfn-userdata', 'x-cfninitdata')]
 
             if 'Metadata' in self.t:
                 attachments.append((json.dumps(self.metadata),
@@ -206,10 +248,17 @@ class Instance(resource.Resource):
             attachments.append((boto_cfg,
                                 'cfn-boto-cfg', 'x-cfninitdata'))
 
-            subparts = [make_subpart(*args) for args in attachments]
+            instance_parts = [_make_subpart(*args) for args in attachments]
+            subparts = ([static_parts['cloud-config'],
+                         static_parts['part-handler.py'],
+                         instance_parts[0],
+                         static_parts['loguserdata.py']] +
+                        instance_parts[1:])
             mime_blob = MIMEMultipart(_subparts=subparts)
 
             self.mime_string = mime_blob.as_string()
+            if cfg.CONF.compress_instance_userdata:
+                self.mime_string = _compress(self.mime_string)
 
         return self.mime_string
 
@@ -276,16 +325,23 @@ class Instance(resource.Resource):
             if server is not None:
                 self.resource_id_set(server.id)
 
-        while server.status == 'BUILD':
+        return server
+
+    def check_create_complete(self, server):
+        if server.status == 'BUILD':
             server.get()
-            eventlet.sleep(1)
-        if server.status == 'ACTIVE':
-            self._set_ipaddress(server.networks)
-        else:
+        if server.status == 'BUILD':
+            return False
+        if server.status != 'ACTIVE':
             raise exception.Error('%s instance[%s] status[%s]' %
                                   ('nova reported unexpected',
                                    self.name, server.status))
 
+        self._set_ipaddress(server.networks)
+        if self.ipaddress is not None:
+            self.cache_attribute('ipaddress', self.ipaddress)
+        return True
+
     def handle_update(self, json_snippet):
         status = self.UPDATE_REPLACE
         try:
@@ -13,15 +13,29 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import copy
+import re
+
 from heat.engine import clients
 from heat.common import exception
 from heat.common import template_format
 from heat.engine import stack_resource
+from heat.engine.properties import Properties
 
 from heat.openstack.common import log as logging
 
 logger = logging.getLogger(__name__)
 
+# The metacharacters of the (POSIX) regular expressions with which the Nova
+# database filters servers by name; re.escape() escapes far more than these
+_REGEXP_SPECIAL = re.compile(r'([.^$*+?()\[\]{}|\\])')
+
+
+def _regexp_escape(string):
+    '''Escape a string to be matched literally by a Nova name filter.'''
+    return _REGEXP_SPECIAL.sub(r'\\\1', string)
+
+
 lb_template = '''
 {
   "AWSTemplateFormatVersion": "2010-09-09",
@@ -153,6 +167,20 @@ lb_template = '''
 # file at the moment this is because we will probably need to implement a
 # LoadBalancer based on keepalived as well (for for ssl support).
 #
+_parsed_lb_template = None
+
+
+def _lb_template():
+    '''
+    Return a copy of the parsed built in HAProxy template, parsing it only
+    once per process.
+    '''
+    global _parsed_lb_template
+    if _parsed_lb_template is None:
+        _parsed_lb_template = template_format.parse(lb_template)
+    return copy.deepcopy(_parsed_lb_template)
+
+
 class LoadBalancer(stack_resource.StackResource):
 
     listeners_schema = {
@@ -200,6 +228,18 @@ class LoadBalancer(stack_resource.StackResource):
                     'Implemented': False}
     }
 
+    # template keys and properties supported for handle_update,
+    # note trailing comma is required for a single item to get a tuple
+    update_allowed_keys = ('Properties',)
+    update_allowed_properties = ('Instances', 'HealthCheck', 'Listeners',)
+
+    @staticmethod
+    def _server_ipaddress(server):
+        for n in server.networks:
+            return server.networks[n][0]
+
+        return '0.0.0.0'
+
     def _instance_to_ipaddress(self, inst):
         '''
         Return the server's IP address, fetching it from Nova
@@ -208,13 +248,30 @@ class LoadBalancer(stack_resource.StackResource):
             server = self.nova().servers.get(inst)
         except clients.novaclient.exceptions.NotFound as ex:
             logger.warn('Instance (%s) not found: %s' % (inst, str(ex)))
-        else:
-            for n in server.networks:
-                return server.networks[n][0]
+            return '0.0.0.0'
 
-        return '0.0.0.0'
+        return self._server_ipaddress(server)
 
-    def _haproxy_config(self, templ, instances):
+    def _instances_to_ipaddresses(self, instances):
+        '''
+        Return the IP addresses of a list of servers, fetching the servers of
+        this stack from Nova with a single listing. Any not in the listing
+        (e.g. because they are referred to by name, or belong to another
+        stack) are fetched individually.
+        '''
+        if not instances:
+            return []
+
+        # Servers are named after the stack which created them
+        search = {'name': '^%s\\.' % _regexp_escape(self.stack.name)}
+        addresses = dict((str(server.id), self._server_ipaddress(server))
+                         for server in
+                         self.nova().servers.list(search_opts=search))
+
+        return [addresses.get(str(inst)) or self._instance_to_ipaddress(inst)
+                for inst in instances]
+
+    def _haproxy_config(self, instances):
         # initial simplifications:
         # - only one Listener
         # - only http (no tcp or ssl)
@@ -266,8 +323,7 @@ class LoadBalancer(stack_resource.StackResource):
 
         servers = []
         n = 1
-        for i in instances:
-            ip = self._instance_to_ipaddress(i)
+        for ip in self._instances_to_ipaddresses(instances):
             logger.debug('haproxy server:%s' % ip)
             servers.append('%sserver server%d %s:%s %s' % (spaces, n,
                                                            ip, inst_port,
@@ -277,13 +333,14 @@ class LoadBalancer(stack_resource.StackResource):
         return '%s%s%s%s\n' % (gl, frontend, backend, '\n'.join(servers))
 
     def handle_create(self):
-        templ = template_format.parse(lb_template)
+        templ = _lb_template()
 
         if self.properties['Instances']:
             md = templ['Resources']['LB_instance']['Metadata']
             files = md['AWS::CloudFormation::Init']['config']['files']
-            cfg = self._haproxy_config(templ, self.properties['Instances'])
+            cfg = self._haproxy_config(self.properties['Instances'])
             files['/etc/haproxy/haproxy.cfg']['content'] = cfg
+        self.cache_attribute('backends', self.properties['Instances'] or [])
 
         # total hack - probably need an admin key here.
         param = self.stack.resolve_static_data({'KeyName': {'Ref': 'KeyName'}})
@@ -291,7 +348,35 @@ class LoadBalancer(stack_resource.StackResource):
         self.create_with_template(templ, param)
 
     def handle_update(self, json_snippet):
-        return self.UPDATE_REPLACE
+        try:
+            self.update_template_diff(json_snippet)
+        except NotImplementedError:
+            logger.error("Could not update %s, invalid key" % self.name)
+            return self.UPDATE_REPLACE
+
+        try:
+            prop_diff = self.update_template_diff_properties(json_snippet)
+        except NotImplementedError:
+            logger.error("Could not update %s, invalid Property" % self.name)
+            return self.UPDATE_REPLACE
+
+        if prop_diff:
+            self.properties = Properties(self.properties_schema,
+                                         json_snippet.get('Properties', {}),
+                                         self.stack.resolve_runtime_data,
+                                         self.name,
+                                         self.stack.resolution_epoch)
+
+            # Regenerate haproxy.cfg even if the backends are unchanged,
+            # cfn-hup will pick up the new metadata. The backends of a load
+            # balancer managed by a group are those it last reloaded with.
+            if 'Instances' in prop_diff:
+                backends = self.properties['Instances'] or []
+            else:
+                backends = self._backends()
+            self._configure(backends)
+
+        return self.UPDATE_COMPLETE
 
     def handle_delete(self):
         self.delete_nested()
@@ -316,14 +401,35 @@ class LoadBalancer(stack_resource.StackResource):
         save it to the db.
         rely on the cfn-hup to reconfigure HAProxy
         '''
-        templ = template_format.parse(lb_template)
-        cfg = self._haproxy_config(templ, inst_list)
+        # The backends are unchanged since the last reload, e.g. the
+        # group's load balancer names changed rather than its members
+        if list(inst_list) == self._backends():
+            return
+
+        self._configure(inst_list)
+
+    def _backends(self):
+        '''Return the instances the load balancer was last configured with'''
+        backends = self.cached_attribute('backends', expire=False)
+        if backends is None:
+            return self.properties['Instances'] or []
+        return backends
+
+    def _configure(self, inst_list):
+        '''
+        Write the HAProxy configuration for the given instances to the
+        metadata of the load balancer instance.
+        '''
+        cfg = self._haproxy_config(inst_list)
 
         md = self.nested()['LB_instance'].metadata
         files = md['AWS::CloudFormation::Init']['config']['files']
-        files['/etc/haproxy/haproxy.cfg']['content'] = cfg
+        # Don't trigger a pointless cfn-hup reconfiguration of HAProxy
+        if files['/etc/haproxy/haproxy.cfg'].get('content') != cfg:
+            files['/etc/haproxy/haproxy.cfg']['content'] = cfg
+            self.nested()['LB_instance'].metadata = md
 
-        self.nested()['LB_instance'].metadata = md
+        self.cache_attribute('backends', list(inst_list))
 
     def FnGetRefId(self):
         return unicode(self.name)
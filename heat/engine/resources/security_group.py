@@ -13,8 +13,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import eventlet
+
 from heat.engine import clients
 from heat.engine import resource
+from heat.engine.properties import Properties
 
 from heat.openstack.common import log as logging
 
@@ -30,6 +33,11 @@ class SecurityGroup(resource.Resource):
                          'SecurityGroupEgress': {'Type': 'List',
                                                  'Implemented': False}}
 
+    # template keys and properties supported for handle_update,
+    # note trailing comma is required for a single item to get a tuple
+    update_allowed_keys = ('Properties',)
+    update_allowed_properties = ('SecurityGroupIngress',)
+
     def __init__(self, name, json_snippet, stack):
         super(SecurityGroup, self).__init__(name, json_snippet, stack)
 
@@ -49,24 +57,97 @@ class SecurityGroup(resource.Resource):
 
         self.resource_id_set(sec.id)
         if self.properties['SecurityGroupIngress']:
-            rules_client = self.nova().security_group_rules
-            for i in self.properties['SecurityGroupIngress']:
-                try:
-                    rule = rules_client.create(sec.id,
-                                               i['IpProtocol'],
-                                               i['FromPort'],
-                                               i['ToPort'],
-                                               i['CidrIp'])
-                except clients.novaclient.exceptions.BadRequest as ex:
-                    if ex.message.find('already exists') >= 0:
-                        # no worries, the rule is already there
-                        pass
-                    else:
-                        # unexpected error
-                        raise
+            self._create_rules(sec.id, self.properties['SecurityGroupIngress'])
+
+    @staticmethod
+    def _rule_key(ip_protocol, from_port, to_port, cidr_ip):
+        '''
+        Return a key identifying an ingress rule, in the same form whether it
+        comes from a template or from Nova.
+        '''
+        def port(p):
+            return int(p) if p is not None else None
+
+        return (str(ip_protocol).lower(), port(from_port), port(to_port),
+                cidr_ip)
+
+    def _template_rules(self, ingress):
+        return dict((self._rule_key(i['IpProtocol'], i['FromPort'],
+                                    i['ToPort'], i['CidrIp']), i)
+                    for i in ingress or [])
+
+    def _create_rules(self, sec_id, ingress):
+        '''
+        Create the ingress rules concurrently, ignoring any that already
+        exist.
+        '''
+        rules_client = self.nova().security_group_rules
+
+        def create_rule(i):
+            try:
+                rules_client.create(sec_id,
+                                    i['IpProtocol'],
+                                    i['FromPort'],
+                                    i['ToPort'],
+                                    i['CidrIp'])
+            except clients.novaclient.exceptions.BadRequest as ex:
+                if ex.message.find('already exists') >= 0:
+                    # no worries, the rule is already there
+                    pass
+                else:
+                    # unexpected error
+                    return ex
+
+        pool = eventlet.GreenPool()
+        for ex in pool.imap(create_rule, ingress):
+            if ex is not None:
+                raise ex
 
     def handle_update(self, json_snippet):
-        return self.UPDATE_REPLACE
+        try:
+            self.update_template_diff(json_snippet)
+        except NotImplementedError:
+            logger.error("Could not update %s, invalid key" % self.name)
+            return self.UPDATE_REPLACE
+
+        try:
+            prop_diff = self.update_template_diff_properties(json_snippet)
+        except NotImplementedError:
+            logger.error("Could not update %s, invalid Property" % self.name)
+            return self.UPDATE_REPLACE
+
+        if 'SecurityGroupIngress' in prop_diff:
+            old_rules = self._template_rules(
+                self.properties['SecurityGroupIngress'])
+            self.properties = Properties(self.properties_schema,
+                                         json_snippet.get('Properties', {}),
+                                         self.stack.resolve_runtime_data,
+                                         self.name,
+                                         self.stack.resolution_epoch)
+            new_rules = self._template_rules(
+                self.properties['SecurityGroupIngress'])
+
+            # Only remove the rules which were defined by the old template,
+            # not any added to the group by other means
+            removed = set(old_rules) - set(new_rules)
+            if removed:
+                sec = self.nova().security_groups.get(self.resource_id)
+                for rule in sec.rules:
+                    key = self._rule_key(rule['ip_protocol'],
+                                         rule['from_port'],
+                                         rule['to_port'],
+                                         rule['ip_range'].get('cidr'))
+                    if key in removed:
+                        try:
+                            self.nova().security_group_rules.delete(
+                                rule['id'])
+                        except clients.novaclient.exceptions.NotFound:
+                            pass
+
+            added = [new_rules[k] for k in new_rules if k not in old_rules]
+            self._create_rules(self.resource_id, added)
+
+        return self.UPDATE_COMPLETE
 
     def handle_delete(self):
         if self.resource_id is not None:
@@ -18,6 +18,7 @@ from heat.engine import parser
 from heat.engine import stack_resource
 from heat.common import template_format
 from heat.common import urlfetch
+from heat.engine.properties import Properties
 
 from heat.openstack.common import log as logging
 
@@ -39,6 +40,11 @@ class NestedStack(stack_resource.StackResource):
                          PROP_TIMEOUT_MINS: {'Type': 'Number'},
                          PROP_PARAMETERS: {'Type': 'Map'}}
 
+    # template keys and properties supported for handle_update,
+    # note trailing comma is required for a single item to get a tuple
+    update_allowed_keys = ('Properties',)
+    update_allowed_properties = (PROP_TEMPLATE_URL, PROP_PARAMETERS,)
+
     def handle_create(self):
         template_data = urlfetch.get(self.properties[PROP_TEMPLATE_URL])
         template = template_format.parse(template_data)
@@ -46,7 +52,34 @@ class NestedStack(stack_resource.StackResource):
         self.create_with_template(template, self.properties[PROP_PARAMETERS])
 
     def handle_update(self, json_snippet):
-        return self.UPDATE_REPLACE
+        try:
+            self.update_template_diff(json_snippet)
+        except NotImplementedError:
+            logger.error("Could not update %s, invalid key" % self.name)
+            return self.UPDATE_REPLACE
+
+        try:
+            prop_diff = self.update_template_diff_properties(json_snippet)
+        except NotImplementedError:
+            logger.error("Could not update %s, invalid Property" % self.name)
+            return self.UPDATE_REPLACE
+
+        if prop_diff:
+            self.properties = Properties(self.properties_schema,
+                                         json_snippet.get('Properties', {}),
+                                         self.stack.resolve_runtime_data,
+                                         self.name,
+                                         self.stack.resolution_epoch)
+
+            # Refetch the template, since its contents may have changed
+            # even if the URL has not
+            template_data = urlfetch.get(self.properties[PROP_TEMPLATE_URL])
+            template = template_format.parse(template_data)
+
+            self.update_with_template(template,
+                                      self.properties[PROP_PARAMETERS])
+
+        return self.UPDATE_COMPLETE
 
     def handle_delete(self):
         self.delete_nested()
@@ -38,15 +38,19 @@ class Volume(resource.Resource):
             self.properties['Size'],
             display_name=self.physical_resource_name(),
             display_description=self.physical_resource_name())
+        return vol
 
-        while vol.status == 'creating':
-            eventlet.sleep(1)
+    def check_create_complete(self, vol):
+        if vol.status == 'creating':
             vol.get()
-        if vol.status == 'available':
-            self.resource_id_set(vol.id)
-        else:
+        if vol.status == 'creating':
+            return False
+        if vol.status != 'available':
             raise exception.Error(vol.status)
 
+        self.resource_id_set(vol.id)
+        return True
+
     def handle_update(self, json_snippet):
         return self.UPDATE_REPLACE
 
@@ -82,15 +86,19 @@ class VolumeAttachment(resource.Resource):
                                          volume_id=volume_id,
                                          device=self.properties['Device'])
 
-        vol = self.nova('volume').volumes.get(va.id)
-        while vol.status == 'available' or vol.status == 'attaching':
-            eventlet.sleep(1)
+        return self.nova('volume').volumes.get(va.id)
+
+    def check_create_complete(self, vol):
+        if vol.status in ('available', 'attaching'):
             vol.get()
-        if vol.status == 'in-use':
-            self.resource_id_set(va.id)
-        else:
+        if vol.status in ('available', 'attaching'):
+            return False
+        if vol.status != 'in-use':
             raise exception.Error(vol.status)
 
+        self.resource_id_set(vol.id)
+        return True
+
     def handle_update(self, json_snippet):
         return self.UPDATE_REPLACE
 
@@ -13,7 +13,6 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import eventlet
 import time
 import urllib
 import urlparse
@@ -21,6 +20,7 @@ import json
 
 from heat.common import exception
 from heat.common import identifier
+from heat.engine import dbcache
 from heat.engine import resource
 
 from heat.openstack.common import log as logging
@@ -84,6 +84,21 @@ class WaitConditionHandle(resource.Resource):
                            path, qs)
         return url
 
+    def _signed_url_inputs(self, path):
+        '''
+        Return the inputs to the signed URL, other than the credentials, so
+        that a stored URL can be checked against them.
+        '''
+        return [cfg.CONF.heat_waitcondition_server_url, path,
+                self.created_time.strftime("%Y-%m-%dT%H:%M:%SZ")]
+
+    def _store_signed_url(self, credentials):
+        urlpath = self.identifier().arn_url_path()
+        signed = {'inputs': self._signed_url_inputs(urlpath),
+                  'url': self._sign_url(credentials, urlpath)}
+        self.cache_attribute('signed_url', signed)
+        return signed
+
     def handle_create(self):
         # Create a keystone user so we can create a signed URL via FnGetRefId
         user_id = self.keystone().create_stack_user(
@@ -94,6 +109,7 @@ class WaitConditionHandle(resource.Resource):
                                   user_id)
         else:
             self.resource_id_set(user_id)
+            self._store_signed_url(kp)
 
     def handle_delete(self):
         if self.resource_id is None:
@@ -108,10 +124,15 @@ class WaitConditionHandle(resource.Resource):
         Override the default resource FnGetRefId so we return the signed URL
         '''
         if self.resource_id:
+            # The URL is signed when the handle is created and stored, and is
+            # only signed again if something it was signed with has changed
             urlpath = self.identifier().arn_url_path()
-            ec2_creds = self.keystone().get_ec2_keypair(self.resource_id)
-            signed_url = self._sign_url(ec2_creds, urlpath)
-            return unicode(signed_url)
+            signed = self.cached_attribute('signed_url', expire=False)
+            if (signed is None or
+                    signed['inputs'] != self._signed_url_inputs(urlpath)):
+                ec2_creds = self.keystone().get_ec2_keypair(self.resource_id)
+                signed = self._store_signed_url(ec2_creds)
+            return unicode(signed['url'])
         else:
             return unicode(self.name)
 
@@ -135,17 +156,23 @@ class WaitConditionHandle(resource.Resource):
         Validate and update the resource metadata
         '''
         if self._metadata_format_ok(metadata):
-            rsrc_metadata = self.metadata
-            if metadata['UniqueId'] in rsrc_metadata:
-                logger.warning("Overwriting Metadata item for UniqueId %s!" %
-                               metadata['UniqueId'])
-            new_metadata = {}
-            for k in ('Data', 'Reason', 'Status'):
-                new_metadata[k] = metadata[k]
-            # Note we can't update self.metadata directly, as it
-            # is a Metadata descriptor object which only supports get/set
-            rsrc_metadata.update({metadata['UniqueId']: new_metadata})
-            self.metadata = rsrc_metadata
+            while True:
+                rsrc_metadata = self.metadata
+                if metadata['UniqueId'] in rsrc_metadata:
+                    logger.warning("Overwriting Metadata item for UniqueId "
+                                   "%s!" % metadata['UniqueId'])
+                new_metadata = {}
+                for k in ('Data', 'Reason', 'Status'):
+                    new_metadata[k] = metadata[k]
+                # Note we can't update self.metadata directly, as it
+                # is a Metadata descriptor object which only supports get/set
+                rsrc_metadata.update({metadata['UniqueId']: new_metadata})
+                try:
+                    self.metadata = rsrc_metadata
+                    break
+                except exception.ConcurrentUpdate:
+                    # Another signal arrived meanwhile; merge with it
+                    continue
         else:
             logger.error("Metadata failed validation for %s" % self.name)
             raise ValueError("Metadata format invalid")
@@ -200,9 +227,10 @@ class WaitCondition(resource.Resource):
 
         self.timeout = int(self.t['Properties']['Timeout'])
         self.count = int(self.t['Properties'].get('Count', '1'))
-        self.sleep_time = max(min(self.MAX_SLEEP,
-                              self.timeout / self.SLEEP_DIV),
-                              self.MIN_SLEEP)
+        self.create_timeout = self.timeout
+        self.create_poll_interval = max(min(self.MAX_SLEEP,
+                                        self.timeout / self.SLEEP_DIV),
+                                        self.MIN_SLEEP)
 
     def _validate_handle_url(self):
         handle_url = self.properties['Handle']
@@ -229,50 +257,31 @@ class WaitCondition(resource.Resource):
         handle_id = identifier.ResourceIdentifier.from_arn_url(handle_url)
         return handle_id.resource_name
 
-    def _create_timeout(self):
-        return eventlet.Timeout(self.timeout)
-
     def handle_create(self):
         self._validate_handle_url()
-        tmo = None
-        status = FAILURE
-        reason = "Unknown reason"
-        try:
-            # keep polling our Metadata to see if the cfn-signal has written
-            # it yet. The execution here is limited by timeout.
-            with self._create_timeout() as tmo:
-                handle_res_name = self._get_handle_resource_name()
-                handle = self.stack[handle_res_name]
-                self.resource_id_set(handle_res_name)
-
-                # Poll for WaitConditionHandle signals indicating
-                # SUCCESS/FAILURE.  We need self.count SUCCESS signals
-                # before we can declare the WaitCondition CREATE_COMPLETE
-                handle_status = handle.get_status()
-                while (FAILURE not in handle_status
-                       and len(handle_status) < self.count):
-                    logger.debug('Polling for WaitCondition completion,' +
-                                 ' sleeping for %s seconds, timeout %s' %
-                                 (self.sleep_time, self.timeout))
-                    eventlet.sleep(self.sleep_time)
-                    handle_status = handle.get_status()
-
-                if FAILURE in handle_status:
-                    reason = handle.get_status_reason(FAILURE)
-                elif (len(handle_status) == self.count and
-                      handle_status == [SUCCESS] * self.count):
-                    logger.debug("WaitCondition %s SUCCESS" % self.name)
-                    status = SUCCESS
-
-        except eventlet.Timeout as t:
-            if t is not tmo:
-                # not my timeout
-                raise
-            else:
-                (status, reason) = (TIMEDOUT, 'Timed out waiting for instance')
-
-        if status != SUCCESS:
-            raise exception.Error(reason)
+        handle_res_name = self._get_handle_resource_name()
+        self.resource_id_set(handle_res_name)
+        return self.stack[handle_res_name]
+
+    def check_create_complete(self, handle):
+        # Poll for WaitConditionHandle signals indicating
+        # SUCCESS/FAILURE.  We need self.count SUCCESS signals
+        # before we can declare the WaitCondition CREATE_COMPLETE
+        # The signals are written by other requests, so read them afresh
+        dbcache.clear(handle)
+        handle_status = handle.get_status()
+        if FAILURE in handle_status:
+            raise exception.Error(handle.get_status_reason(FAILURE))
+        if len(handle_status) < self.count:
+            logger.debug('Polling for WaitCondition completion,' +
+                         ' sleeping for %s seconds, timeout %s' %
+                         (self.create_poll_interval, self.timeout))
+            return False
+        if handle_status != [SUCCESS] * self.count:
+            raise exception.Error("Unknown reason")
+
+        logger.debug("WaitCondition %s SUCCESS" % self.name)
+        return True
 
     def handle_update(self, json_snippet):
         return self.UPDATE_REPLACE
@@ -282,6 +291,8 @@ class WaitCondition(resource.Resource):
             return
 
         handle = self.stack[self.resource_id]
+        # Discard any signals, including those received since they were read
+        dbcache.clear(handle)
         handle.metadata = {}
 
     def FnGetAtt(self, key):
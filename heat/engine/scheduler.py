@@ -0,0 +1,307 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import sys
+import time
+
+import eventlet
+from eventlet import event
+from eventlet import greenthread
+
+from heat.common import exception
+from heat.openstack.common import cfg
+from heat.openstack.common import log as logging
+
+logger = logging.getLogger(__name__)
+
+
+class _Task(object):
+    '''An operation in progress, polled by the reactor until it completes.'''
+
+    def __init__(self, name, check, ticks, timeout, on_progress=None):
+        self.name = name
+        self.check = check
+        self.on_progress = on_progress
+        self.ticks = ticks
+        self.countdown = ticks
+        self.started = time.time()
+        self.deadline = timeout is not None and self.started + timeout or None
+        self.polls = 1
+        # Whether a check is running in the reactor's pool
+        self.running = False
+        self.done = event.Event()
+
+    def due(self):
+        '''Count down a tick of the reactor, returning True if a poll is due'''
+        self.countdown -= 1
+        if self.countdown > 0:
+            return False
+        self.countdown = self.ticks
+        return True
+
+    def poll(self, check_timeout):
+        '''
+        Poll the task, returning True once it has finished (successfully or
+        not) and its waiter has been notified. A check which takes longer
+        than check_timeout seconds is abandoned until the next poll.
+        '''
+        self.polls += 1
+
+        try:
+            timeout = eventlet.Timeout(check_timeout)
+            try:
+                complete = self.check()
+            except eventlet.Timeout as t:
+                if t is not timeout:
+                    raise
+                logger.warning('Check of %s timed out' % self.name)
+                complete = False
+            finally:
+                timeout.cancel()
+
+            if complete:
+                self.done.send()
+                return True
+            if self.deadline is not None and time.time() >= self.deadline:
+                raise exception.Error('Timed out waiting for %s' % self.name)
+        except Exception:
+            self.done.send_exception(*sys.exc_info())
+            return True
+
+        self.report()
+        return False
+
+    def report(self):
+        '''Pass the seconds elapsed and the number of polls to on_progress.'''
+        if self.on_progress is None:
+            return
+        try:
+            self.on_progress(time.time() - self.started, self.polls)
+        except Exception:
+            logger.exception('Failed to report progress of %s' % self.name)
+
+
+class Reactor(object):
+    '''
+    Drives long-running operations (such as waiting for a resource to become
+    active) from a single greenthread, rather than having every operation
+    sleep and poll on its own.
+
+    Operations are polled every resource_poll_interval seconds, or at a
+    multiple of that interval if they ask to be polled less often, and fail
+    if they do not complete within their timeout. Each check runs in a
+    greenthread of its own, so that a slow check does not hold up the polls
+    of the others; an operation is not polled again while its previous check
+    is still running, and a check is abandoned after CHECK_TIMEOUT seconds.
+    '''
+
+    # Maximum number of checks run at once
+    MAX_CONCURRENT_CHECKS = 10
+    # Seconds after which a single check is abandoned
+    CHECK_TIMEOUT = 60
+
+    def __init__(self):
+        self.tasks = []
+        self._thread = None
+        self._pool = eventlet.GreenPool(self.MAX_CONCURRENT_CHECKS)
+
+    def wait(self, check, name=None, interval=None, timeout=None,
+             on_progress=None):
+        '''
+        Block the calling greenthread until check() returns True. Any
+        exception raised by check() is raised here, as is an Error if the
+        check has not succeeded within the timeout (in seconds).
+
+        The check is made immediately, and then every interval seconds by
+        the reactor. After each poll which does not complete the operation,
+        on_progress (if given) is called with the seconds elapsed and the
+        number of polls so far.
+        '''
+        if check():
+            return
+
+        tick = max(cfg.CONF.resource_poll_interval, 1)
+        ticks = max(int(round(float(interval or tick) / tick)), 1)
+        task = _Task(name or repr(check), check, ticks, timeout, on_progress)
+        self.tasks.append(task)
+        if self._thread is None:
+            self._thread = eventlet.spawn(self._run)
+
+        try:
+            task.done.wait()
+        finally:
+            # Remove the task if the waiter was interrupted (e.g. by a
+            # stack timeout) before it completed
+            if task in self.tasks:
+                self.tasks.remove(task)
+
+    def progress(self):
+        '''
+        Return a list of (name, seconds elapsed, number of polls) tuples for
+        the operations in progress.
+        '''
+        now = time.time()
+        return [(t.name, now - t.started, t.polls) for t in self.tasks]
+
+    def _run(self):
+        try:
+            while self.tasks:
+                eventlet.sleep(max(cfg.CONF.resource_poll_interval, 1))
+                logger.debug('Waiting for %s' %
+                             ', '.join('%s (%ds)' % (n, e)
+                                       for n, e, p in self.progress()))
+                for task in [t for t in self.tasks
+                             if not t.running and t.due()]:
+                    task.running = True
+                    self._pool.spawn_n(self._poll, task)
+                # Let the checks just started run now, so that the reactor
+                # does not sleep for another tick when they all complete
+                greenthread.sleep(0)
+        finally:
+            self._thread = None
+
+    def _poll(self, task):
+        try:
+            # The waiter may have been interrupted meanwhile
+            if task in self.tasks and task.poll(self.CHECK_TIMEOUT):
+                if task in self.tasks:
+                    self.tasks.remove(task)
+        finally:
+            task.running = False
+
+
+reactor = Reactor()
+
+
+class _Job(object):
+    def __init__(self, priority, tenant, key, func, args, kwargs):
+        self.priority = priority
+        self.tenant = tenant
+        self.key = key
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+
+class WorkQueue(object):
+    '''
+    Runs stack operations for the whole engine, at most
+    max_concurrent_stack_operations at a time. Operations waiting to run are
+    started in priority order and, within a priority, in turn from each
+    tenant with work waiting, so that no tenant can starve the others.
+    '''
+
+    PRIORITIES = (HIGH, NORMAL) = (0, 1)
+    PRIORITY_NAMES = {HIGH: 'high', NORMAL: 'normal'}
+
+    def __init__(self):
+        # priority -> tenant -> waiting jobs
+        self.queued = dict((p, {}) for p in self.PRIORITIES)
+        # priority -> tenants with jobs waiting, in the order they are served
+        self.tenants = dict((p, collections.deque()) for p in self.PRIORITIES)
+        # job -> greenthread
+        self.running = {}
+
+    def submit(self, priority, tenant, key, func, *args, **kwargs):
+        '''
+        Queue func(*args, **kwargs) to run in its own greenthread on behalf
+        of the given tenant. The key (e.g. a stack ID) identifies the job
+        to cancel().
+        '''
+        job = _Job(priority, tenant, key, func, args, kwargs)
+        tenants = self.queued[priority]
+        if tenant not in tenants:
+            tenants[tenant] = collections.deque()
+            self.tenants[priority].append(tenant)
+        tenants[tenant].append(job)
+        self._dispatch()
+
+    def cancel(self, key):
+        '''
+        Remove the waiting jobs with the given key from the queue, and kill
+        those which are running (other than the calling greenthread).
+        '''
+        for priority in self.PRIORITIES:
+            tenants = self.queued[priority]
+            for tenant, jobs in tenants.items():
+                remaining = [j for j in jobs if j.key != key]
+                if remaining:
+                    tenants[tenant] = collections.deque(remaining)
+                else:
+                    del tenants[tenant]
+                    self.tenants[priority].remove(tenant)
+
+        current = eventlet.getcurrent()
+        for job, thread in self.running.items():
+            if job.key == key and thread is not current:
+                thread.kill()
+
+    def stats(self, tenant=None):
+        '''
+        Return the number of jobs running and the queue depth, in total and
+        for each priority. If a tenant is given, only its waiting jobs are
+        counted in the queue depth.
+        '''
+        depth = {}
+        for priority, tenants in self.queued.items():
+            depth[self.PRIORITY_NAMES[priority]] = sum(
+                len(jobs) for t, jobs in tenants.items()
+                if tenant is None or t == tenant)
+
+        return {'running': len(self.running),
+                'limit': cfg.CONF.max_concurrent_stack_operations,
+                'queued': sum(depth.values()),
+                'queued_by_priority': depth}
+
+    def _next(self):
+        '''Remove and return the next job to run, or None if none.'''
+        for priority in self.PRIORITIES:
+            order = self.tenants[priority]
+            if not order:
+                continue
+
+            tenant = order.popleft()
+            jobs = self.queued[priority][tenant]
+            job = jobs.popleft()
+            if jobs:
+                order.append(tenant)
+            else:
+                del self.queued[priority][tenant]
+            return job
+        return None
+
+    def _dispatch(self):
+        limit = cfg.CONF.max_concurrent_stack_operations
+        while limit <= 0 or len(self.running) < limit:
+            job = self._next()
+            if job is None:
+                break
+            thread = eventlet.spawn(self._run, job)
+            self.running[job] = thread
+            thread.link(self._done, job)
+
+    def _run(self, job):
+        try:
+            job.func(*job.args, **job.kwargs)
+        except Exception:
+            logger.exception('Stack operation failed')
+
+    def _done(self, thread, job):
+        self.running.pop(job, None)
+        self._dispatch()
+
+
+work_queue = WorkQueue()
@@ -26,6 +26,7 @@ from heat.common import identifier
 from heat.engine import parser
 from heat.engine import resource
 from heat.engine import resources
+from heat.engine import scheduler
 from heat.engine import watchrule
 
 from heat.openstack.common import cfg
@@ -60,13 +61,20 @@ class EngineService(service.Service):
     """
     def __init__(self, host, topic, manager=None):
         super(EngineService, self).__init__(host, topic)
-        # stg == "Stack Thread Groups"
+        # stg == "Stack Thread Groups", for the periodic tasks of each stack
         self.stg = {}
+        # Stack operations for all stacks are run from a single queue
+        self.work_queue = scheduler.work_queue
 
-    def _start_in_thread(self, stack_id, func, *args, **kwargs):
-        if stack_id not in self.stg:
-            self.stg[stack_id] = threadgroup.ThreadGroup()
-        self.stg[stack_id].add_thread(func, *args, **kwargs)
+    def _start_in_thread(self, priority, tenant, stack_id, func,
+                         *args, **kwargs):
+        """
+        Queue an operation on a stack to run in a separate thread, once the
+        operations of higher priority, and those of tenants served before
+        this one, have been started.
+        """
+        self.work_queue.submit(priority, tenant, stack_id,
+                               func, *args, **kwargs)
 
     def _timer_in_thread(self, stack_id, func, *args, **kwargs):
         """
@@ -102,6 +110,31 @@ class EngineService(service.Service):
         for s in stacks:
             self._timer_in_thread(s.id, self._periodic_watcher_task, sid=s.id)
 
+            # Resume any operation interrupted by the engine stopping. There
+            # is no record of which engine owns an operation, so another
+            # engine may still be running it.
+            if (cfg.CONF.resume_stack_operations and
+                    s.status in (parser.Stack.CREATE_IN_PROGRESS,
+                                 parser.Stack.UPDATE_IN_PROGRESS,
+                                 parser.Stack.DELETE_IN_PROGRESS)):
+                self._resume_stack(s)
+
+    def _resume_stack(self, s):
+        """
+        Resume the in-progress operation on a stack, in a separate thread,
+        using the stack's stored credentials.
+        """
+        logger.info('Resuming %s of stack %s' % (s.status, s.name))
+        user_creds = db_api.user_creds_get(s.user_creds_id)
+        stack_context = context.RequestContext.from_dict(user_creds)
+        try:
+            stack = parser.Stack.load(stack_context, stack_id=s.id)
+        except exception.NotFound:
+            logger.error('Unable to load stack %s to resume' % s.id)
+            return
+        self._start_in_thread(scheduler.WorkQueue.NORMAL, s.tenant, s.id,
+                              stack.resume)
+
     @request_context
     def identify_stack(self, context, stack_name):
         """
@@ -210,7 +243,8 @@ class EngineService(service.Service):
 
         stack_id = stack.store()
 
-        self._start_in_thread(stack_id, stack.create)
+        self._start_in_thread(scheduler.WorkQueue.NORMAL, context.tenant_id,
+                              stack_id, stack.create)
 
         # Schedule a periodic watcher task for this stack
         self._timer_in_thread(stack_id, self._periodic_watcher_task,
@@ -252,7 +286,8 @@ class EngineService(service.Service):
         if response:
             return {'Description': response}
 
-        self._start_in_thread(db_stack.id, current_stack.update, updated_stack)
+        self._start_in_thread(scheduler.WorkQueue.NORMAL, db_stack.tenant,
+                              db_stack.id, current_stack.update, updated_stack)
 
         return dict(current_stack.identifier())
 
@@ -336,10 +371,24 @@ class EngineService(service.Service):
         if st.id in self.stg:
             self.stg[st.id].stop()
             del self.stg[st.id]
-        # use the service ThreadGroup for deletes
-        self.tg.add_thread(stack.delete)
+        # Cancel any other operation on the stack, and run the delete ahead
+        # of waiting creates and updates
+        self.work_queue.cancel(st.id)
+        self._start_in_thread(scheduler.WorkQueue.HIGH, st.tenant, st.id,
+                              stack.delete)
         return None
 
+    @request_context
+    def show_work_queue(self, context):
+        """
+        Return the number of stack operations running in the engine, and the
+        depth of the queue of operations waiting to run. Only administrators
+        see the operations waiting for all tenants.
+        arg1 -> RPC context.
+        """
+        tenant = None if context.is_admin else context.tenant_id
+        return self.work_queue.stats(tenant)
+
     def list_resource_types(self, context):
         """
         Get a list of supported resource types.
@@ -378,6 +427,32 @@ class EngineService(service.Service):
 
         return api.format_stack_resource(stack[resource_name])
 
+    @request_context
+    def list_group_members(self, context, stack_identity, resource_name):
+        """
+        The list_group_members method lists the members of a group resource
+        (e.g. an InstanceGroup), including any in its warm pool.
+        arg1 -> RPC context.
+        arg2 -> Name of the stack containing the group.
+        arg3 -> Name of the group resource.
+        """
+        s = self._get_stack(context, stack_identity)
+
+        stack = parser.Stack.load(context, stack=s)
+        if resource_name not in stack:
+            raise exception.ResourceNotFound(resource_name=resource_name,
+                                             stack_name=stack.name)
+
+        resource = stack[resource_name]
+        if resource.id is None:
+            raise exception.ResourceNotAvailable(resource_name=resource_name)
+
+        members = resource.group_members()
+        if members is None:
+            raise ValueError('Resource %s is not a group' % resource_name)
+
+        return [api.format_group_member(m) for m in members]
+
     @request_context
     def find_physical_resource(self, context, physical_resource_id):
         """
@@ -469,7 +544,8 @@ class EngineService(service.Service):
             rule = watchrule.WatchRule.load(stack_context, watch=wr)
             actions = rule.evaluate()
             for action in actions:
-                self._start_in_thread(sid, action)
+                self._start_in_thread(scheduler.WorkQueue.HIGH, stack.tenant,
+                                      sid, action)
 
     @request_context
     def create_watch_data(self, context, watch_name, stats_data):
@@ -538,7 +614,8 @@ class EngineService(service.Service):
         wr = watchrule.WatchRule.load(context, watch_name)
         actions = wr.set_watch_state(state)
         for action in actions:
-            self._start_in_thread(wr.stack_id, action)
+            self._start_in_thread(scheduler.WorkQueue.HIGH, context.tenant_id,
+                                  wr.stack_id, action)
 
         # Return the watch with the state overriden to indicate success
         # We do not update the timestamps as we are not modifying the DB
@@ -64,6 +64,28 @@ class StackResource(resource.Resource):
         if self._nested.state != self._nested.CREATE_COMPLETE:
             raise exception.Error(self._nested.state_description)
 
+    def update_with_template(self, child_template, user_params):
+        '''
+        Update the nested stack to match a new JSON template and parameters,
+        updating only the nested resources which have changed.
+        '''
+        nested_stack = self.nested()
+        if nested_stack is None:
+            raise exception.Error('Nested stack of %s not created' %
+                                  self.name)
+
+        template = parser.Template(child_template)
+        params = parser.Parameters(self.physical_resource_name(), template,
+                                   user_params)
+        new_stack = parser.Stack(self.context,
+                                 self.physical_resource_name(),
+                                 template,
+                                 params)
+
+        nested_stack.update(new_stack)
+        if nested_stack.state != nested_stack.UPDATE_COMPLETE:
+            raise exception.Error(nested_stack.state_description)
+
     def delete_nested(self):
         '''
         Delete the nested stack.
@@ -14,6 +14,7 @@
 #    under the License.
 
 from heat.common import exception
+from heat.engine import dbcache
 
 
 class Timestamp(object):
@@ -47,3 +48,40 @@ class Timestamp(object):
             raise exception.ResourceNotAvailable(resource_name=obj.name)
         o = self.db_fetch(obj.context, obj.id)
         o.update_and_save({self.attribute: timestamp})
+
+
+class CachedTimestamp(Timestamp):
+    '''
+    A descriptor for a timestamp of an object with a versioned database row,
+    which is cached with the other data read from the row (see dbcache).
+    '''
+
+    def __init__(self, db_get, db_update, attribute):
+        '''
+        Initialise with a function to read an attribute of an object's row
+        together with the row's version, a function to update the row if its
+        version is unchanged, and the name of the attribute to retrieve.
+        '''
+        self.db_get = db_get
+        self.db_update = db_update
+        self.attribute = attribute
+
+    def __get__(self, obj, obj_class):
+        '''Get the timestamp for the given object.'''
+        if obj is None or obj.id is None:
+            return None
+
+        return dbcache.get(obj, self.attribute, self.db_get)
+
+    def __set__(self, obj, timestamp):
+        '''Update the timestamp for the given object.'''
+        if obj.id is None:
+            raise exception.ResourceNotAvailable(resource_name=obj.name)
+        try:
+            dbcache.update(obj, self.attribute, timestamp,
+                           self.db_get, self.db_update)
+        except exception.ConcurrentUpdate:
+            # The timestamp does not depend on the rest of the row, so it
+            # can simply be written to the latest version
+            dbcache.update(obj, self.attribute, timestamp,
+                           self.db_get, self.db_update)
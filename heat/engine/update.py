@@ -0,0 +1,200 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import eventlet
+from eventlet import queue
+
+from heat.openstack.common import log as logging
+
+logger = logging.getLogger(__name__)
+
+
+class UpdatePlan(object):
+    '''
+    A plan for updating an existing stack to match a new stack definition.
+
+    The plan consists of an action (create, update or delete) on each
+    resource that is added, changed or removed, and the actions that must
+    complete before each one can start. Creates and updates follow the
+    dependencies of the new stack, while a delete waits for every action on
+    the resources that required the deleted one in the existing stack.
+    Actions that do not depend on one another run concurrently.
+    '''
+
+    ACTIONS = (CREATE, UPDATE, DELETE) = ('CREATE', 'UPDATE', 'DELETE')
+
+    def __init__(self, existing, new):
+        self.existing = existing
+        self.new = new
+        self.running = set()
+
+        old_digests = existing.resource_digests()
+        new_digests = new.resource_digests()
+
+        # resource name -> action
+        self.actions = {}
+        for name in existing.keys():
+            if name not in new:
+                self.actions[name] = self.DELETE
+        for name in new.keys():
+            if name not in existing:
+                self.actions[name] = self.CREATE
+            elif old_digests[name] != new_digests[name]:
+                self.actions[name] = self.UPDATE
+
+        # resource name -> names whose actions must complete first
+        self.requires = dict((name, set()) for name in self.actions)
+        for res in new:
+            if res.name in self.actions:
+                self.requires[res.name].update(
+                    r.name for r in new.dependencies.requires(res)
+                    if r.name in self.actions)
+        for res in existing:
+            if res.name not in self.actions:
+                continue
+            for r in existing.dependencies.requires(res):
+                if self.actions.get(r.name) == self.DELETE:
+                    self.requires[r.name].add(res.name)
+
+    def report(self):
+        '''
+        Return a dry-run report of the plan, as a list of stages. Each stage
+        is a sorted list of (action, resource name) tuples which can run
+        concurrently once the previous stages are complete, so the number of
+        stages is the length of the critical path.
+
+        An update may turn out to be unnecessary once references to other
+        resources are resolved, or may require the resource to be replaced.
+        '''
+        stages = []
+        remaining = dict((n, set(r)) for n, r in self.requires.items())
+        while remaining:
+            ready = sorted(n for n, r in remaining.items() if not r)
+            stages.append([(self.actions[n], n) for n in ready])
+            for n in ready:
+                del remaining[n]
+            for r in remaining.values():
+                r.difference_update(ready)
+        return stages
+
+    def execute(self):
+        '''
+        Run the plan, starting each action as soon as those it depends on
+        have completed. No further actions are started once one has failed.
+        Returns a list of failure messages.
+        '''
+        pool = eventlet.GreenPool()
+        results = queue.LightQueue()
+        remaining = dict((n, set(r)) for n, r in self.requires.items())
+        threads = {}
+        failures = []
+
+        def run(name):
+            try:
+                failure = self._run_action(name)
+            except Exception as ex:
+                logger.exception('%s of resource %s failed' %
+                                 (self.actions[name], name))
+                failure = 'Resource %s %s failed: %s' % (
+                    name, self.actions[name].lower(), str(ex))
+            results.put((name, failure))
+
+        try:
+            while True:
+                if not failures:
+                    for name in sorted(n for n, r in remaining.items()
+                                       if not r):
+                        del remaining[name]
+                        self.running.add(name)
+                        threads[name] = pool.spawn(run, name)
+
+                if not self.running:
+                    break
+
+                name, failure = results.get()
+                self.running.discard(name)
+                del threads[name]
+                if failure:
+                    failures.append(failure)
+                for r in remaining.values():
+                    r.discard(name)
+        finally:
+            for thread in threads.values():
+                thread.kill()
+
+        return failures
+
+    def _run_action(self, name):
+        '''Run the action for the named resource, returning any failure.'''
+        action = self.actions[name]
+        if action == self.DELETE:
+            return self._delete(name)
+        elif action == self.CREATE:
+            logger.debug("resource %s not found in current stack"
+                         % name + " definition, adding")
+            return self._create(self.new[name])
+        else:
+            return self._update(self.new[name])
+
+    def _delete(self, name):
+        logger.debug("resource %s not found in updated stack"
+                     % name + " definition, deleting")
+        # A resource that is not stored was already deleted by an update
+        # that was interrupted
+        if self.existing[name].id is not None:
+            if self.existing[name].destroy():
+                return 'Resource %s delete failed' % name
+
+        del self.existing.resources[name]
+        self.existing.resolution_changed()
+
+    def _create(self, res):
+        res.stack = self.existing
+        self.existing[res.name] = res
+        if res.create():
+            return 'Resource %s create failed' % res.name
+
+    def _update(self, res):
+        existing = self.existing
+        if existing[res.name].id is None:
+            # Destroyed for replacement by an update that was interrupted
+            return self._create(res)
+
+        # Compare resolved pre/post update resource snippets,
+        # note the new resource snippet is resolved in the context
+        # of the existing stack (which is the stack being updated)
+        old_snippet = existing.resolve_runtime_data(existing[res.name].t)
+        new_snippet = existing.resolve_runtime_data(res.t)
+        if old_snippet == new_snippet:
+            return
+
+        # Can fail if underlying resource class does not
+        # implement update logic or update requires replacement
+        retval = existing[res.name].update(new_snippet)
+        if retval == existing[res.name].UPDATE_COMPLETE:
+            logger.info("Resource %s for stack %s updated" %
+                        (res.name, existing.name))
+        elif retval == existing[res.name].UPDATE_REPLACE:
+            logger.info("Resource %s for stack %s" %
+                        (res.name, existing.name) +
+                        " update requires replacement")
+            # Resource requires replacement for update
+            if existing[res.name].destroy():
+                return 'Resource %s delete failed' % res.name
+            return self._create(res)
+        else:
+            logger.warning("Cannot update resource %s," %
+                           res.name + " reason %s" % retval)
+            return 'Resource %s update failed' % res.name
@@ -52,6 +52,14 @@ RES_KEYS = (
     'resource_identity', STACK_ID, STACK_NAME,
 )
 
+GROUP_MEMBER_KEYS = (
+    MEMBER_NAME, MEMBER_PHYSICAL_ID,
+    MEMBER_STATUS, MEMBER_UPDATED_TIME,
+) = (
+    RES_NAME, RES_PHYSICAL_ID,
+    RES_STATUS, RES_UPDATED_TIME,
+)
+
 EVENT_KEYS = (
     EVENT_ID,
     EVENT_STACK_ID, EVENT_STACK_NAME,
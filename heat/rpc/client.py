@@ -184,6 +184,16 @@ class EngineClient(heat.openstack.common.rpc.proxy.RpcProxy):
         return self.call(ctxt, self.make_msg('list_resource_types'),
                          topic=_engine_topic(self.topic, ctxt, None))
 
+    def show_work_queue(self, ctxt):
+        """
+        Get the number of stack operations running in the engine and the
+        depth of the queue of operations waiting to run.
+
+        :param ctxt: RPC context.
+        """
+        return self.call(ctxt, self.make_msg('show_work_queue'),
+                         topic=_engine_topic(self.topic, ctxt, None))
+
     def list_events(self, ctxt, stack_identity):
         """
         The list_events method lists all events associated with a given stack.
@@ -202,6 +212,19 @@ class EngineClient(heat.openstack.common.rpc.proxy.RpcProxy):
                                              resource_name=resource_name),
                          topic=_engine_topic(self.topic, ctxt, None))
 
+    def list_group_members(self, ctxt, stack_identity, resource_name):
+        """
+        List the members of a group resource, e.g. an InstanceGroup.
+
+        :param ctxt: RPC context.
+        :param stack_identity: Name of the stack containing the group.
+        :param resource_name: Name of the group resource.
+        """
+        return self.call(ctxt, self.make_msg('list_group_members',
+                                             stack_identity=stack_identity,
+                                             resource_name=resource_name),
+                         topic=_engine_topic(self.topic, ctxt, None))
+
     def find_physical_resource(self, ctxt, physical_resource_id):
         """
         Return an identifier for the resource with the specified physical
@@ -876,6 +876,24 @@ class StackControllerTest(ControllerTest, unittest.TestCase):
                           req, tenant_id=self.tenant)
         self.m.VerifyAll()
 
+    def test_show_work_queue(self):
+        req = self._get('/work_queue')
+
+        engine_response = {'running': 1, 'limit': 50, 'queued': 2,
+                           'queued_by_priority': {'high': 0, 'normal': 2}}
+
+        self.m.StubOutWithMock(rpc, 'call')
+        rpc.call(req.context, self.topic,
+                 {'method': 'show_work_queue',
+                  'args': {},
+                  'version': self.api_version},
+                 None).AndReturn(engine_response)
+        self.m.ReplayAll()
+        response = self.controller.show_work_queue(req,
+                                                   tenant_id=self.tenant)
+        self.assertEqual(response, {'work_queue': engine_response})
+        self.m.VerifyAll()
+
 
 @attr(tag=['unit', 'api-openstack-v1', 'ResourceController'])
 @attr(speed='fast')
@@ -1193,6 +1211,67 @@ class ResourceControllerTest(ControllerTest, unittest.TestCase):
                           resource_name=res_name)
         self.m.VerifyAll()
 
+    def test_members(self):
+        res_name = 'WebServerGroup'
+        stack_identity = identifier.HeatIdentifier(self.tenant,
+                                                   'wordpress', '6')
+        res_identity = identifier.ResourceIdentifier(resource_name=res_name,
+                                                     **stack_identity)
+
+        req = self._get(res_identity._tenant_path() + '/members')
+
+        engine_resp = [
+            {
+                u'logical_resource_id': u'WebServerGroup-0',
+                u'physical_resource_id':
+                u'a3455d8c-9f88-404d-a85b-5315293e67de',
+                u'resource_status': u'CREATE_COMPLETE',
+                u'updated_time': u'2012-07-23T13:06:00Z',
+            }
+        ]
+        self.m.StubOutWithMock(rpc, 'call')
+        rpc.call(req.context, self.topic,
+                 {'method': 'list_group_members',
+                  'args': {'stack_identity': stack_identity,
+                           'resource_name': res_name},
+                  'version': self.api_version},
+                 None).AndReturn(engine_resp)
+        self.m.ReplayAll()
+
+        result = self.controller.members(req, tenant_id=self.tenant,
+                                         stack_name=stack_identity.stack_name,
+                                         stack_id=stack_identity.stack_id,
+                                         resource_name=res_name)
+
+        self.assertEqual(result, {'members': engine_resp})
+        self.m.VerifyAll()
+
+    def test_members_not_group(self):
+        res_name = 'WikiDatabase'
+        stack_identity = identifier.HeatIdentifier(self.tenant,
+                                                   'wordpress', '1')
+        res_identity = identifier.ResourceIdentifier(resource_name=res_name,
+                                                     **stack_identity)
+
+        req = self._get(res_identity._tenant_path() + '/members')
+
+        self.m.StubOutWithMock(rpc, 'call')
+        rpc.call(req.context, self.topic,
+                 {'method': 'list_group_members',
+                  'args': {'stack_identity': stack_identity,
+                           'resource_name': res_name},
+                  'version': self.api_version},
+                 None).AndRaise(rpc_common.RemoteError("ValueError"))
+        self.m.ReplayAll()
+
+        self.assertRaises(webob.exc.HTTPBadRequest,
+                          self.controller.members,
+                          req, tenant_id=self.tenant,
+                          stack_name=stack_identity.stack_name,
+                          stack_id=stack_identity.stack_id,
+                          resource_name=res_name)
+        self.m.VerifyAll()
+
 
 @attr(tag=['unit', 'api-openstack-v1', 'EventController'])
 @attr(speed='fast')
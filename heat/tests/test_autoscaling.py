@@ -28,6 +28,7 @@ from heat.engine.resources import autoscaling as asc
 from heat.engine.resources import loadbalancer
 from heat.engine.resources import instance
 from heat.engine import parser
+from heat.engine import scheduler
 from heat.engine.resource import Metadata
 from heat.openstack.common import timeutils
 
@@ -59,6 +60,7 @@ class AutoScalingTest(unittest.TestCase):
         template = parser.Template(t)
         params = parser.Parameters('test_stack', template, {'KeyName': 'test'})
         stack = parser.Stack(ctx, 'test_stack', template, params)
+        stack.store()
 
         return stack
 
@@ -120,7 +122,9 @@ class AutoScalingTest(unittest.TestCase):
         resource = self.create_scaling_group(t, stack, 'WebServerGroup')
 
         self.assertEqual('WebServerGroup', resource.FnGetRefId())
-        self.assertEqual('WebServerGroup-0', resource.resource_id)
+        self.assertEqual(['WebServerGroup-0'], resource.get_instance_names())
+        self.assertEqual(['WebServerGroup-0'],
+                         [m.name for m in resource.group_members()])
         self.assertEqual(asc.AutoScalingGroup.UPDATE_REPLACE,
                          resource.handle_update({}))
 
@@ -140,14 +144,14 @@ class AutoScalingTest(unittest.TestCase):
         self._stub_create(1)
         self.m.ReplayAll()
         resource = self.create_scaling_group(t, stack, 'WebServerGroup')
-        self.assertEqual('WebServerGroup-0', resource.resource_id)
+        self.assertEqual(['WebServerGroup-0'], resource.get_instance_names())
 
         # Reduce the max size to 2, should complete without adjusting
         update_snippet = copy.deepcopy(resource.parsed_template())
         update_snippet['Properties']['MaxSize'] = '2'
         self.assertEqual(asc.AutoScalingGroup.UPDATE_COMPLETE,
                          resource.handle_update(update_snippet))
-        self.assertEqual('WebServerGroup-0', resource.resource_id)
+        self.assertEqual(['WebServerGroup-0'], resource.get_instance_names())
 
         resource.delete()
         self.m.VerifyAll()
@@ -165,7 +169,7 @@ class AutoScalingTest(unittest.TestCase):
         self._stub_create(1)
         self.m.ReplayAll()
         resource = self.create_scaling_group(t, stack, 'WebServerGroup')
-        self.assertEqual('WebServerGroup-0', resource.resource_id)
+        self.assertEqual(['WebServerGroup-0'], resource.get_instance_names())
 
         # Increase min size to 2, should trigger an ExactCapacity adjust
         self._stub_lb_reload(['WebServerGroup-0', 'WebServerGroup-1'])
@@ -177,8 +181,8 @@ class AutoScalingTest(unittest.TestCase):
         update_snippet['Properties']['MinSize'] = '2'
         self.assertEqual(asc.AutoScalingGroup.UPDATE_COMPLETE,
                          resource.handle_update(update_snippet))
-        self.assertEqual('WebServerGroup-0,WebServerGroup-1',
-                         resource.resource_id)
+        self.assertEqual(['WebServerGroup-0', 'WebServerGroup-1'],
+                         resource.get_instance_names())
 
         resource.delete()
         self.m.VerifyAll()
@@ -196,7 +200,7 @@ class AutoScalingTest(unittest.TestCase):
         self._stub_create(1)
         self.m.ReplayAll()
         resource = self.create_scaling_group(t, stack, 'WebServerGroup')
-        self.assertEqual('WebServerGroup-0', resource.resource_id)
+        self.assertEqual(['WebServerGroup-0'], resource.get_instance_names())
 
         # Increase min size to 2 via DesiredCapacity, should adjust
         self._stub_lb_reload(['WebServerGroup-0', 'WebServerGroup-1'])
@@ -208,8 +212,8 @@ class AutoScalingTest(unittest.TestCase):
         update_snippet['Properties']['DesiredCapacity'] = '2'
         self.assertEqual(asc.AutoScalingGroup.UPDATE_COMPLETE,
                          resource.handle_update(update_snippet))
-        self.assertEqual('WebServerGroup-0,WebServerGroup-1',
-                         resource.resource_id)
+        self.assertEqual(['WebServerGroup-0', 'WebServerGroup-1'],
+                         resource.get_instance_names())
 
         resource.delete()
         self.m.VerifyAll()
@@ -226,8 +230,8 @@ class AutoScalingTest(unittest.TestCase):
         self._stub_create(2)
         self.m.ReplayAll()
         resource = self.create_scaling_group(t, stack, 'WebServerGroup')
-        self.assertEqual('WebServerGroup-0,WebServerGroup-1',
-                         resource.resource_id)
+        self.assertEqual(['WebServerGroup-0', 'WebServerGroup-1'],
+                         resource.get_instance_names())
 
         # Remove DesiredCapacity from the updated template, which should
         # have no effect, it's an optional parameter
@@ -235,8 +239,8 @@ class AutoScalingTest(unittest.TestCase):
         del(update_snippet['Properties']['DesiredCapacity'])
         self.assertEqual(asc.AutoScalingGroup.UPDATE_COMPLETE,
                          resource.handle_update(update_snippet))
-        self.assertEqual('WebServerGroup-0,WebServerGroup-1',
-                         resource.resource_id)
+        self.assertEqual(['WebServerGroup-0', 'WebServerGroup-1'],
+                         resource.get_instance_names())
 
         resource.delete()
         self.m.VerifyAll()
@@ -255,7 +259,7 @@ class AutoScalingTest(unittest.TestCase):
         resource = self.create_scaling_group(t, stack, 'WebServerGroup')
 
         self.assertEqual('WebServerGroup', resource.FnGetRefId())
-        self.assertEqual('WebServerGroup-0', resource.resource_id)
+        self.assertEqual(['WebServerGroup-0'], resource.get_instance_names())
         update_snippet = copy.deepcopy(resource.parsed_template())
         old_cd = update_snippet['Properties']['Cooldown']
         update_snippet['Properties']['Cooldown'] = '61'
@@ -279,15 +283,15 @@ class AutoScalingTest(unittest.TestCase):
         self._stub_create(3)
         self.m.ReplayAll()
         resource = self.create_scaling_group(t, stack, 'WebServerGroup')
-        self.assertEqual('WebServerGroup-0,WebServerGroup-1,WebServerGroup-2',
-                         resource.resource_id)
+        self.assertEqual(['WebServerGroup-%d' % x for x in range(3)],
+                         resource.get_instance_names())
 
         # reduce to 1
         self._stub_lb_reload(['WebServerGroup-0'])
         self._stub_meta_expected(now, 'ChangeInCapacity : -2')
         self.m.ReplayAll()
         resource.adjust(-2)
-        self.assertEqual('WebServerGroup-0', resource.resource_id)
+        self.assertEqual(['WebServerGroup-0'], resource.get_instance_names())
 
         # raise to 3
         self._stub_lb_reload(['WebServerGroup-0', 'WebServerGroup-1',
@@ -296,16 +300,135 @@ class AutoScalingTest(unittest.TestCase):
         self._stub_create(2)
         self.m.ReplayAll()
         resource.adjust(2)
-        self.assertEqual('WebServerGroup-0,WebServerGroup-1,WebServerGroup-2',
-                         resource.resource_id)
+        self.assertEqual(['WebServerGroup-%d' % x for x in range(3)],
+                         resource.get_instance_names())
 
         # set to 2
         self._stub_lb_reload(['WebServerGroup-0', 'WebServerGroup-1'])
         self._stub_meta_expected(now, 'ExactCapacity : 2')
         self.m.ReplayAll()
         resource.adjust(2, 'ExactCapacity')
-        self.assertEqual('WebServerGroup-0,WebServerGroup-1',
-                         resource.resource_id)
+        self.assertEqual(['WebServerGroup-0', 'WebServerGroup-1'],
+                         resource.get_instance_names())
+        self.m.VerifyAll()
+
+    def _stub_pool(self, standby=0, activate=0):
+        self.m.StubOutWithMock(asc.GroupedInstanceMixin, 'standby')
+        for x in range(standby):
+            asc.GroupedInstanceMixin.standby().AndReturn(None)
+        self.m.StubOutWithMock(asc.GroupedInstanceMixin, 'activate')
+        for x in range(activate):
+            asc.GroupedInstanceMixin.activate().AndReturn(None)
+
+    def _stub_refill(self, stack):
+        self.m.StubOutWithMock(scheduler.work_queue, 'submit')
+        scheduler.work_queue.submit(scheduler.WorkQueue.NORMAL,
+                                    stack.context.tenant_id, stack.id,
+                                    mox.IgnoreArg()).AndReturn(None)
+
+    def test_scaling_group_warm_pool(self):
+        t = self.load_template()
+        properties = t['Resources']['WebServerGroup']['Properties']
+        properties['WarmPoolSize'] = '1'
+        stack = self.parse_stack(t)
+
+        # start with 1 member, then fill the pool in an operation of its own
+        self._stub_lb_reload(['WebServerGroup-0'])
+        self._stub_create(2)
+        self._stub_pool(standby=1)
+        self._stub_refill(stack)
+        self.m.ReplayAll()
+        resource = self.create_scaling_group(t, stack, 'WebServerGroup')
+        self.assertEqual(['WebServerGroup-0'], resource.get_instance_names())
+        self.assertEqual([], resource._pool_members())
+        resource._refill_pool()
+        self.assertEqual(['WebServerGroup-1'],
+                         [m.name for m in resource._pool_members()])
+        self.assertEqual({'Size': 1, 'Available': 1},
+                         resource.metadata['WarmPool'])
+
+        # raise to 2, promoting the pooled member before queueing the refill
+        self.m.VerifyAll()
+        self.m.UnsetStubs()
+        self._stub_lb_reload(['WebServerGroup-0', 'WebServerGroup-1'])
+        self._stub_pool(activate=1)
+        self._stub_refill(stack)
+        self.m.ReplayAll()
+        resource.adjust(1)
+        self.assertEqual(['WebServerGroup-0', 'WebServerGroup-1'],
+                         resource.get_instance_names())
+        self.assertEqual({'Size': 1, 'Available': 0},
+                         resource.metadata['WarmPool'])
+
+        self.m.VerifyAll()
+        self.m.UnsetStubs()
+        self._stub_create(1)
+        self._stub_pool(standby=1)
+        self.m.ReplayAll()
+        resource._refill_pool()
+        self.assertEqual(['WebServerGroup-0', 'WebServerGroup-1'],
+                         resource.get_instance_names())
+        self.assertEqual(['WebServerGroup-2'],
+                         [m.name for m in resource._pool_members()])
+        self.assertEqual({'Size': 1, 'Available': 1},
+                         resource.metadata['WarmPool'])
+
+        self.m.VerifyAll()
+
+    def test_scaling_group_warm_pool_empty_group(self):
+        t = self.load_template()
+        properties = t['Resources']['WebServerGroup']['Properties']
+        properties['MinSize'] = '0'
+        properties['WarmPoolSize'] = '1'
+        stack = self.parse_stack(t)
+
+        # the pool is filled even though the group starts with no members
+        self._stub_refill(stack)
+        self.m.ReplayAll()
+        resource = self.create_scaling_group(t, stack, 'WebServerGroup')
+        self.assertEqual([], resource.get_instance_names())
+
+        self.m.VerifyAll()
+
+    def test_scaling_group_warm_pool_failed(self):
+        t = self.load_template()
+        properties = t['Resources']['WebServerGroup']['Properties']
+        properties['WarmPoolSize'] = '1'
+        stack = self.parse_stack(t)
+
+        self._stub_lb_reload(['WebServerGroup-0'])
+        self._stub_create(2)
+        self._stub_pool(standby=1)
+        self._stub_refill(stack)
+        self.m.ReplayAll()
+        resource = self.create_scaling_group(t, stack, 'WebServerGroup')
+        resource._refill_pool()
+
+        # a pool member which cannot be deleted is not part of the group
+        self.m.VerifyAll()
+        self.m.UnsetStubs()
+        self.m.StubOutWithMock(instance.Instance, 'destroy')
+        instance.Instance.destroy().AndReturn('boom')
+        self.m.ReplayAll()
+        list(resource._delete_members(resource._pool_members()))
+        self.assertEqual([resource.MEMBER_POOL_FAILED],
+                         [m.state for m in resource._pool_members()])
+        self.assertEqual(['WebServerGroup-0'], resource.get_instance_names())
+
+        # and is cleaned up when the pool is next filled
+        self.m.VerifyAll()
+        self.m.UnsetStubs()
+        self.m.StubOutWithMock(instance.Instance, 'destroy')
+        instance.Instance.destroy().AndReturn(None)
+        self._stub_create(1)
+        self._stub_pool(standby=1)
+        self.m.ReplayAll()
+        resource.fill_pool()
+        self.assertEqual(['WebServerGroup-1'],
+                         [m.name for m in resource._pool_members()])
+        self.assertEqual({'Size': 1, 'Available': 1},
+                         resource.metadata['WarmPool'])
+
         self.m.VerifyAll()
 
     def test_scaling_group_nochange(self):
@@ -322,23 +445,23 @@ class AutoScalingTest(unittest.TestCase):
         self.m.ReplayAll()
         resource = self.create_scaling_group(t, stack, 'WebServerGroup')
         stack.resources['WebServerGroup'] = resource
-        self.assertEqual('WebServerGroup-0,WebServerGroup-1',
-                         resource.resource_id)
+        self.assertEqual(['WebServerGroup-0', 'WebServerGroup-1'],
+                         resource.get_instance_names())
 
         # raise above the max
         resource.adjust(2)
-        self.assertEqual('WebServerGroup-0,WebServerGroup-1',
-                         resource.resource_id)
+        self.assertEqual(['WebServerGroup-0', 'WebServerGroup-1'],
+                         resource.get_instance_names())
 
         # lower below the min
         resource.adjust(-2)
-        self.assertEqual('WebServerGroup-0,WebServerGroup-1',
-                         resource.resource_id)
+        self.assertEqual(['WebServerGroup-0', 'WebServerGroup-1'],
+                         resource.get_instance_names())
 
         # no change
         resource.adjust(0)
-        self.assertEqual('WebServerGroup-0,WebServerGroup-1',
-                         resource.resource_id)
+        self.assertEqual(['WebServerGroup-0', 'WebServerGroup-1'],
+                         resource.get_instance_names())
         resource.delete()
         self.m.VerifyAll()
 
@@ -356,16 +479,16 @@ class AutoScalingTest(unittest.TestCase):
         self.m.ReplayAll()
         resource = self.create_scaling_group(t, stack, 'WebServerGroup')
         stack.resources['WebServerGroup'] = resource
-        self.assertEqual('WebServerGroup-0,WebServerGroup-1',
-                         resource.resource_id)
+        self.assertEqual(['WebServerGroup-0', 'WebServerGroup-1'],
+                         resource.get_instance_names())
 
         # reduce by 50%
         self._stub_lb_reload(['WebServerGroup-0'])
         self._stub_meta_expected(now, 'PercentChangeInCapacity : -50')
         self.m.ReplayAll()
         resource.adjust(-50, 'PercentChangeInCapacity')
-        self.assertEqual('WebServerGroup-0',
-                         resource.resource_id)
+        self.assertEqual(['WebServerGroup-0'],
+                         resource.get_instance_names())
 
         # raise by 200%
         self._stub_lb_reload(['WebServerGroup-0', 'WebServerGroup-1',
@@ -374,8 +497,8 @@ class AutoScalingTest(unittest.TestCase):
         self._stub_create(2)
         self.m.ReplayAll()
         resource.adjust(200, 'PercentChangeInCapacity')
-        self.assertEqual('WebServerGroup-0,WebServerGroup-1,WebServerGroup-2',
-                         resource.resource_id)
+        self.assertEqual(['WebServerGroup-%d' % x for x in range(3)],
+                         resource.get_instance_names())
 
         resource.delete()
 
@@ -394,16 +517,16 @@ class AutoScalingTest(unittest.TestCase):
         self.m.ReplayAll()
         resource = self.create_scaling_group(t, stack, 'WebServerGroup')
         stack.resources['WebServerGroup'] = resource
-        self.assertEqual('WebServerGroup-0,WebServerGroup-1',
-                         resource.resource_id)
+        self.assertEqual(['WebServerGroup-0', 'WebServerGroup-1'],
+                         resource.get_instance_names())
 
         # reduce by 50%
         self._stub_lb_reload(['WebServerGroup-0'])
         self._stub_meta_expected(now, 'PercentChangeInCapacity : -50')
         self.m.ReplayAll()
         resource.adjust(-50, 'PercentChangeInCapacity')
-        self.assertEqual('WebServerGroup-0',
-                         resource.resource_id)
+        self.assertEqual(['WebServerGroup-0'],
+                         resource.get_instance_names())
 
         # Now move time on 10 seconds - Cooldown in template is 60
         # so this should not update the policy metadata, and the
@@ -428,7 +551,7 @@ class AutoScalingTest(unittest.TestCase):
 
         # raise by 200%, too soon for Cooldown so there should be no change
         resource.adjust(200, 'PercentChangeInCapacity')
-        self.assertEqual('WebServerGroup-0', resource.resource_id)
+        self.assertEqual(['WebServerGroup-0'], resource.get_instance_names())
 
         resource.delete()
 
@@ -447,16 +570,16 @@ class AutoScalingTest(unittest.TestCase):
         self.m.ReplayAll()
         resource = self.create_scaling_group(t, stack, 'WebServerGroup')
         stack.resources['WebServerGroup'] = resource
-        self.assertEqual('WebServerGroup-0,WebServerGroup-1',
-                         resource.resource_id)
+        self.assertEqual(['WebServerGroup-0', 'WebServerGroup-1'],
+                         resource.get_instance_names())
 
         # reduce by 50%
         self._stub_lb_reload(['WebServerGroup-0'])
         self._stub_meta_expected(now, 'PercentChangeInCapacity : -50')
         self.m.ReplayAll()
         resource.adjust(-50, 'PercentChangeInCapacity')
-        self.assertEqual('WebServerGroup-0',
-                         resource.resource_id)
+        self.assertEqual(['WebServerGroup-0'],
+                         resource.get_instance_names())
 
         # Now move time on 61 seconds - Cooldown in template is 60
         # so this should update the policy metadata, and the
@@ -480,8 +603,8 @@ class AutoScalingTest(unittest.TestCase):
         self._stub_meta_expected(now, 'PercentChangeInCapacity : 200')
         self.m.ReplayAll()
         resource.adjust(200, 'PercentChangeInCapacity')
-        self.assertEqual('WebServerGroup-0,WebServerGroup-1,WebServerGroup-2',
-                         resource.resource_id)
+        self.assertEqual(['WebServerGroup-%d' % x for x in range(3)],
+                         resource.get_instance_names())
 
         resource.delete()
 
@@ -500,16 +623,16 @@ class AutoScalingTest(unittest.TestCase):
         self.m.ReplayAll()
         resource = self.create_scaling_group(t, stack, 'WebServerGroup')
         stack.resources['WebServerGroup'] = resource
-        self.assertEqual('WebServerGroup-0,WebServerGroup-1',
-                         resource.resource_id)
+        self.assertEqual(['WebServerGroup-0', 'WebServerGroup-1'],
+                         resource.get_instance_names())
 
         # reduce by 50%
         self._stub_lb_reload(['WebServerGroup-0'])
         self._stub_meta_expected(now, 'PercentChangeInCapacity : -50')
         self.m.ReplayAll()
         resource.adjust(-50, 'PercentChangeInCapacity')
-        self.assertEqual('WebServerGroup-0',
-                         resource.resource_id)
+        self.assertEqual(['WebServerGroup-0'],
+                         resource.get_instance_names())
 
         # Don't move time, since cooldown is zero, it should work
         previous_meta = {timeutils.strtime(now):
@@ -529,8 +652,8 @@ class AutoScalingTest(unittest.TestCase):
         self._stub_create(2)
         self.m.ReplayAll()
         resource.adjust(200, 'PercentChangeInCapacity')
-        self.assertEqual('WebServerGroup-0,WebServerGroup-1,WebServerGroup-2',
-                         resource.resource_id)
+        self.assertEqual(['WebServerGroup-%d' % x for x in range(3)],
+                         resource.get_instance_names())
 
         resource.delete()
         self.m.VerifyAll()
@@ -547,7 +670,7 @@ class AutoScalingTest(unittest.TestCase):
         self.m.ReplayAll()
         resource = self.create_scaling_group(t, stack, 'WebServerGroup')
         stack.resources['WebServerGroup'] = resource
-        self.assertEqual('WebServerGroup-0', resource.resource_id)
+        self.assertEqual(['WebServerGroup-0'], resource.get_instance_names())
 
         # Scale up one
         self._stub_lb_reload(['WebServerGroup-0', 'WebServerGroup-1'])
@@ -557,8 +680,8 @@ class AutoScalingTest(unittest.TestCase):
         up_policy = self.create_scaling_policy(t, stack,
                                                'WebServerScaleUpPolicy')
         up_policy.alarm()
-        self.assertEqual('WebServerGroup-0,WebServerGroup-1',
-                         resource.resource_id)
+        self.assertEqual(['WebServerGroup-0', 'WebServerGroup-1'],
+                         resource.get_instance_names())
 
         resource.delete()
         self.m.VerifyAll()
@@ -577,8 +700,8 @@ class AutoScalingTest(unittest.TestCase):
         self.m.ReplayAll()
         resource = self.create_scaling_group(t, stack, 'WebServerGroup')
         stack.resources['WebServerGroup'] = resource
-        self.assertEqual('WebServerGroup-0,WebServerGroup-1',
-                         resource.resource_id)
+        self.assertEqual(['WebServerGroup-0', 'WebServerGroup-1'],
+                         resource.get_instance_names())
 
         # Scale down one
         self._stub_lb_reload(['WebServerGroup-0'])
@@ -587,7 +710,7 @@ class AutoScalingTest(unittest.TestCase):
         down_policy = self.create_scaling_policy(t, stack,
                                                  'WebServerScaleDownPolicy')
         down_policy.alarm()
-        self.assertEqual('WebServerGroup-0', resource.resource_id)
+        self.assertEqual(['WebServerGroup-0'], resource.get_instance_names())
 
         resource.delete()
         self.m.VerifyAll()
@@ -604,7 +727,7 @@ class AutoScalingTest(unittest.TestCase):
         self.m.ReplayAll()
         resource = self.create_scaling_group(t, stack, 'WebServerGroup')
         stack.resources['WebServerGroup'] = resource
-        self.assertEqual('WebServerGroup-0', resource.resource_id)
+        self.assertEqual(['WebServerGroup-0'], resource.get_instance_names())
 
         # Scale up one
         self._stub_lb_reload(['WebServerGroup-0', 'WebServerGroup-1'])
@@ -614,8 +737,8 @@ class AutoScalingTest(unittest.TestCase):
         up_policy = self.create_scaling_policy(t, stack,
                                                'WebServerScaleUpPolicy')
         up_policy.alarm()
-        self.assertEqual('WebServerGroup-0,WebServerGroup-1',
-                         resource.resource_id)
+        self.assertEqual(['WebServerGroup-0', 'WebServerGroup-1'],
+                         resource.get_instance_names())
 
         # Now move time on 10 seconds - Cooldown in template is 60
         # so this should not update the policy metadata, and the
@@ -637,8 +760,8 @@ class AutoScalingTest(unittest.TestCase):
 
         self.m.ReplayAll()
         up_policy.alarm()
-        self.assertEqual('WebServerGroup-0,WebServerGroup-1',
-                         resource.resource_id)
+        self.assertEqual(['WebServerGroup-0', 'WebServerGroup-1'],
+                         resource.get_instance_names())
 
         resource.delete()
         self.m.VerifyAll()
@@ -655,7 +778,7 @@ class AutoScalingTest(unittest.TestCase):
         self.m.ReplayAll()
         resource = self.create_scaling_group(t, stack, 'WebServerGroup')
         stack.resources['WebServerGroup'] = resource
-        self.assertEqual('WebServerGroup-0', resource.resource_id)
+        self.assertEqual(['WebServerGroup-0'], resource.get_instance_names())
 
         # Scale up one
         self._stub_lb_reload(['WebServerGroup-0', 'WebServerGroup-1'])
@@ -665,8 +788,8 @@ class AutoScalingTest(unittest.TestCase):
         up_policy = self.create_scaling_policy(t, stack,
                                                'WebServerScaleUpPolicy')
         up_policy.alarm()
-        self.assertEqual('WebServerGroup-0,WebServerGroup-1',
-                         resource.resource_id)
+        self.assertEqual(['WebServerGroup-0', 'WebServerGroup-1'],
+                         resource.get_instance_names())
 
         # Now move time on 61 seconds - Cooldown in template is 60
         # so this should trigger a scale-up
@@ -688,8 +811,8 @@ class AutoScalingTest(unittest.TestCase):
 
         self.m.ReplayAll()
         up_policy.alarm()
-        self.assertEqual('WebServerGroup-0,WebServerGroup-1,WebServerGroup-2',
-                         resource.resource_id)
+        self.assertEqual(['WebServerGroup-%d' % x for x in range(3)],
+                         resource.get_instance_names())
 
         resource.delete()
         self.m.VerifyAll()
@@ -706,7 +829,7 @@ class AutoScalingTest(unittest.TestCase):
         self.m.ReplayAll()
         resource = self.create_scaling_group(t, stack, 'WebServerGroup')
         stack.resources['WebServerGroup'] = resource
-        self.assertEqual('WebServerGroup-0', resource.resource_id)
+        self.assertEqual(['WebServerGroup-0'], resource.get_instance_names())
 
         # Create the scaling policy (with Cooldown=0) and scale up one
         properties = t['Resources']['WebServerScaleUpPolicy']['Properties']
@@ -718,8 +841,8 @@ class AutoScalingTest(unittest.TestCase):
         up_policy = self.create_scaling_policy(t, stack,
                                                'WebServerScaleUpPolicy')
         up_policy.alarm()
-        self.assertEqual('WebServerGroup-0,WebServerGroup-1',
-                         resource.resource_id)
+        self.assertEqual(['WebServerGroup-0', 'WebServerGroup-1'],
+                         resource.get_instance_names())
 
         # Now trigger another scale-up without changing time, should work
         previous_meta = {timeutils.strtime(now): 'ChangeInCapacity : 1'}
@@ -739,8 +862,8 @@ class AutoScalingTest(unittest.TestCase):
 
         self.m.ReplayAll()
         up_policy.alarm()
-        self.assertEqual('WebServerGroup-0,WebServerGroup-1,WebServerGroup-2',
-                         resource.resource_id)
+        self.assertEqual(['WebServerGroup-%d' % x for x in range(3)],
+                         resource.get_instance_names())
 
         resource.delete()
         self.m.VerifyAll()
@@ -757,7 +880,7 @@ class AutoScalingTest(unittest.TestCase):
         self.m.ReplayAll()
         resource = self.create_scaling_group(t, stack, 'WebServerGroup')
         stack.resources['WebServerGroup'] = resource
-        self.assertEqual('WebServerGroup-0', resource.resource_id)
+        self.assertEqual(['WebServerGroup-0'], resource.get_instance_names())
 
         # Create the scaling policy no Cooldown property, should behave the
         # same as when Cooldown==0
@@ -771,8 +894,8 @@ class AutoScalingTest(unittest.TestCase):
         up_policy = self.create_scaling_policy(t, stack,
                                                'WebServerScaleUpPolicy')
         up_policy.alarm()
-        self.assertEqual('WebServerGroup-0,WebServerGroup-1',
-                         resource.resource_id)
+        self.assertEqual(['WebServerGroup-0', 'WebServerGroup-1'],
+                         resource.get_instance_names())
 
         # Now trigger another scale-up without changing time, should work
         previous_meta = {timeutils.strtime(now): 'ChangeInCapacity : 1'}
@@ -792,8 +915,8 @@ class AutoScalingTest(unittest.TestCase):
 
         self.m.ReplayAll()
         up_policy.alarm()
-        self.assertEqual('WebServerGroup-0,WebServerGroup-1,WebServerGroup-2',
-                         resource.resource_id)
+        self.assertEqual(['WebServerGroup-%d' % x for x in range(3)],
+                         resource.get_instance_names())
 
         resource.delete()
         self.m.VerifyAll()
@@ -192,3 +192,10 @@ class dependenciesTest(unittest.TestCase):
         for n in ('last', 'mid1', 'mid2', 'mid3'):
             self.assertTrue(n in order,
                             "'%s' not found in dependency order" % n)
+
+    def test_requires(self):
+        d = Dependencies([('last', 'mid1'), ('last', 'mid2'),
+                          ('mid1', 'first'), ('mid2', 'first')])
+        self.assertEqual(set(d.requires('last')), set(['mid1', 'mid2']))
+        self.assertEqual(set(d.requires('mid1')), set(['first']))
+        self.assertEqual(list(d.requires('first')), [])
@@ -27,9 +27,11 @@ import heat.db as db_api
 from heat.common import identifier
 from heat.common import template_format
 from heat.engine import parser
+from heat.engine import scheduler
 from heat.engine import service
 from heat.engine.resources import instance as instances
 from heat.engine import watchrule
+from heat.openstack.common import cfg
 from heat.openstack.common import threadgroup
 
 
@@ -98,6 +100,17 @@ class DummyThreadGroup(object):
         pass
 
 
+class DummyWorkQueue(object):
+    def __init__(self):
+        self.jobs = []
+
+    def submit(self, priority, tenant, key, func, *args, **kwargs):
+        self.jobs.append((priority, tenant, key, func))
+
+    def cancel(self, key):
+        self.jobs = [j for j in self.jobs if j[2] != key]
+
+
 @attr(tag=['unit', 'stack'])
 @attr(speed='slow')
 class stackCreateTest(unittest.TestCase):
@@ -183,6 +196,7 @@ class stackServiceCreateUpdateDeleteTest(unittest.TestCase):
 
         self.m.StubOutWithMock(threadgroup, 'ThreadGroup')
         threadgroup.ThreadGroup().AndReturn(DummyThreadGroup())
+        self.man.work_queue = DummyWorkQueue()
 
         self.m.ReplayAll()
 
@@ -191,6 +205,9 @@ class stackServiceCreateUpdateDeleteTest(unittest.TestCase):
         self.assertEqual(result, stack.identifier())
         self.assertTrue(isinstance(result, dict))
         self.assertTrue(result['stack_id'])
+        self.assertEqual(self.man.work_queue.jobs,
+                         [(scheduler.WorkQueue.NORMAL, self.ctx.tenant_id,
+                           result['stack_id'], stack.create)])
         self.m.VerifyAll()
 
     def test_stack_create_verify_err(self):
@@ -251,11 +268,30 @@ class stackServiceCreateUpdateDeleteTest(unittest.TestCase):
         self.m.StubOutWithMock(parser.Stack, 'load')
 
         parser.Stack.load(self.ctx, stack=s).AndReturn(stack)
+        self.man.work_queue = DummyWorkQueue()
+        self.man.work_queue.submit(scheduler.WorkQueue.NORMAL, self.tenant,
+                                   sid, stack.create)
 
         self.m.ReplayAll()
 
         self.assertEqual(self.man.delete_stack(self.ctx, stack.identifier()),
                          None)
+        self.assertEqual(self.man.work_queue.jobs,
+                         [(scheduler.WorkQueue.HIGH, s.tenant, sid,
+                           stack.delete)])
+        self.m.VerifyAll()
+
+    def test_show_work_queue(self):
+        stats = {'running': 1, 'limit': 50, 'queued': 0,
+                 'queued_by_priority': {'high': 0, 'normal': 0}}
+        self.m.StubOutWithMock(self.man.work_queue, 'stats')
+        self.man.work_queue.stats(None).AndReturn(stats)
+        self.man.work_queue.stats('test_tenant').AndReturn(stats)
+        self.m.ReplayAll()
+
+        self.assertEqual(self.man.show_work_queue(self.ctx), stats)
+        tenant_ctx = context.RequestContext(tenant_id='test_tenant')
+        self.assertEqual(self.man.show_work_queue(tenant_ctx), stats)
         self.m.VerifyAll()
 
     def test_stack_delete_nonexist(self):
@@ -356,6 +392,92 @@ class stackServiceCreateUpdateDeleteTest(unittest.TestCase):
                           self.ctx, stack.identifier(), template, params, {})
         self.m.VerifyAll()
 
+    def test_start_resumes_in_progress(self):
+        stack = get_wordpress_stack('service_resume_test_stack', self.ctx)
+        stack.state = stack.UPDATE_IN_PROGRESS
+        sid = stack.store()
+        done = get_wordpress_stack('service_resume_done_test_stack',
+                                   self.ctx)
+        done.state = done.CREATE_COMPLETE
+        done.store()
+
+        self.m.stubs.Set(service.service.Service, 'start', lambda s: None)
+        self.man.tg = DummyThreadGroup()
+        self.m.StubOutWithMock(service.db_api, 'stack_get_all')
+        service.db_api.stack_get_all(mox.IgnoreArg()).AndReturn(
+            [db_api.stack_get(self.ctx, sid),
+             db_api.stack_get(self.ctx, done.id)])
+        self.m.StubOutWithMock(self.man, '_timer_in_thread')
+        self.man._timer_in_thread(sid, self.man._periodic_watcher_task,
+                                  sid=sid)
+        self.man._timer_in_thread(done.id, self.man._periodic_watcher_task,
+                                  sid=done.id)
+        self.m.StubOutWithMock(parser.Stack, 'load')
+        parser.Stack.load(mox.IgnoreArg(), stack_id=sid).AndReturn(stack)
+        self.m.StubOutWithMock(self.man, '_start_in_thread')
+        self.man._start_in_thread(scheduler.WorkQueue.NORMAL,
+                                  self.ctx.tenant_id, sid, stack.resume)
+        self.m.ReplayAll()
+
+        cfg.CONF.set_override('resume_stack_operations', True)
+        try:
+            self.man.start()
+        finally:
+            cfg.CONF.clear_override('resume_stack_operations')
+        self.m.VerifyAll()
+
+    def test_start_resumes_parameters_null(self):
+        stack = get_wordpress_stack('service_resume_null_test_stack',
+                                    self.ctx)
+        stack.state = stack.UPDATE_IN_PROGRESS
+        sid = stack.store()
+
+        # Rows written before the pending_parameters column was added
+        # hold NULL
+        self.ctx.session.execute(
+            'UPDATE stack SET pending_parameters = NULL WHERE id = :id',
+            {'id': sid})
+
+        self.m.stubs.Set(service.service.Service, 'start', lambda s: None)
+        self.man.tg = DummyThreadGroup()
+        self.m.StubOutWithMock(service.db_api, 'stack_get_all')
+        service.db_api.stack_get_all(mox.IgnoreArg()).AndReturn(
+            [db_api.stack_get(self.ctx, sid)])
+        self.m.StubOutWithMock(self.man, '_timer_in_thread')
+        self.man._timer_in_thread(sid, self.man._periodic_watcher_task,
+                                  sid=sid)
+        self.m.StubOutWithMock(self.man, '_start_in_thread')
+        self.man._start_in_thread(scheduler.WorkQueue.NORMAL,
+                                  self.ctx.tenant_id, sid, mox.IgnoreArg())
+        self.m.ReplayAll()
+
+        cfg.CONF.set_override('resume_stack_operations', True)
+        try:
+            self.man.start()
+        finally:
+            cfg.CONF.clear_override('resume_stack_operations')
+        self.m.VerifyAll()
+
+    def test_start_resume_disabled(self):
+        stack = get_wordpress_stack('service_noresume_test_stack', self.ctx)
+        stack.state = stack.CREATE_IN_PROGRESS
+        sid = stack.store()
+
+        self.m.stubs.Set(service.service.Service, 'start', lambda s: None)
+        self.man.tg = DummyThreadGroup()
+        self.m.StubOutWithMock(service.db_api, 'stack_get_all')
+        service.db_api.stack_get_all(mox.IgnoreArg()).AndReturn(
+            [db_api.stack_get(self.ctx, sid)])
+        self.m.StubOutWithMock(self.man, '_timer_in_thread')
+        self.man._timer_in_thread(sid, self.man._periodic_watcher_task,
+                                  sid=sid)
+        self.m.StubOutWithMock(self.man, '_start_in_thread')
+        self.m.ReplayAll()
+
+        # by default, another engine may own the operation
+        self.man.start()
+        self.m.VerifyAll()
+
 
 @attr(tag=['unit', 'engine-api', 'engine-service'])
 @attr(speed='fast')
@@ -673,6 +795,39 @@ class stackServiceTest(unittest.TestCase):
                           self.man.list_stack_resources,
                           self.ctx, nonexist)
 
+    def test_list_group_members(self):
+        rsrc = self.stack['WebServer']
+        db_api.group_member_create(self.ctx, {
+            'group_id': rsrc.id,
+            'name': 'WebServer-0',
+            'state': 'CREATE_COMPLETE',
+            'physical_resource_id': 'abc123'})
+        self.m.StubOutWithMock(instances.Instance, 'group_members')
+        instances.Instance.group_members().AndReturn(
+            db_api.group_member_get_all_by_group(self.ctx, rsrc.id))
+        self.m.ReplayAll()
+
+        members = self.man.list_group_members(self.ctx,
+                                              dict(self.stack_identity),
+                                              'WebServer')
+        self.assertEqual(len(members), 1)
+        m = members[0]
+        for key in engine_api.GROUP_MEMBER_KEYS:
+            self.assertTrue(key in m)
+        self.assertEqual(m['logical_resource_id'], 'WebServer-0')
+        self.assertEqual(m['physical_resource_id'], 'abc123')
+        self.assertEqual(m['resource_status'], 'CREATE_COMPLETE')
+
+    def test_list_group_members_not_group(self):
+        self.assertRaises(ValueError,
+                          self.man.list_group_members,
+                          self.ctx, dict(self.stack_identity), 'WebServer')
+
+    def test_list_group_members_err_resource(self):
+        self.assertRaises(exception.ResourceNotFound,
+                          self.man.list_group_members,
+                          self.ctx, dict(self.stack_identity), 'NooServer')
+
     def test_metadata(self):
         test_metadata = {'foo': 'bar', 'baz': 'quux', 'blarg': 'wibble'}
         pre_update_meta = self.stack['WebServer'].metadata
@@ -808,9 +963,9 @@ class stackServiceTest(unittest.TestCase):
         parser.Stack.__getitem__(
             'WebServerRestartPolicy').AndReturn(dummy_action)
 
-        # Replace the real stack threadgroup with a dummy one, so we can
+        # Replace the real work queue with a dummy one, so we can
         # check the function returned on ALARM is correctly scheduled
-        self.man.stg[self.stack.id] = DummyThreadGroup()
+        self.man.work_queue = DummyWorkQueue()
 
         self.m.ReplayAll()
 
@@ -819,22 +974,23 @@ class stackServiceTest(unittest.TestCase):
                                           watch_name="OverrideAlarm",
                                           state=state)
         self.assertEqual(result[engine_api.WATCH_STATE_VALUE], state)
-        self.assertEqual(self.man.stg[self.stack.id].threads, [])
+        self.assertEqual(self.man.work_queue.jobs, [])
 
         state = watchrule.WatchRule.NORMAL
         result = self.man.set_watch_state(self.ctx,
                                           watch_name="OverrideAlarm",
                                           state=state)
         self.assertEqual(result[engine_api.WATCH_STATE_VALUE], state)
-        self.assertEqual(self.man.stg[self.stack.id].threads, [])
+        self.assertEqual(self.man.work_queue.jobs, [])
 
         state = watchrule.WatchRule.ALARM
         result = self.man.set_watch_state(self.ctx,
                                           watch_name="OverrideAlarm",
                                           state=state)
         self.assertEqual(result[engine_api.WATCH_STATE_VALUE], state)
-        self.assertEqual(self.man.stg[self.stack.id].threads,
-                         [DummyAction.alarm])
+        self.assertEqual(self.man.work_queue.jobs,
+                         [(scheduler.WorkQueue.HIGH, self.ctx.tenant_id,
+                           self.stack.id, DummyAction.alarm)])
 
         # Cleanup, delete the dummy rule
         db_api.watch_rule_delete(self.ctx, "OverrideAlarm")
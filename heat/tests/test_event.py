@@ -94,3 +94,61 @@ class EventTest(unittest.TestCase):
             'path': '/resources/EventTestResource/events/%s' % str(eid)
         }
         self.assertEqual(e.identifier(), expected_identifier)
+
+    def test_properties_shared(self):
+        e1 = event.Event(self.ctx, self.stack, self.resource,
+                         'TEST_IN_PROGRESS', 'Testing',
+                         'wibble', {'UserData': 'x' * 8192})
+        e1.store()
+        e2 = event.Event(self.ctx, self.stack, self.resource,
+                         'TEST_COMPLETE', 'Testing',
+                         'wibble', {'UserData': 'x' * 8192})
+        e2.store()
+
+        ev1 = db_api.event_get(self.ctx, e1.id)
+        ev2 = db_api.event_get(self.ctx, e2.id)
+        self.assertEqual(ev1.properties_id, ev2.properties_id)
+        self.assertEqual(ev1.properties.refcount, 2)
+        self.assertEqual(ev2.resource_properties, {'UserData': 'x' * 8192})
+
+    def test_properties_released(self):
+        props = {'UserData': 'y' * 8192}
+        e1 = event.Event(self.ctx, self.stack, self.resource,
+                         'TEST_IN_PROGRESS', 'Testing', 'wibble', props)
+        e1.store()
+
+        other = parser.Stack(self.ctx, 'event_release_test_stack',
+                             template.Template(tmpl))
+        other.store()
+        other_res = other['EventTestResource']
+        other_res._store()
+        e2 = event.Event(self.ctx, other, other_res,
+                         'TEST_IN_PROGRESS', 'Testing', 'wibble', props)
+        e2.store()
+        props_id = db_api.event_get(self.ctx, e1.id).properties_id
+
+        # the snapshot is kept while another stack's event uses it
+        db_api.stack_delete(self.ctx, other.id)
+        ev1 = db_api.event_get(self.ctx, e1.id)
+        self.assertEqual(ev1.properties_id, props_id)
+        self.assertEqual(ev1.properties.refcount, 1)
+
+    def test_properties_deleted(self):
+        props = {'UserData': 'z' * 8192}
+        other = parser.Stack(self.ctx, 'event_delete_test_stack',
+                             template.Template(tmpl))
+        other.store()
+        other_res = other['EventTestResource']
+        other_res._store()
+        for state in ('TEST_IN_PROGRESS', 'TEST_COMPLETE'):
+            e = event.Event(self.ctx, other, other_res,
+                            state, 'Testing', 'wibble', props)
+            e.store()
+        props_id = db_api.event_get(self.ctx, e.id).properties_id
+
+        # both references are dropped, and the snapshot with them
+        db_api.stack_delete(self.ctx, other.id)
+        count = self.ctx.session.execute(
+            'SELECT COUNT(*) FROM event_properties WHERE id = :id',
+            {'id': props_id}).scalar()
+        self.assertEqual(count, 0)
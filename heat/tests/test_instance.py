@@ -13,8 +13,10 @@
 #    under the License.
 
 
-import os
 import copy
+import gzip
+import os
+import StringIO
 
 import unittest
 import mox
@@ -25,6 +27,7 @@ from heat.tests.v1_1 import fakes
 from heat.engine.resources import instance as instances
 from heat.common import template_format
 from heat.engine import parser
+from heat.openstack.common import cfg
 from heat.openstack.common import uuidutils
 
 
@@ -183,3 +186,87 @@ class instancesTest(unittest.TestCase):
         self.assertEqual(instance.update(update_template),
                          instance.UPDATE_COMPLETE)
         self.assertEqual(instance.metadata, {'test': 123})
+
+    def _create_test_instance(self, name):
+        f = open("%s/WordPress_Single_Instance_gold.template" % self.path)
+        t = template_format.parse(f.read())
+        f.close()
+
+        stack_name = 'instance_userdata_test_stack'
+        template = parser.Template(t)
+        params = parser.Parameters(stack_name, template, {'KeyName': 'test'})
+        stack = parser.Stack(None, stack_name, template, params,
+                             stack_id=uuidutils.generate_uuid())
+
+        return instances.Instance(name, t['Resources']['WebServer'], stack)
+
+    def test_build_userdata_static_parts_cached(self):
+        instances._static_parts = None
+        self.m.StubOutWithMock(instances.pkgutil, 'get_data')
+        for fn in ('config', 'part-handler.py', 'loguserdata.py'):
+            instances.pkgutil.get_data(
+                'heat', 'cloudinit/%s' % fn).AndReturn('%s data' % fn)
+        self.m.ReplayAll()
+
+        first = self._create_test_instance('first_instance')
+        second = self._create_test_instance('second_instance')
+        first_userdata = first._build_userdata('first userdata')
+        second_userdata = second._build_userdata('second userdata')
+
+        self.assertTrue('config data' in first_userdata)
+        self.assertTrue('first userdata' in first_userdata)
+        self.assertTrue('config data' in second_userdata)
+        self.assertTrue('second userdata' in second_userdata)
+        self.m.VerifyAll()
+        instances._static_parts = None
+
+    def test_build_userdata_compressed(self):
+        cfg.CONF.set_override('compress_instance_userdata', True)
+        try:
+            instance = self._create_test_instance('gzip_instance')
+            userdata = instance._build_userdata('compressed userdata')
+        finally:
+            cfg.CONF.clear_override('compress_instance_userdata')
+
+        gz = gzip.GzipFile(fileobj=StringIO.StringIO(userdata))
+        mime_string = gz.read()
+        self.assertTrue(mime_string.startswith('Content-Type: multipart'))
+        self.assertTrue('compressed userdata' in mime_string)
+
+    def test_instance_ipaddress_cached(self):
+        instance = self._create_test_instance('cached_ip_instance')
+        instance.t = instance.stack.resolve_runtime_data(instance.t)
+        instance._store()
+        instance.resource_id = 1234
+        instance.cache_attribute('ipaddress', '1.2.3.4')
+
+        # A fresh object for the same resource, as after loading the stack
+        loaded = instances.Instance('cached_ip_instance', instance.t,
+                                    instance.stack)
+        loaded.id = instance.id
+        loaded.resource_id = 1234
+        self.m.StubOutWithMock(loaded, 'nova')
+        self.m.ReplayAll()
+
+        self.assertEqual(loaded.FnGetAtt('PublicIp'), '1.2.3.4')
+        self.m.VerifyAll()
+
+    def test_instance_ipaddress_cache_expired(self):
+        instance = self._create_test_instance('expired_ip_instance')
+        instance.t = instance.stack.resolve_runtime_data(instance.t)
+        instance._store()
+        instance.resource_id = 1234
+        instance.cache_attribute('ipaddress', '10.0.0.1')
+
+        cfg.CONF.set_override('attribute_cache_ttl', -1)
+        self.m.StubOutWithMock(instance, 'nova')
+        instance.nova().AndReturn(self.fc)
+        self.m.ReplayAll()
+        try:
+            ip = instance.FnGetAtt('PublicIp')
+        finally:
+            cfg.CONF.clear_override('attribute_cache_ttl')
+
+        self.assertEqual(ip, '1.2.3.4')
+        self.assertEqual(instance.cached_attribute('ipaddress'), '1.2.3.4')
+        self.m.VerifyAll()
@@ -13,6 +13,7 @@
 #    under the License.
 
 
+import copy
 import os
 
 import unittest
@@ -22,11 +23,15 @@ from nose.plugins.attrib import attr
 
 from heat.tests.v1_1 import fakes
 from heat.common import context
+from heat.common import exception
 from heat.common import template_format
+from heat.db import api as db_api
 from heat.engine.resources import autoscaling as asc
 from heat.engine.resources import instance
 from heat.engine.resources import loadbalancer
 from heat.engine import parser
+from heat.engine import resource as rsrc
+from heat.openstack.common import cfg
 
 
 @attr(tag=['unit', 'resource'])
@@ -39,6 +44,7 @@ class InstanceGroupTest(unittest.TestCase):
 
     def tearDown(self):
         self.m.UnsetStubs()
+        cfg.CONF.clear_override('instance_group_batch_size')
         print "InstanceGroupTest teardown complete"
 
     def load_template(self):
@@ -58,6 +64,7 @@ class InstanceGroupTest(unittest.TestCase):
         template = parser.Template(t)
         params = parser.Parameters('test_stack', template, {'KeyName': 'test'})
         stack = parser.Stack(ctx, 'test_stack', template, params)
+        stack.store()
 
         return stack
 
@@ -86,7 +93,7 @@ class InstanceGroupTest(unittest.TestCase):
         resource = self.create_instance_group(t, stack, 'JobServerGroup')
 
         self.assertEqual('JobServerGroup', resource.FnGetRefId())
-        self.assertEqual('JobServerGroup-0', resource.resource_id)
+        self.assertEqual(['JobServerGroup-0'], resource.get_instance_names())
         self.assertEqual(asc.InstanceGroup.UPDATE_REPLACE,
                          resource.handle_update({}))
 
@@ -110,3 +117,210 @@ class InstanceGroupTest(unittest.TestCase):
         self.assertEqual(asc.InstanceGroup.CREATE_FAILED, resource.state)
 
         self.m.VerifyAll()
+
+    def test_resize_batched(self):
+        cfg.CONF.set_override('instance_group_batch_size', 2)
+        t = self.load_template()
+        stack = self.parse_stack(t)
+
+        self._stub_create(5)
+        self.m.ReplayAll()
+        resource = self.create_instance_group(t, stack, 'JobServerGroup')
+
+        resource.resize(5)
+        self.assertEqual(['JobServerGroup-%d' % x for x in range(5)],
+                         resource.get_instance_names())
+
+        resource.resize(2)
+        self.assertEqual(['JobServerGroup-0', 'JobServerGroup-1'],
+                         resource.get_instance_names())
+
+        self.m.VerifyAll()
+
+    def test_resize_partial_failure(self):
+        cfg.CONF.set_override('instance_group_batch_size', 2)
+        t = self.load_template()
+        stack = self.parse_stack(t)
+
+        self.m.StubOutWithMock(instance.Instance, 'create')
+        instance.Instance.create().AndReturn(None)
+        instance.Instance.create().AndReturn(None)
+        instance.Instance.create().AndReturn('Boom')
+        self.m.ReplayAll()
+        resource = self.create_instance_group(t, stack, 'JobServerGroup')
+
+        # The second batch is never started after a failure in the first
+        try:
+            resource.resize(5, raise_on_error=True)
+        except exception.NestedResourceFailure as ex:
+            self.assertEqual('Boom (completed members: JobServerGroup-1)',
+                             str(ex))
+        else:
+            self.fail('NestedResourceFailure not raised')
+        self.assertEqual(['JobServerGroup-%d' % x for x in range(3)],
+                         resource.get_instance_names())
+
+        self.m.VerifyAll()
+
+    def test_legacy_members_imported(self):
+        t = self.load_template()
+        stack = self.parse_stack(t)
+
+        resource = asc.InstanceGroup('JobServerGroup',
+                                     t['Resources']['JobServerGroup'],
+                                     stack)
+        resource.state_set(resource.CREATE_IN_PROGRESS)
+        # Groups created before the group_member table stored their members
+        # in resource_id
+        resource.resource_id_set('JobServerGroup-1,JobServerGroup-0')
+
+        self.assertEqual(['JobServerGroup-0', 'JobServerGroup-1'],
+                         resource.get_instance_names())
+        self.assertEqual(None, resource.resource_id)
+        self.assertEqual(['JobServerGroup-0', 'JobServerGroup-1'],
+                         resource.get_instance_names())
+
+    def test_make_instance_type_override(self):
+        t = self.load_template()
+        stack = self.parse_stack(t)
+        group = asc.InstanceGroup('JobServerGroup',
+                                  t['Resources']['JobServerGroup'], stack)
+
+        class PluginInstance(instance.Instance):
+            pass
+
+        self.m.StubOutWithMock(rsrc, 'get_class')
+        rsrc.get_class('AWS::EC2::Instance').MultipleTimes().AndReturn(
+            PluginInstance)
+        self.m.ReplayAll()
+
+        member = group._make_instance('JobServerGroup-0')
+        self.assertTrue(isinstance(member, PluginInstance))
+        self.assertTrue(isinstance(member, asc.GroupedInstanceMixin))
+        other = group._make_instance('JobServerGroup-1')
+        self.assertTrue(type(member) is type(other))
+        self.m.VerifyAll()
+
+    def test_reserve_members_conflict(self):
+        t = self.load_template()
+        stack = self.parse_stack(t)
+
+        self._stub_create(1)
+        self.m.ReplayAll()
+        resource = self.create_instance_group(t, stack, 'JobServerGroup')
+
+        # Another operation on the group takes the next name after this one
+        # has looked for free names
+        stale_names = [resource._new_member_names(2)]
+        new_member_names = resource._new_member_names
+
+        def member_names(count):
+            return stale_names and stale_names.pop() or new_member_names(count)
+
+        self.m.stubs.Set(resource, '_new_member_names', member_names)
+        db_api.group_member_create(resource.context, {
+            'group_id': resource.id,
+            'name': 'JobServerGroup-1',
+            'state': resource.CREATE_IN_PROGRESS})
+
+        members = resource._reserve_members(2, resource.CREATE_IN_PROGRESS)
+        self.assertEqual(['JobServerGroup-2', 'JobServerGroup-3'],
+                         [m.name for m in members])
+
+    def test_update_size(self):
+        t = self.load_template()
+        stack = self.parse_stack(t)
+
+        self._stub_create(3)
+        self.m.ReplayAll()
+        resource = self.create_instance_group(t, stack, 'JobServerGroup')
+        self.assertEqual(['JobServerGroup-0'], resource.get_instance_names())
+
+        update_snippet = copy.deepcopy(resource.parsed_template())
+        update_snippet['Properties']['Size'] = '3'
+        self.assertEqual(asc.InstanceGroup.UPDATE_COMPLETE,
+                         resource.handle_update(update_snippet))
+        self.assertEqual(['JobServerGroup-%d' % x for x in range(3)],
+                         resource.get_instance_names())
+
+        self.m.VerifyAll()
+
+    def test_update_launch_config_replace(self):
+        t = self.load_template()
+        t['Resources']['JobServerConfig2'] = t['Resources']['JobServerConfig']
+        stack = self.parse_stack(t)
+
+        self._stub_create(1)
+        self.m.ReplayAll()
+        resource = self.create_instance_group(t, stack, 'JobServerGroup')
+
+        # without an UpdatePolicy the group must be replaced
+        update_snippet = copy.deepcopy(resource.parsed_template())
+        update_snippet['Properties']['LaunchConfigurationName'] = \
+            'JobServerConfig2'
+        self.assertEqual(asc.InstanceGroup.UPDATE_REPLACE,
+                         resource.handle_update(update_snippet))
+        self.assertEqual(['JobServerGroup-0'], resource.get_instance_names())
+
+        self.m.VerifyAll()
+
+    def test_update_launch_config_rolling(self):
+        t = self.load_template()
+        t['Resources']['JobServerConfig2'] = t['Resources']['JobServerConfig']
+        t['Parameters']['NumInstances']['Default'] = '3'
+        stack = self.parse_stack(t)
+
+        self._stub_create(6)
+        self.m.StubOutWithMock(asc.eventlet, 'sleep')
+        asc.eventlet.sleep(90)
+        self.m.ReplayAll()
+        resource = self.create_instance_group(t, stack, 'JobServerGroup')
+
+        update_snippet = copy.deepcopy(resource.parsed_template())
+        update_snippet['Properties']['LaunchConfigurationName'] = \
+            'JobServerConfig2'
+        update_snippet['UpdatePolicy'] = {
+            'AutoScalingRollingUpdate': {'MaxBatchSize': '2',
+                                         'PauseTime': 'PT1M30S'}}
+        self.assertEqual(asc.InstanceGroup.UPDATE_COMPLETE,
+                         resource.handle_update(update_snippet))
+        self.assertEqual(['JobServerGroup-%d' % x for x in range(3, 6)],
+                         resource.get_instance_names())
+
+        self.m.VerifyAll()
+
+    def test_invalid_update_policy(self):
+        t = self.load_template()
+        t['Resources']['JobServerGroup']['UpdatePolicy'] = {
+            'AutoScalingRollingUpdate': {'PauseTime': '90'}}
+        stack = self.parse_stack(t)
+
+        resource = asc.InstanceGroup('JobServerGroup',
+                                     t['Resources']['JobServerGroup'],
+                                     stack)
+        self.assertTrue('PauseTime' in resource.validate()['Error'])
+
+    def test_update_invalid_update_policy(self):
+        t = self.load_template()
+        t['Resources']['JobServerConfig2'] = t['Resources']['JobServerConfig']
+        stack = self.parse_stack(t)
+
+        self._stub_create(1)
+        self.m.ReplayAll()
+        resource = self.create_instance_group(t, stack, 'JobServerGroup')
+
+        # an invalid policy fails the update before any member is replaced
+        self.m.VerifyAll()
+        self.m.UnsetStubs()
+        self.m.ReplayAll()
+        update_snippet = copy.deepcopy(resource.parsed_template())
+        update_snippet['Properties']['LaunchConfigurationName'] = \
+            'JobServerConfig2'
+        update_snippet['UpdatePolicy'] = {
+            'AutoScalingRollingUpdate': {'MaxBatchSize': '0'}}
+        self.assertTrue('Invalid UpdatePolicy' in
+                        resource.update(update_snippet))
+        self.assertEqual(asc.InstanceGroup.UPDATE_FAILED, resource.state)
+        self.assertEqual(['JobServerGroup-0'], resource.get_instance_names())
+
+        self.m.VerifyAll()
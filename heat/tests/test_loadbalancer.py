@@ -13,6 +13,7 @@
 #    under the License.
 
 
+import copy
 import re
 import os
 
@@ -119,9 +120,7 @@ class LoadBalancerTest(unittest.TestCase):
 
         self.assertEqual('LoadBalancer', resource.FnGetRefId())
 
-        templ = template_format.parse(lb.lb_template)
-        ha_cfg = resource._haproxy_config(templ,
-                                          resource.properties['Instances'])
+        ha_cfg = resource._haproxy_config(resource.properties['Instances'])
         self.assertRegexpMatches(ha_cfg, 'bind \*:80')
         self.assertRegexpMatches(ha_cfg, 'server server1 1\.2\.3\.4:80 '
                                  'check inter 30s fall 5 rise 3')
@@ -152,6 +151,104 @@ class LoadBalancerTest(unittest.TestCase):
 
         self.m.VerifyAll()
 
+    def test_instances_to_ipaddresses(self):
+        servers = self.fc.servers.list()
+        lb.LoadBalancer.nova().MultipleTimes().AndReturn(self.fc)
+        self.m.StubOutWithMock(self.fc.servers, 'list')
+        # only the servers of the stack are listed
+        search = {'name': '^test_stack\\.'}
+        self.fc.servers.list(search_opts=search).AndReturn(servers)
+        self.m.StubOutWithMock(self.fc.servers, 'get')
+        self.fc.servers.get('WikiServerOne').AndReturn(servers[1])
+        self.m.ReplayAll()
+
+        t = self.load_template()
+        s = self.parse_stack(t)
+        resource = lb.LoadBalancer('LoadBalancer',
+                                   t['Resources']['LoadBalancer'], s)
+
+        # servers in the listing are not fetched again, others are
+        self.assertEqual(['1.2.3.4', '4.5.6.7', '4.5.6.7'],
+                         resource._instances_to_ipaddresses(
+                             ['1234', 5678, 'WikiServerOne']))
+        self.m.VerifyAll()
+
+    def test_regexp_escape(self):
+        self.assertEqual('test-stack_1', lb._regexp_escape('test-stack_1'))
+        self.assertEqual(r'a\.b\*\(c\)\[d\]\{e\}\|f\\g\^\$\+\?',
+                         lb._regexp_escape(r'a.b*(c)[d]{e}|f\g^$+?'))
+
+    def test_reload_unchanged(self):
+        self.m.ReplayAll()
+
+        t = self.load_template()
+        s = self.parse_stack(t)
+        resource = lb.LoadBalancer('LoadBalancer',
+                                   t['Resources']['LoadBalancer'], s)
+        self.m.StubOutWithMock(resource, 'cached_attribute')
+        resource.cached_attribute('backends', expire=False).AndReturn(
+            ['1234', '5678'])
+        self.m.StubOutWithMock(resource, '_configure')
+        self.m.ReplayAll()
+
+        # the backends last configured are read back from the database
+        resource.reload(['1234', '5678'])
+        self.m.VerifyAll()
+
+    def test_update_in_place(self):
+        self.m.ReplayAll()
+
+        t = self.load_template()
+        s = self.parse_stack(t)
+        resource = lb.LoadBalancer('LoadBalancer',
+                                   t['Resources']['LoadBalancer'], s)
+        self.m.StubOutWithMock(resource, '_configure')
+        resource._configure(['WikiServerOne']).AndReturn(None)
+        self.m.ReplayAll()
+
+        update_snippet = copy.deepcopy(resource.parsed_template())
+        update_snippet['Properties']['HealthCheck'] = {
+            'Target': 'HTTP:80/',
+            'HealthyThreshold': '3',
+            'UnhealthyThreshold': '5',
+            'Interval': '30',
+            'Timeout': '5'}
+        self.assertEqual(lb.LoadBalancer.UPDATE_COMPLETE,
+                         resource.handle_update(update_snippet))
+        self.assertEqual('30', resource.properties['HealthCheck']['Interval'])
+
+        update_snippet['Properties']['AvailabilityZones'] = ['other']
+        self.assertEqual(lb.LoadBalancer.UPDATE_REPLACE,
+                         resource.handle_update(update_snippet))
+        self.m.VerifyAll()
+
+    def test_update_group_managed(self):
+        t = self.load_template()
+        del t['Resources']['LoadBalancer']['Properties']['Instances']
+        s = self.parse_stack(t)
+        resource = lb.LoadBalancer('LoadBalancer',
+                                   t['Resources']['LoadBalancer'], s)
+
+        # the backends a group last reloaded the load balancer with are kept
+        self.m.StubOutWithMock(resource, 'cached_attribute')
+        resource.cached_attribute('backends', expire=False).AndReturn(
+            ['WebServerGroup-0', 'WebServerGroup-1'])
+        self.m.StubOutWithMock(resource, '_configure')
+        resource._configure(['WebServerGroup-0',
+                             'WebServerGroup-1']).AndReturn(None)
+        self.m.ReplayAll()
+
+        update_snippet = copy.deepcopy(resource.parsed_template())
+        update_snippet['Properties']['HealthCheck'] = {
+            'Target': 'HTTP:80/',
+            'HealthyThreshold': '3',
+            'UnhealthyThreshold': '5',
+            'Interval': '30',
+            'Timeout': '5'}
+        self.assertEqual(lb.LoadBalancer.UPDATE_COMPLETE,
+                         resource.handle_update(update_snippet))
+        self.m.VerifyAll()
+
     def assertRegexpMatches(self, text, expected_regexp, msg=None):
         """Fail the test unless the text matches the regular expression."""
         if isinstance(expected_regexp, basestring):
@@ -259,6 +259,21 @@ class ParameterTest(unittest.TestCase):
         else:
             self.fail('ValueError not raised')
 
+    def test_list_default_invalid(self):
+        schema = {'Type': 'CommaDelimitedList',
+                  'Default': 'foo,blarg',
+                  'AllowedValues': ['foo', 'bar', 'baz']}
+        self.assertRaises(ValueError,
+                          parameters.Parameter, 'p', schema, 'foo,bar')
+
+    def test_list_items(self):
+        schema = {'Type': 'CommaDelimitedList'}
+        p = parameters.Parameter('p', schema, 'baz,foo,bar')
+        self.assertEqual(len(p), 3)
+        self.assertEqual(p[1], 'foo')
+        self.assertEqual(list(p), ['baz', 'foo', 'bar'])
+        self.assertTrue(p._list() is p._list())
+
 
 params_schema = json.loads('''{
   "Parameters" : {
@@ -13,6 +13,7 @@
 #    under the License.
 
 
+import copy
 import unittest
 from nose.plugins.attrib import attr
 import mox
@@ -20,8 +21,10 @@ import mox
 from heat.common import context
 from heat.common import exception
 from heat.common import template_format
+from heat.db import api as db_api
 from heat.engine import parser
 from heat.engine import parameters
+from heat.engine import resource
 from heat.engine import template
 from heat.engine.resource import Resource
 
@@ -352,3 +355,303 @@ class StackTest(unittest.TestCase):
         stack.state_set(stack.CREATE_IN_PROGRESS, 'testing')
         self.assertNotEqual(stack.updated_time, None)
         self.assertNotEqual(stack.updated_time, stored_time)
+
+    def test_template_shared(self):
+        tmpl = {'Description': 'shared template test'}
+        stack1 = parser.Stack(self.ctx, 'shared_tmpl_1',
+                              parser.Template(dict(tmpl)))
+        stack1.store()
+        stack2 = parser.Stack(self.ctx, 'shared_tmpl_2',
+                              parser.Template(dict(tmpl)))
+        stack2.store()
+
+        self.assertEqual(stack1.t.id, stack2.t.id)
+        rt = db_api.raw_template_get(self.ctx, stack1.t.id)
+        self.assertEqual(rt.refcount, 2)
+
+        stack1.delete()
+        rt = db_api.raw_template_get(self.ctx, stack2.t.id)
+        self.assertEqual(rt.refcount, 1)
+        self.assertEqual(rt.template, tmpl)
+
+        stack2.delete()
+        self.assertRaises(exception.NotFound, db_api.raw_template_get,
+                          self.ctx, stack2.t.id)
+
+    def test_template_released_on_update(self):
+        stack = parser.Stack(self.ctx, 'release_tmpl_test',
+                             parser.Template({'Description': 'old'}))
+        stack.store()
+        old_id = stack.t.id
+
+        stack.t = parser.Template({'Description': 'new'})
+        stack.store()
+
+        self.assertNotEqual(stack.t.id, old_id)
+        self.assertRaises(exception.NotFound, db_api.raw_template_get,
+                          self.ctx, old_id)
+        rt = db_api.raw_template_get(self.ctx, stack.t.id)
+        self.assertEqual(rt.refcount, 1)
+
+    def test_template_shared_reference(self):
+        tmpl = {'Description': 'shared template reference test'}
+        stack = parser.Stack(self.ctx, 'shared_ref_test',
+                             parser.Template(dict(tmpl)))
+        stack.store()
+
+        # reusing the stored template takes a reference for the new stack
+        rt = db_api.raw_template_create(self.ctx, {'template': dict(tmpl)})
+        self.assertEqual(rt.id, stack.t.id)
+        self.assertEqual(db_api.raw_template_get(self.ctx, rt.id).refcount,
+                         2)
+
+        stack.delete()
+        rt = db_api.raw_template_get(self.ctx, rt.id)
+        self.assertEqual(rt.refcount, 1)
+
+    def test_template_kept_on_identical_update(self):
+        tmpl = {'Description': 'identical update test'}
+        stack = parser.Stack(self.ctx, 'identical_update_test',
+                             parser.Template(dict(tmpl)))
+        stack.store()
+        stack.state_set(stack.CREATE_COMPLETE, 'testing')
+
+        newstack = parser.Stack(self.ctx, 'identical_update_test',
+                                parser.Template(dict(tmpl)))
+        stack.update(newstack)
+        self.assertEqual(stack.state, stack.UPDATE_COMPLETE)
+
+        db_stack = db_api.stack_get(self.ctx, stack.id)
+        self.assertEqual(db_stack.pending_raw_template_id, None)
+        rt = db_api.raw_template_get(self.ctx, db_stack.raw_template_id)
+        self.assertEqual(rt.refcount, 1)
+
+    def test_large_template_compressed(self):
+        tmpl = {'Description': 'x' * 8192}
+        stack = parser.Stack(self.ctx, 'compressed_tmpl_test',
+                             parser.Template(tmpl))
+        stack.store()
+
+        loaded = parser.Stack.load(self.ctx, stack_id=stack.id)
+        self.assertEqual(loaded.t.t, tmpl)
+
+        raw = self.ctx.session.execute(
+            'SELECT template FROM raw_template WHERE id = :id',
+            {'id': stack.t.id}).scalar()
+        self.assertTrue(raw.startswith('zlib:'))
+        self.assertTrue(len(raw) < 8192)
+
+    def test_outputs_lazy(self):
+        tmpl = {'Outputs': {'Bad': {'Value': {'Fn::FindInMap': [
+            'NoSuchMap', 'key', 'value']}}}}
+        stack = parser.Stack(self.ctx, 'lazy_outputs_test',
+                             parser.Template(tmpl))
+        self.assertRaises(KeyError, getattr, stack, 'outputs')
+
+    def test_output_values_stored(self):
+        tmpl = {'Resources': {'AResource': {'Type': 'GenericResourceType'}},
+                'Outputs': {'TheOutput': {
+                    'Value': {'Fn::GetAtt': ['AResource', 'Foo']}}}}
+        stack = parser.Stack(self.ctx, 'stored_outputs_test',
+                             parser.Template(tmpl))
+        stack.store()
+        stack.create()
+        self.assertEqual(stack.state, stack.CREATE_COMPLETE)
+
+        loaded = parser.Stack.load(self.ctx, stack_id=stack.id)
+        self.m.StubOutWithMock(loaded, 'resolve_runtime_data')
+        self.m.ReplayAll()
+        self.assertEqual(loaded.output('TheOutput'), 'AResource')
+        self.m.VerifyAll()
+
+    def test_output_values_invalidated(self):
+        tmpl = {'Resources': {'AResource': {'Type': 'GenericResourceType'}},
+                'Outputs': {'TheOutput': {'Value': {'Ref': 'AResource'}}}}
+        stack = parser.Stack(self.ctx, 'invalidated_outputs_test',
+                             parser.Template(tmpl))
+        stack.store()
+        stack.create()
+        self.assertEqual(stack.output('TheOutput'), 'AResource')
+
+        res = stack['AResource']
+        res.resource_id_set('physical_id')
+        res.state_set(res.UPDATE_COMPLETE, 'changed')
+
+        loaded = parser.Stack.load(self.ctx, stack_id=stack.id)
+        self.assertEqual(loaded.output('TheOutput'), 'physical_id')
+
+    def test_output_values_null(self):
+        tmpl = {'Resources': {'AResource': {'Type': 'GenericResourceType'}},
+                'Outputs': {'TheOutput': {'Value': {'Ref': 'AResource'}}}}
+        stack = parser.Stack(self.ctx, 'null_outputs_test',
+                             parser.Template(tmpl))
+        stack.store()
+        stack.create()
+
+        # Rows written before the output_values column was added hold NULL
+        self.ctx.session.execute(
+            'UPDATE stack SET output_values = NULL WHERE id = :id',
+            {'id': stack.id})
+
+        db_stack = db_api.stack_get(self.ctx, stack.id)
+        db_stack.refresh()
+        self.assertEqual(db_stack.output_values, None)
+
+        loaded = parser.Stack.load(self.ctx, stack_id=stack.id)
+        self.assertEqual(loaded.output('TheOutput'), 'AResource')
+
+    def test_update_unchanged_not_resolved(self):
+        tmpl = {'Resources': {
+            'AResource': {'Type': 'GenericResourceType'},
+            'BResource': {'Type': 'GenericResourceType',
+                          'Properties': {'Foo': {'Ref': 'AResource'}}},
+            'CResource': {'Type': 'GenericResourceType',
+                          'Properties': {'Foo': 'abc'}}}}
+        stack = parser.Stack(self.ctx, 'update_digest_test',
+                             parser.Template(copy.deepcopy(tmpl)))
+        stack.store()
+        stack.create()
+        self.assertEqual(stack.state, stack.CREATE_COMPLETE)
+
+        tmpl['Resources']['CResource']['Properties']['Foo'] = 'xyz'
+        newstack = parser.Stack(self.ctx, 'update_digest_test',
+                                parser.Template(tmpl))
+
+        # Only CResource has changed, so nothing should resolve the
+        # reference to AResource
+        self.m.StubOutWithMock(stack['AResource'], 'FnGetRefId')
+        self.m.StubOutWithMock(resource.GenericResource, 'handle_update')
+        resource.GenericResource.handle_update(
+            {'Type': 'GenericResourceType',
+             'Properties': {'Foo': 'xyz'}}).AndReturn(
+                 Resource.UPDATE_COMPLETE)
+        self.m.ReplayAll()
+
+        stack.update(newstack)
+        self.assertEqual(stack.state, stack.UPDATE_COMPLETE)
+        self.assertEqual(stack['CResource'].t['Properties']['Foo'], 'xyz')
+        self.m.VerifyAll()
+
+    def test_update_reference_changed(self):
+        tmpl = {'Resources': {
+            'AResource': {'Type': 'GenericResourceType',
+                          'Properties': {'Foo': 'abc'}},
+            'BResource': {'Type': 'GenericResourceType',
+                          'Properties': {'Foo': {'Ref': 'AResource'}}}}}
+        stack = parser.Stack(self.ctx, 'update_ref_digest_test',
+                             parser.Template(copy.deepcopy(tmpl)))
+        tmpl['Resources']['AResource']['Properties']['Foo'] = 'xyz'
+        newstack = parser.Stack(self.ctx, 'update_ref_digest_test',
+                                parser.Template(tmpl))
+
+        old_digests = stack.resource_digests()
+        new_digests = newstack.resource_digests()
+        self.assertNotEqual(old_digests['AResource'],
+                            new_digests['AResource'])
+        self.assertNotEqual(old_digests['BResource'],
+                            new_digests['BResource'])
+
+    def test_resume_create(self):
+        tmpl = {'Resources': {
+            'AResource': {'Type': 'GenericResourceType'},
+            'BResource': {'Type': 'GenericResourceType',
+                          'Properties': {'Foo': {'Ref': 'AResource'}}}}}
+        stack = parser.Stack(self.ctx, 'resume_create_test',
+                             parser.Template(tmpl))
+        stack.store()
+        stack.state_set(stack.CREATE_IN_PROGRESS, 'Stack creation started')
+        stack['AResource'].create()
+        stack['BResource'].state_set(Resource.CREATE_IN_PROGRESS)
+
+        loaded = parser.Stack.load(self.ctx, stack_id=stack.id)
+        self.m.StubOutWithMock(resource.GenericResource, 'handle_create')
+        resource.GenericResource.handle_create()
+        self.m.ReplayAll()
+
+        loaded.resume()
+        self.assertEqual(loaded.state, loaded.CREATE_COMPLETE)
+        self.assertEqual(loaded['AResource'].id, stack['AResource'].id)
+        self.assertEqual(loaded['BResource'].state, Resource.CREATE_COMPLETE)
+        self.m.VerifyAll()
+
+    def test_resume_update(self):
+        tmpl = {'Resources': {'AResource': {'Type': 'GenericResourceType'}}}
+        stack = parser.Stack(self.ctx, 'resume_update_test',
+                             parser.Template(copy.deepcopy(tmpl)))
+        stack.store()
+        stack.create()
+
+        tmpl['Resources']['BResource'] = {'Type': 'GenericResourceType'}
+        newstack = parser.Stack(self.ctx, 'resume_update_test',
+                                parser.Template(tmpl))
+        stack.state_set(stack.UPDATE_IN_PROGRESS, 'Stack update started')
+        stack._set_pending_update(newstack)
+        created = newstack['BResource']
+        created.stack = stack
+        created.create()
+
+        loaded = parser.Stack.load(self.ctx, stack_id=stack.id)
+        self.m.StubOutWithMock(resource.GenericResource, 'handle_create')
+        self.m.ReplayAll()
+
+        loaded.resume()
+        self.assertEqual(loaded.state, loaded.UPDATE_COMPLETE)
+        self.assertEqual(loaded['BResource'].id, created.id)
+        self.assertEqual(loaded.t.t, tmpl)
+        db_stack = db_api.stack_get(self.ctx, stack.id)
+        self.assertEqual(db_stack.pending_raw_template_id, None)
+        rt = db_api.raw_template_get(self.ctx, db_stack.raw_template_id)
+        self.assertEqual(rt.refcount, 1)
+        self.m.VerifyAll()
+
+    def test_resume_update_parameters_null(self):
+        tmpl = {'Parameters': {'Foo': {'Type': 'String', 'Default': 'abc'}},
+                'Resources': {'AResource': {'Type': 'GenericResourceType'}}}
+        stack = parser.Stack(self.ctx, 'resume_update_null_test',
+                             parser.Template(copy.deepcopy(tmpl)))
+        stack.store()
+        stack.create()
+
+        tmpl['Resources']['BResource'] = {'Type': 'GenericResourceType'}
+        newstack = parser.Stack(self.ctx, 'resume_update_null_test',
+                                parser.Template(tmpl))
+        stack.state_set(stack.UPDATE_IN_PROGRESS, 'Stack update started')
+        stack._set_pending_update(newstack)
+
+        # Rows written before the pending_parameters column was added
+        # hold NULL
+        self.ctx.session.execute(
+            'UPDATE stack SET pending_parameters = NULL WHERE id = :id',
+            {'id': stack.id})
+
+        loaded = parser.Stack.load(self.ctx, stack_id=stack.id)
+        loaded.resume()
+        self.assertEqual(loaded.state, loaded.UPDATE_COMPLETE)
+        self.assertTrue('BResource' in loaded)
+
+    def test_resume_update_not_recorded(self):
+        tmpl = {'Resources': {'AResource': {'Type': 'GenericResourceType'}}}
+        stack = parser.Stack(self.ctx, 'resume_update_unknown_test',
+                             parser.Template(tmpl))
+        stack.store()
+        stack.create()
+        stack.state_set(stack.UPDATE_IN_PROGRESS, 'Stack update started')
+
+        loaded = parser.Stack.load(self.ctx, stack_id=stack.id)
+        loaded.resume()
+        self.assertEqual(loaded.state, loaded.UPDATE_FAILED)
+
+    def test_resume_delete(self):
+        tmpl = {'Resources': {'AResource': {'Type': 'GenericResourceType'}}}
+        stack = parser.Stack(self.ctx, 'resume_delete_test',
+                             parser.Template(tmpl))
+        stack.store()
+        stack.create()
+        stack.state_set(stack.DELETE_IN_PROGRESS, 'Stack deletion started')
+        stack['AResource'].state_set(Resource.DELETE_IN_PROGRESS)
+
+        loaded = parser.Stack.load(self.ctx, stack_id=stack.id)
+        loaded.resume()
+        self.assertEqual(loaded.state, loaded.DELETE_COMPLETE)
+        self.assertRaises(exception.NotFound, parser.Stack.load,
+                          self.ctx, stack.id)
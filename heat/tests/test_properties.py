@@ -305,6 +305,50 @@ class PropertiesTest(unittest.TestCase):
         self.assertEqual(self.props.get('foo', 'wibble'), 'wibble')
 
 
+@attr(tag=['unit', 'properties'])
+@attr(speed='fast')
+class PropertiesMemoTest(unittest.TestCase):
+    def setUp(self):
+        self.schema = {'int': {'Type': 'Integer'},
+                       'list': {'Type': 'List'}}
+        self.data = {'int': 21, 'list': ['foo']}
+        self.resolved = []
+        self.epoch = 0
+
+        def resolve(d):
+            self.resolved.append(d)
+            return d * 2 if isinstance(d, int) else list(d)
+
+        self.props = properties.Properties(self.schema, self.data, resolve,
+                                           epoch=lambda: self.epoch)
+
+    def test_memoized(self):
+        self.assertEqual(self.props['int'], 42)
+        self.assertEqual(self.props.validate(), None)
+        self.assertEqual(self.props['int'], 42)
+        self.assertEqual(self.resolved, [21, ['foo']])
+
+    def test_new_epoch(self):
+        self.assertEqual(self.props['int'], 42)
+        self.epoch += 1
+        self.assertEqual(self.props['int'], 42)
+        self.assertEqual(self.resolved, [21, 21])
+
+    def test_data_changed(self):
+        self.assertEqual(self.props['list'], ['foo'])
+        self.data['list'].append('bar')
+        self.assertEqual(self.props['list'], ['foo', 'bar'])
+
+    def test_value_copied(self):
+        self.props['list'].append('bar')
+        self.assertEqual(self.props['list'], ['foo'])
+        self.assertEqual(len(self.resolved), 1)
+
+    def test_schema_compiled_once(self):
+        other = properties.Properties(self.schema, {})
+        self.assertTrue(other.props is self.props.props)
+
+
 @attr(tag=['unit', 'properties'])
 @attr(speed='fast')
 class PropertiesValidationTest(unittest.TestCase):
@@ -13,11 +13,15 @@
 #    under the License.
 
 
+import datetime
 import unittest
 from nose.plugins.attrib import attr
 import mox
 
 from heat.common import context
+from heat.common import exception
+from heat.db import api as db_api
+from heat.engine import dbcache
 from heat.engine import parser
 from heat.engine import resource
 from heat.openstack.common import uuidutils
@@ -193,6 +197,32 @@ class ResourceTest(unittest.TestCase):
                           res.update_template_diff_properties,
                           update_snippet)
 
+    def test_create_check_complete(self):
+        tmpl = {'Type': 'Foo'}
+        res = resource.GenericResource('test_resource', tmpl, self.stack)
+        checks = []
+
+        def check_create_complete(data):
+            checks.append(data)
+            return True
+
+        res.handle_create = lambda: 'create_data'
+        res.check_create_complete = check_create_complete
+        self.assertEqual(res.create(), None)
+        self.assertEqual(res.state, res.CREATE_COMPLETE)
+        self.assertEqual(checks, ['create_data'])
+
+    def test_create_check_failed(self):
+        tmpl = {'Type': 'Foo'}
+        res = resource.GenericResource('test_resource', tmpl, self.stack)
+
+        def check_create_complete(data):
+            raise exception.Error('Creation failed')
+
+        res.check_create_complete = check_create_complete
+        self.assertEqual(res.create(), 'Creation failed')
+        self.assertEqual(res.state, res.CREATE_FAILED)
+
 
 @attr(tag=['unit', 'resource'])
 @attr(speed='fast')
@@ -223,3 +253,196 @@ class MetadataTest(unittest.TestCase):
         test_data = {'Test': 'Newly-written data'}
         self.res.metadata = test_data
         self.assertEqual(self.res.metadata, test_data)
+
+    def test_read_cached(self):
+        self.assertEqual(self.res.metadata, {'Test': 'Initial metadata'})
+
+        self.m.StubOutWithMock(db_api, 'resource_get')
+        self.m.StubOutWithMock(db_api, 'resource_get_versioned')
+        self.m.StubOutWithMock(db_api, 'resource_version_get')
+        self.m.ReplayAll()
+        metadata = self.res.metadata
+        self.assertEqual(metadata, {'Test': 'Initial metadata'})
+        self.m.VerifyAll()
+
+        # Modifying the data returned must not affect the cache
+        metadata['Test'] = 'Modified'
+        self.assertEqual(self.res.metadata, {'Test': 'Initial metadata'})
+
+    def test_write_cached(self):
+        test_data = {'Test': 'Newly-written data'}
+        self.res.metadata = test_data
+
+        self.m.StubOutWithMock(db_api, 'resource_get')
+        self.m.StubOutWithMock(db_api, 'resource_get_versioned')
+        self.m.ReplayAll()
+        self.assertEqual(self.res.metadata, test_data)
+        self.m.VerifyAll()
+
+    def test_write_after_state_set(self):
+        self.assertEqual(self.res.metadata, {'Test': 'Initial metadata'})
+        self.res.state_set(self.res.UPDATE_COMPLETE, 'updated')
+
+        test_data = {'Test': 'Newly-written data'}
+        self.res.metadata = test_data
+        self.assertEqual(self.res.metadata, test_data)
+
+    def test_read_other_writer(self):
+        self.assertEqual(self.res.metadata, {'Test': 'Initial metadata'})
+
+        # Write through a separate session, as another engine would
+        rs = db_api.resource_get(None, self.res.id)
+        rs.update_and_save({'rsrc_metadata': {'Test': 'Other engine'}})
+
+        # The cached data is used for the rest of the operation
+        self.assertEqual(self.res.metadata, {'Test': 'Initial metadata'})
+
+        dbcache.clear(self.res)
+        self.assertEqual(self.res.metadata, {'Test': 'Other engine'})
+
+    def test_write_other_writer(self):
+        self.assertEqual(self.res.metadata, {'Test': 'Initial metadata'})
+
+        rs = db_api.resource_get(None, self.res.id)
+        rs.update_and_save({'rsrc_metadata': {'Test': 'Other engine'}})
+
+        # The other engine's write is not overwritten
+        self.assertRaises(exception.ConcurrentUpdate, setattr,
+                          self.res, 'metadata', {'Test': 'Stale'})
+        self.assertEqual(self.res.metadata, {'Test': 'Other engine'})
+
+        self.res.metadata = {'Test': 'Updated'}
+        self.assertEqual(self.res.metadata, {'Test': 'Updated'})
+
+    def test_timestamp_other_writer(self):
+        self.assertNotEqual(self.res.created_time, None)
+
+        rs = db_api.resource_get(None, self.res.id)
+        rs.update_and_save({'rsrc_metadata': {'Test': 'Other engine'}})
+
+        # A timestamp is written over the other engine's change
+        created_time = datetime.datetime(2012, 11, 29, 13, 49, 37)
+        self.res.created_time = created_time
+        self.assertEqual(self.res.created_time, created_time)
+        self.assertEqual(self.res.metadata, {'Test': 'Other engine'})
+
+    def test_version_stale_writer(self):
+        version = db_api.resource_version_get(None, self.res.id)
+
+        # Two engines load the row, then both write to it
+        rs1 = db_api.resource_get(None, self.res.id)
+        rs2 = db_api.resource_get(None, self.res.id)
+        rs1.update_and_save({'rsrc_metadata': {'Test': 'First'}})
+        rs2.update_and_save({'rsrc_metadata': {'Test': 'Second'}})
+
+        self.assertEqual(db_api.resource_version_get(None, self.res.id),
+                         version + 2)
+
+    def test_write_modified(self):
+        metadata = self.res.metadata
+        metadata['Extra'] = 'Added in place'
+        self.res.metadata = metadata
+        self.assertEqual(self.res.metadata, {'Test': 'Initial metadata',
+                                             'Extra': 'Added in place'})
+
+    def test_modify_in_place(self):
+        rs = db_api.resource_get(self.stack.context, self.res.id)
+        rs.rsrc_metadata['Test'] = 'Modified in place'
+        rs.save()
+        self.assertEqual(self.res.metadata, {'Test': 'Modified in place'})
+
+    def test_attr_cache_null(self):
+        # Rows written before the attr_cache column was added hold NULL
+        self.stack.context.session.execute(
+            'UPDATE resource SET attr_cache = NULL WHERE id = :id',
+            {'id': self.res.id})
+
+        rs = db_api.resource_get(self.stack.context, self.res.id)
+        rs.refresh()
+        self.assertEqual(rs.attr_cache, None)
+
+        res = resource.GenericResource('metadata_resource',
+                                       {'Type': 'Foo'}, self.stack)
+        self.assertEqual(res.cached_attribute('foo'), None)
+        res.cache_attribute('foo', 'bar')
+        self.assertEqual(res.cached_attribute('foo'), 'bar')
+
+
+@attr(tag=['unit', 'resource'])
+@attr(speed='fast')
+class ResourceStateTest(unittest.TestCase):
+    def setUp(self):
+        self.m = mox.Mox()
+        ctx = context.get_admin_context()
+        self.m.StubOutWithMock(ctx, 'username')
+        ctx.username = 'state_test_user'
+        self.stack = parser.Stack(ctx, 'state_test_stack',
+                                  parser.Template({}))
+        self.stack.store()
+        self.res = resource.GenericResource('state_resource',
+                                            {'Type': 'Foo'}, self.stack)
+        self.res.create()
+
+    def tearDown(self):
+        self.stack.delete()
+        self.m.UnsetStubs()
+
+    def test_state_set(self):
+        stack_time = self.stack.updated_time
+        self.res.resource_id = 'physical_id'
+        self.res.state_set(self.res.UPDATE_COMPLETE, 'updated')
+
+        rs = db_api.resource_get(self.stack.context, self.res.id)
+        self.assertEqual(rs.state, self.res.UPDATE_COMPLETE)
+        self.assertEqual(rs.state_description, 'updated')
+        self.assertEqual(rs.nova_instance, 'physical_id')
+        self.assertNotEqual(self.stack.updated_time, stack_time)
+
+        events = db_api.event_get_all_by_stack(self.stack.context,
+                                               self.stack.id)
+        self.assertEqual([e.name for e in events],
+                         [self.res.CREATE_IN_PROGRESS,
+                          self.res.CREATE_COMPLETE,
+                          self.res.UPDATE_COMPLETE])
+        self.assertEqual(events[-1].physical_resource_id, 'physical_id')
+
+    def test_state_set_unchanged(self):
+        self.res.state_set(self.res.CREATE_COMPLETE, 'no change')
+
+        rs = db_api.resource_get(self.stack.context, self.res.id)
+        self.assertEqual(rs.state_description, 'no change')
+        events = db_api.event_get_all_by_stack(self.stack.context,
+                                               self.stack.id)
+        self.assertEqual(len(events), 2)
+
+    def test_report_progress(self):
+        self.res.state_set(self.res.CREATE_IN_PROGRESS, 'creating')
+        self.res._report_progress(12.5, 3)
+
+        rs = db_api.resource_get(self.stack.context, self.res.id)
+        self.assertEqual(rs.state, self.res.CREATE_IN_PROGRESS)
+        self.assertEqual(rs.state_description,
+                         'in progress for 12 seconds (3 checks)')
+        # without an event for each report
+        events = db_api.event_get_all_by_stack(self.stack.context,
+                                               self.stack.id)
+        self.assertEqual([e.name for e in events],
+                         [self.res.CREATE_IN_PROGRESS,
+                          self.res.CREATE_COMPLETE,
+                          self.res.CREATE_IN_PROGRESS])
+
+    def test_state_set_store(self):
+        stack_time = self.stack.updated_time
+        res = resource.GenericResource('stored_resource',
+                                       {'Type': 'Foo'}, self.stack)
+        res.state_set(res.CREATE_IN_PROGRESS, 'creating')
+
+        rs = db_api.resource_get(self.stack.context, res.id)
+        self.assertEqual(rs.state, res.CREATE_IN_PROGRESS)
+        self.assertEqual(rs.state_description, 'creating')
+        self.assertNotEqual(self.stack.updated_time, stack_time)
+
+        events = db_api.event_get_all_by_stack(self.stack.context,
+                                               self.stack.id)
+        self.assertEqual(events[-1].logical_resource_id, 'stored_resource')
+        self.assertEqual(events[-1].name, res.CREATE_IN_PROGRESS)
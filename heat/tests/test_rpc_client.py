@@ -120,6 +120,9 @@ class EngineRpcAPITestCase(unittest.TestCase):
         self._test_engine_api('delete_stack', 'call',
                               stack_identity=self.identity)
 
+    def test_show_work_queue(self):
+        self._test_engine_api('show_work_queue', 'call')
+
     def test_list_events(self):
         self._test_engine_api('list_events', 'call',
                               stack_identity=self.identity)
@@ -129,6 +132,11 @@ class EngineRpcAPITestCase(unittest.TestCase):
                               stack_identity=self.identity,
                               resource_name='LogicalResourceId')
 
+    def test_list_group_members(self):
+        self._test_engine_api('list_group_members', 'call',
+                              stack_identity=self.identity,
+                              resource_name='WebServerGroup')
+
     def test_find_physical_resource(self):
         self._test_engine_api('find_physical_resource', 'call',
                               physical_resource_id=u'404d-a85b-5315293e67de')
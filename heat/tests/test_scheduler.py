@@ -0,0 +1,318 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+import eventlet
+from eventlet import event
+from eventlet import greenthread
+import unittest
+from nose.plugins.attrib import attr
+import mox
+
+from heat.common import exception
+from heat.engine import scheduler
+from heat.openstack.common import cfg
+
+
+class Checker(object):
+    '''A check which completes after a given number of polls.'''
+
+    def __init__(self, polls, error=None):
+        self.polls = polls
+        self.error = error
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls < self.polls:
+            return False
+        if self.error is not None:
+            raise self.error
+        return True
+
+
+@attr(tag=['unit', 'scheduler'])
+@attr(speed='fast')
+class ReactorTest(unittest.TestCase):
+    def setUp(self):
+        self.m = mox.Mox()
+        self.m.StubOutWithMock(eventlet, 'sleep')
+        self.reactor = scheduler.Reactor()
+
+    def tearDown(self):
+        self.m.UnsetStubs()
+
+    def test_complete_immediately(self):
+        self.m.ReplayAll()
+
+        check = Checker(1)
+        self.reactor.wait(check)
+        self.assertEqual(check.calls, 1)
+        self.m.VerifyAll()
+
+    def test_poll(self):
+        eventlet.sleep(1).AndReturn(None)
+        eventlet.sleep(1).AndReturn(None)
+        self.m.ReplayAll()
+
+        check = Checker(3)
+        self.reactor.wait(check)
+        self.assertEqual(check.calls, 3)
+        self.assertEqual(self.reactor.tasks, [])
+        self.m.VerifyAll()
+
+    def test_poll_interval(self):
+        for i in range(4):
+            eventlet.sleep(1).AndReturn(None)
+        self.m.ReplayAll()
+
+        check = Checker(3)
+        self.reactor.wait(check, interval=2)
+        self.assertEqual(check.calls, 3)
+        self.m.VerifyAll()
+
+    def test_error(self):
+        eventlet.sleep(1).AndReturn(None)
+        self.m.ReplayAll()
+
+        check = Checker(2, error=exception.Error('boom'))
+        self.assertRaises(exception.Error, self.reactor.wait, check)
+        self.assertEqual(self.reactor.tasks, [])
+        self.m.VerifyAll()
+
+    def test_timeout(self):
+        eventlet.sleep(1).AndReturn(None)
+        self.m.ReplayAll()
+
+        check = Checker(3)
+        self.assertRaises(exception.Error, self.reactor.wait, check,
+                          timeout=0)
+        self.assertEqual(check.calls, 2)
+        self.m.VerifyAll()
+
+    def test_shared_polling(self):
+        eventlet.sleep(1).AndReturn(None)
+        eventlet.sleep(1).AndReturn(None)
+        self.m.ReplayAll()
+
+        first = Checker(2)
+        second = Checker(3)
+        progress = []
+
+        def waiter(name, check):
+            self.reactor.wait(check, name=name)
+            progress.append(name)
+
+        threads = [eventlet.spawn(waiter, 'first', first),
+                   eventlet.spawn(waiter, 'second', second)]
+        for t in threads:
+            t.wait()
+
+        self.assertEqual(progress, ['first', 'second'])
+        self.assertEqual(first.calls, 2)
+        self.assertEqual(second.calls, 3)
+        self.m.VerifyAll()
+
+    def _stub_ticks(self):
+        '''Make each tick of the reactor yield to the checks running.'''
+        self.m.UnsetStubs()
+
+        def tick(seconds):
+            greenthread.sleep(0)
+
+        self.m.stubs.Set(eventlet, 'sleep', tick)
+
+    def test_hung_check(self):
+        self._stub_ticks()
+        self.reactor.CHECK_TIMEOUT = 0.01
+        hang = event.Event()
+        hung_calls = []
+
+        def hung():
+            hung_calls.append(None)
+            if len(hung_calls) > 1:
+                hang.wait()
+            return False
+
+        progress = []
+
+        def waiter(name, check, timeout=None):
+            try:
+                self.reactor.wait(check, name=name, timeout=timeout)
+            except exception.Error:
+                progress.append('%s failed' % name)
+            else:
+                progress.append(name)
+
+        threads = [eventlet.spawn(waiter, 'hung', hung, 0),
+                   eventlet.spawn(waiter, 'quick', Checker(2))]
+        for t in threads:
+            t.wait()
+
+        # the quick check completes without waiting for the hung one,
+        # which is abandoned
+        self.assertEqual(progress, ['quick', 'hung failed'])
+        self.assertEqual(self.reactor.tasks, [])
+
+    def test_slow_check(self):
+        self._stub_ticks()
+        release = event.Event()
+        slow_calls = []
+
+        def slow():
+            slow_calls.append(None)
+            if len(slow_calls) > 1:
+                release.wait()
+                return True
+            return False
+
+        slow_waiter = eventlet.spawn(self.reactor.wait, slow, name='slow')
+        quick = Checker(3)
+        self.reactor.wait(quick, name='quick')
+
+        # the quick check is polled on each tick while the slow one runs,
+        # and the slow one is not polled again until it returns
+        self.assertEqual(quick.calls, 3)
+        self.assertEqual(len(slow_calls), 2)
+
+        release.send()
+        slow_waiter.wait()
+        self.assertEqual(len(slow_calls), 2)
+        self.assertEqual(self.reactor.tasks, [])
+
+    def test_on_progress(self):
+        eventlet.sleep(1).AndReturn(None)
+        eventlet.sleep(1).AndReturn(None)
+        self.m.ReplayAll()
+
+        reports = []
+        self.reactor.wait(Checker(3), name='test_task',
+                          on_progress=lambda e, p: reports.append(p))
+        # reported after the poll which did not complete the task only
+        self.assertEqual(reports, [2])
+        self.m.VerifyAll()
+
+    def test_progress(self):
+        check = Checker(2)
+
+        def poll_once(seconds):
+            self.assertEqual([(n, p) for n, e, p in self.reactor.progress()],
+                             [('test_task', 1)])
+
+        self.m.stubs.Set(eventlet, 'sleep', poll_once)
+        self.reactor.wait(check, name='test_task')
+        self.assertEqual(self.reactor.progress(), [])
+
+    def test_interrupted(self):
+        self.m.UnsetStubs()
+        check = Checker(10)
+        waiter = eventlet.spawn(self.reactor.wait, check)
+        eventlet.sleep(0)
+        self.assertEqual(len(self.reactor.tasks), 1)
+
+        waiter.kill()
+        self.assertEqual(self.reactor.tasks, [])
+
+
+@attr(tag=['unit', 'scheduler'])
+@attr(speed='fast')
+class WorkQueueTest(unittest.TestCase):
+    def setUp(self):
+        cfg.CONF.set_override('max_concurrent_stack_operations', 1)
+        self.queue = scheduler.WorkQueue()
+        self.blocker = event.Event()
+        self.started = []
+
+    def tearDown(self):
+        cfg.CONF.clear_override('max_concurrent_stack_operations')
+
+    def job(self, name):
+        self.started.append(name)
+
+    def block(self):
+        self.started.append('blocker')
+        self.blocker.wait()
+
+    def run_queue(self):
+        self.blocker.send()
+        while self.queue.running:
+            eventlet.sleep(0)
+
+    def test_limit(self):
+        self.queue.submit(scheduler.WorkQueue.NORMAL, 't1', 's1', self.block)
+        self.queue.submit(scheduler.WorkQueue.NORMAL, 't1', 's2', self.job,
+                          'second')
+        eventlet.sleep(0)
+        self.assertEqual(self.started, ['blocker'])
+        self.assertEqual(self.queue.stats(),
+                         {'running': 1, 'limit': 1, 'queued': 1,
+                          'queued_by_priority': {'high': 0, 'normal': 1}})
+
+        self.run_queue()
+        self.assertEqual(self.started, ['blocker', 'second'])
+        self.assertEqual(self.queue.stats()['queued'], 0)
+
+    def test_no_limit(self):
+        cfg.CONF.set_override('max_concurrent_stack_operations', 0)
+        self.queue.submit(scheduler.WorkQueue.NORMAL, 't1', 's1', self.block)
+        self.queue.submit(scheduler.WorkQueue.NORMAL, 't1', 's2', self.job,
+                          'second')
+        eventlet.sleep(0)
+        self.assertEqual(self.started, ['blocker', 'second'])
+        self.run_queue()
+
+    def test_priority(self):
+        self.queue.submit(scheduler.WorkQueue.NORMAL, 't1', 's1', self.block)
+        self.queue.submit(scheduler.WorkQueue.NORMAL, 't1', 's2', self.job,
+                          'create')
+        self.queue.submit(scheduler.WorkQueue.HIGH, 't1', 's3', self.job,
+                          'delete')
+
+        self.run_queue()
+        self.assertEqual(self.started, ['blocker', 'delete', 'create'])
+
+    def test_tenants_served_in_turn(self):
+        self.queue.submit(scheduler.WorkQueue.NORMAL, 't1', 's1', self.block)
+        for i in range(3):
+            self.queue.submit(scheduler.WorkQueue.NORMAL, 't1', 's1%d' % i,
+                              self.job, 't1-%d' % i)
+        self.queue.submit(scheduler.WorkQueue.NORMAL, 't2', 's2', self.job,
+                          't2-0')
+        self.assertEqual(self.queue.stats('t2')['queued'], 1)
+
+        self.run_queue()
+        self.assertEqual(self.started,
+                         ['blocker', 't1-0', 't2-0', 't1-1', 't1-2'])
+
+    def test_cancel(self):
+        self.queue.submit(scheduler.WorkQueue.NORMAL, 't1', 's1', self.block)
+        self.queue.submit(scheduler.WorkQueue.NORMAL, 't1', 's1', self.job,
+                          'cancelled')
+        self.queue.submit(scheduler.WorkQueue.NORMAL, 't2', 's2', self.job,
+                          'other')
+        eventlet.sleep(0)
+
+        self.queue.cancel('s1')
+        self.run_queue()
+        self.assertEqual(self.started, ['blocker', 'other'])
+
+    def test_error(self):
+        def fail():
+            raise Exception('boom')
+
+        self.queue.submit(scheduler.WorkQueue.NORMAL, 't1', 's1', fail)
+        self.queue.submit(scheduler.WorkQueue.NORMAL, 't1', 's2', self.job,
+                          'second')
+        self.run_queue()
+        self.assertEqual(self.started, ['second'])
@@ -0,0 +1,126 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+import copy
+
+import unittest
+import mox
+
+from nose.plugins.attrib import attr
+
+from heat.common import context
+from heat.common import template_format
+from heat.engine import parser
+from heat.engine.resources import security_group
+from heat.tests.v1_1 import fakes
+
+
+class FakeSecurityGroup(object):
+    def __init__(self, id, rules=None):
+        self.id = id
+        self.rules = rules or []
+
+
+@attr(tag=['unit', 'resource'])
+@attr(speed='fast')
+class SecurityGroupTest(unittest.TestCase):
+    test_template = '''
+HeatTemplateFormatVersion: '2012-12-12'
+Resources:
+  the_sg:
+    Type: AWS::EC2::SecurityGroup
+    Properties:
+      GroupDescription: HTTP and SSH access
+      SecurityGroupIngress:
+        - IpProtocol: tcp
+          FromPort: "22"
+          ToPort: "22"
+          CidrIp: 0.0.0.0/0
+        - IpProtocol: tcp
+          FromPort: "80"
+          ToPort: "80"
+          CidrIp: 0.0.0.0/0
+'''
+
+    def setUp(self):
+        self.m = mox.Mox()
+        self.fc = fakes.FakeClient()
+        self.m.StubOutWithMock(security_group.SecurityGroup, 'nova')
+        self.m.StubOutWithMock(self.fc.security_groups, 'list')
+        self.m.StubOutWithMock(self.fc.security_groups, 'create')
+        self.m.StubOutWithMock(self.fc.security_groups, 'get')
+        self.m.StubOutWithMock(self.fc.security_group_rules, 'create')
+        self.m.StubOutWithMock(self.fc.security_group_rules, 'delete')
+
+    def tearDown(self):
+        self.m.UnsetStubs()
+        print "SecurityGroupTest teardown complete"
+
+    def parse_stack(self, t):
+        ctx = context.RequestContext.from_dict({
+            'tenant': 'test_tenant',
+            'username': 'test_username',
+            'password': 'password',
+            'auth_url': 'http://localhost:5000/v2.0'})
+        stack_name = 'test_stack'
+        tmpl = parser.Template(t)
+        params = parser.Parameters(stack_name, tmpl, {})
+        stack = parser.Stack(ctx, stack_name, tmpl, params)
+        stack.store()
+        return stack
+
+    def create_security_group(self):
+        security_group.SecurityGroup.nova().MultipleTimes().AndReturn(
+            self.fc)
+        self.fc.security_groups.list().AndReturn([])
+        self.fc.security_groups.create(
+            'test_stack.the_sg', 'HTTP and SSH access').AndReturn(
+                FakeSecurityGroup(id=1))
+        self.fc.security_group_rules.create(
+            1, 'tcp', '22', '22', '0.0.0.0/0').AndReturn(None)
+        self.fc.security_group_rules.create(
+            1, 'tcp', '80', '80', '0.0.0.0/0').AndReturn(None)
+
+    def test_security_group_update(self):
+        self.create_security_group()
+        sec = FakeSecurityGroup(id=1, rules=[
+            {'id': 130, 'ip_protocol': 'tcp', 'from_port': 22,
+             'to_port': 22, 'ip_range': {'cidr': '0.0.0.0/0'}},
+            {'id': 131, 'ip_protocol': 'tcp', 'from_port': 80,
+             'to_port': 80, 'ip_range': {'cidr': '0.0.0.0/0'}}])
+        self.fc.security_groups.get(1).AndReturn(sec)
+        self.fc.security_group_rules.delete(130).AndReturn(None)
+        self.fc.security_group_rules.create(
+            1, 'tcp', '443', '443', '0.0.0.0/0').AndReturn(None)
+        self.m.ReplayAll()
+
+        t = template_format.parse(self.test_template)
+        stack = self.parse_stack(t)
+        resource = stack['the_sg']
+        self.assertEqual(None, resource.create())
+
+        # replace the SSH rule with HTTPS, leaving the HTTP rule alone
+        update_snippet = copy.deepcopy(resource.parsed_template())
+        ingress = update_snippet['Properties']['SecurityGroupIngress']
+        ingress[0] = {'IpProtocol': 'tcp', 'FromPort': '443',
+                      'ToPort': '443', 'CidrIp': '0.0.0.0/0'}
+        self.assertEqual(security_group.SecurityGroup.UPDATE_COMPLETE,
+                         resource.handle_update(update_snippet))
+
+        update_snippet['Properties']['GroupDescription'] = 'Other'
+        self.assertEqual(security_group.SecurityGroup.UPDATE_REPLACE,
+                         resource.handle_update(update_snippet))
+
+        self.m.VerifyAll()
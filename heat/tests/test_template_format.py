@@ -93,6 +93,37 @@ Outputs: {}
         self.assertEqual(tpl1, tpl2)
 
 
+@attr(tag=['unit'])
+class YamlParseCacheTest(unittest.TestCase):
+
+    yaml_str = '''HeatTemplateFormatVersion: '2012-12-12'
+Resources:
+  Server:
+    Type: AWS::EC2::Instance
+    Properties:
+      ImageId: F17-x86_64-cfntools
+'''
+
+    def test_parse_returns_copy(self):
+        tpl1 = template_format.parse(self.yaml_str)
+        tpl1['Resources']['Server']['Properties']['ImageId'] = 'changed'
+
+        tpl2 = template_format.parse(self.yaml_str)
+        self.assertEqual(u'F17-x86_64-cfntools',
+                         tpl2['Resources']['Server']['Properties']['ImageId'])
+
+    def test_parse_unicode(self):
+        tpl = template_format.parse(self.yaml_str)
+        image = tpl['Resources']['Server']['Properties']['ImageId']
+        self.assertTrue(isinstance(image, unicode))
+
+    def test_parse_cache_bounded(self):
+        for i in range(template_format._PARSE_CACHE_SIZE + 10):
+            template_format.parse('Description: template %d' % i)
+        self.assertEqual(template_format._PARSE_CACHE_SIZE,
+                         len(template_format._parse_cache))
+
+
 @attr(tag=['unit'])
 class JsonYamlResolvedCompareTest(unittest.TestCase):
 
@@ -0,0 +1,132 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+import eventlet
+import unittest
+from nose.plugins.attrib import attr
+import mox
+
+from heat.common import context
+from heat.engine import parser
+from heat.engine import resource
+
+
+def generic(**properties):
+    snippet = {'Type': 'GenericResourceType'}
+    if properties:
+        snippet['Properties'] = properties
+    return snippet
+
+
+@attr(tag=['unit', 'update'])
+@attr(speed='fast')
+class UpdatePlanTest(unittest.TestCase):
+    def setUp(self):
+        self.m = mox.Mox()
+        self.ctx = context.get_admin_context()
+        self.m.StubOutWithMock(self.ctx, 'username')
+        self.ctx.username = 'update_plan_test_user'
+
+    def tearDown(self):
+        self.m.UnsetStubs()
+
+    def _stack(self, resources, name='update_plan_test'):
+        return parser.Stack(self.ctx, name,
+                            parser.Template({'Resources': resources}))
+
+    def _created_stack(self, resources):
+        stack = self._stack(resources)
+        stack.store()
+        stack.create()
+        self.assertEqual(stack.state, stack.CREATE_COMPLETE)
+        return stack
+
+    def test_report_unchanged(self):
+        resources = {'A': generic(), 'B': generic(Foo={'Ref': 'A'})}
+        plan = self._stack(resources).update_plan(self._stack(resources))
+        self.assertEqual(plan.report(), [])
+
+    def test_report_order(self):
+        old = self._stack({'A': generic(),
+                           'B': generic(Foo={'Ref': 'A'}),
+                           'C': generic(Foo='abc')})
+        new = self._stack({'B': generic(Foo={'Ref': 'D'}),
+                           'C': generic(Foo='abc'),
+                           'D': generic(),
+                           'E': generic(Foo={'Ref': 'C'})})
+        plan = old.update_plan(new)
+        self.assertEqual(plan.report(), [
+            [('CREATE', 'D'), ('CREATE', 'E')],
+            [('UPDATE', 'B')],
+            [('DELETE', 'A')]])
+
+    def test_report_delete_order(self):
+        old = self._stack({'A': generic(),
+                           'B': generic(Foo={'Ref': 'A'}),
+                           'C': generic()})
+        plan = old.update_plan(self._stack({'C': generic()}))
+        self.assertEqual(plan.report(), [[('DELETE', 'B')],
+                                         [('DELETE', 'A')]])
+
+    def test_execute(self):
+        stack = self._created_stack({'A': generic(),
+                                     'B': generic(Foo={'Ref': 'A'})})
+        new = self._stack({'B': generic(Foo='abc'), 'C': generic()})
+
+        self.m.StubOutWithMock(resource.GenericResource, 'handle_update')
+        resource.GenericResource.handle_update(
+            generic(Foo='abc')).AndReturn(resource.Resource.UPDATE_COMPLETE)
+        self.m.ReplayAll()
+
+        stack.update(new)
+        self.assertEqual(stack.state, stack.UPDATE_COMPLETE)
+        self.assertEqual(sorted(stack.keys()), ['B', 'C'])
+        self.assertEqual(stack['C'].state, stack['C'].CREATE_COMPLETE)
+        self.m.VerifyAll()
+
+    def test_execute_concurrent(self):
+        stack = self._created_stack({'A': generic()})
+        new = self._stack({'A': generic(), 'B': generic(), 'C': generic()})
+        events = []
+
+        def handle_create(res):
+            events.append(('start', res.name))
+            eventlet.sleep(0)
+            events.append(('end', res.name))
+
+        self.m.stubs.Set(resource.GenericResource, 'handle_create',
+                         handle_create)
+        stack.update(new)
+
+        self.assertEqual(stack.state, stack.UPDATE_COMPLETE)
+        self.assertEqual(events, [('start', 'B'), ('start', 'C'),
+                                  ('end', 'B'), ('end', 'C')])
+
+    def test_execute_failure(self):
+        stack = self._created_stack({'A': generic()})
+        new = self._stack({'A': generic(), 'B': generic(),
+                           'C': generic(Foo={'Ref': 'B'})})
+
+        def handle_create(res):
+            raise Exception('boom')
+
+        self.m.stubs.Set(resource.GenericResource, 'handle_create',
+                         handle_create)
+        stack.update(new)
+
+        self.assertEqual(stack.state, stack.UPDATE_FAILED)
+        self.assertEqual(stack.state_description,
+                         'Resource B create failed')
+        self.assertFalse('C' in stack)
@@ -13,24 +13,45 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import mimetools
 import mox
 from nose.plugins.attrib import attr
 import StringIO
 import unittest
+import urllib
 import urllib2
 
+from heat.common import config
 from heat.common import urlfetch
+from heat.openstack.common import cfg
+
+
+def response(url, data, headers=''):
+    return urllib.addinfourl(StringIO.StringIO(data),
+                             mimetools.Message(StringIO.StringIO(headers)),
+                             url)
+
+
+def request_for(url, headers={}):
+    def check(request):
+        return (request.get_full_url() == url and
+                all(request.get_header(k) == v for k, v in headers.items()))
+    return mox.Func(check)
 
 
 @attr(tag=['unit', 'urlfetch'])
 @attr(speed='fast')
 class UrlFetchTest(unittest.TestCase):
     def setUp(self):
+        # Registered by the API and engine services, which fetch templates
+        cfg.CONF.register_opts(config.urlfetch_opts)
         self.m = mox.Mox()
         self.m.StubOutWithMock(urllib2, 'urlopen')
+        urlfetch._cache.clear()
 
     def tearDown(self):
         self.m.UnsetStubs()
+        cfg.CONF.clear_override('max_template_size')
 
     def test_file_scheme(self):
         self.m.ReplayAll()
@@ -41,7 +62,8 @@ class UrlFetchTest(unittest.TestCase):
         url = 'http://example.com/template'
         data = '{ "foo": "bar" }'
 
-        urllib2.urlopen(url).AndReturn(StringIO.StringIO(data))
+        urllib2.urlopen(request_for(url), timeout=30).AndReturn(
+            response(url, data))
         self.m.ReplayAll()
 
         self.assertEqual(urlfetch.get(url), data)
@@ -51,7 +73,8 @@ class UrlFetchTest(unittest.TestCase):
         url = 'https://example.com/template'
         data = '{ "foo": "bar" }'
 
-        urllib2.urlopen(url).AndReturn(StringIO.StringIO(data))
+        urllib2.urlopen(request_for(url), timeout=30).AndReturn(
+            response(url, data))
         self.m.ReplayAll()
 
         self.assertEqual(urlfetch.get(url), data)
@@ -60,7 +83,8 @@ class UrlFetchTest(unittest.TestCase):
     def test_http_error(self):
         url = 'http://example.com/template'
 
-        urllib2.urlopen(url).AndRaise(urllib2.URLError('fubar'))
+        urllib2.urlopen(request_for(url), timeout=30).AndRaise(
+            urllib2.URLError('fubar'))
         self.m.ReplayAll()
 
         self.assertRaises(IOError, urlfetch.get, url)
@@ -70,3 +94,47 @@ class UrlFetchTest(unittest.TestCase):
         self.m.ReplayAll()
         self.assertRaises(IOError, urlfetch.get, 'wibble')
         self.m.VerifyAll()
+
+    def test_max_size(self):
+        url = 'http://example.com/template'
+        cfg.CONF.set_override('max_template_size', 5)
+
+        urllib2.urlopen(request_for(url), timeout=30).AndReturn(
+            response(url, '{ "foo": "bar" }'))
+        self.m.ReplayAll()
+
+        self.assertRaises(IOError, urlfetch.get, url)
+        self.m.VerifyAll()
+
+    def test_conditional_get(self):
+        url = 'http://example.com/template'
+        data = '{ "foo": "bar" }'
+        etag = '"1234"'
+
+        urllib2.urlopen(request_for(url), timeout=30).AndReturn(
+            response(url, data, 'ETag: %s\r\n' % etag))
+        urllib2.urlopen(request_for(url, {'If-none-match': etag}),
+                        timeout=30).AndRaise(
+                            urllib2.HTTPError(url, 304, 'Not Modified',
+                                              mimetools.Message(
+                                                  StringIO.StringIO('')),
+                                              None))
+        self.m.ReplayAll()
+
+        self.assertEqual(urlfetch.get(url), data)
+        self.assertEqual(urlfetch.get(url), data)
+        self.m.VerifyAll()
+
+    def test_cache_max_age(self):
+        url = 'http://example.com/template'
+        data = '{ "foo": "bar" }'
+
+        urllib2.urlopen(request_for(url), timeout=30).AndReturn(
+            response(url, data,
+                     'ETag: "1234"\r\nCache-Control: max-age=300\r\n'))
+        self.m.ReplayAll()
+
+        # The second fetch is served from the cache without a request
+        self.assertEqual(urlfetch.get(url), data)
+        self.assertEqual(urlfetch.get(url), data)
+        self.m.VerifyAll()
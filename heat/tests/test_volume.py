@@ -97,8 +97,6 @@ class VolumeTest(unittest.TestCase):
 
         # delete script
         self.fc.volumes.get('vol-123').AndReturn(fv)
-        eventlet.sleep(1).AndReturn(None)
-
         self.fc.volumes.get('vol-123').AndReturn(fv)
         self.fc.volumes.delete('vol-123').AndReturn(None)
 
@@ -129,8 +127,6 @@ class VolumeTest(unittest.TestCase):
             u'1', display_description='%s.DataVolume' % stack_name,
             display_name='%s.DataVolume' % stack_name).AndReturn(fv)
 
-        eventlet.sleep(1).AndReturn(None)
-
         self.m.ReplayAll()
 
         t = self.load_template()
@@ -157,7 +153,6 @@ class VolumeTest(unittest.TestCase):
         # create script
         vol.VolumeAttachment.nova().MultipleTimes().AndReturn(self.fc)
         vol.VolumeAttachment.nova('volume').MultipleTimes().AndReturn(self.fc)
-        eventlet.sleep(1).MultipleTimes().AndReturn(None)
         self.fc.volumes.create_server_volume(
             device=u'/dev/vdc',
             server_id=u'WikiDatabase',
@@ -82,8 +82,6 @@ class WaitConditionTest(unittest.TestCase):
         self.m = mox.Mox()
         self.m.StubOutWithMock(wc.WaitConditionHandle,
                                'get_status')
-        self.m.StubOutWithMock(wc.WaitCondition,
-                               '_create_timeout')
         self.m.StubOutWithMock(eventlet, 'sleep')
 
         cfg.CONF.set_default('heat_waitcondition_server_url',
@@ -123,7 +121,6 @@ class WaitConditionTest(unittest.TestCase):
     @stack_delete_after
     def test_post_success_to_handle(self):
         self.stack = self.create_stack()
-        wc.WaitCondition._create_timeout().AndReturn(eventlet.Timeout(5))
         wc.WaitConditionHandle.get_status().AndReturn([])
         eventlet.sleep(1).AndReturn(None)
         wc.WaitConditionHandle.get_status().AndReturn([])
@@ -146,7 +143,6 @@ class WaitConditionTest(unittest.TestCase):
     @stack_delete_after
     def test_post_failure_to_handle(self):
         self.stack = self.create_stack()
-        wc.WaitCondition._create_timeout().AndReturn(eventlet.Timeout(5))
         wc.WaitConditionHandle.get_status().AndReturn([])
         eventlet.sleep(1).AndReturn(None)
         wc.WaitConditionHandle.get_status().AndReturn([])
@@ -169,7 +165,6 @@ class WaitConditionTest(unittest.TestCase):
     @stack_delete_after
     def test_post_success_to_handle_count(self):
         self.stack = self.create_stack(template=test_template_wc_count)
-        wc.WaitCondition._create_timeout().AndReturn(eventlet.Timeout(5))
         wc.WaitConditionHandle.get_status().AndReturn([])
         eventlet.sleep(1).AndReturn(None)
         wc.WaitConditionHandle.get_status().AndReturn(['SUCCESS'])
@@ -195,7 +190,6 @@ class WaitConditionTest(unittest.TestCase):
     @stack_delete_after
     def test_post_failure_to_handle_count(self):
         self.stack = self.create_stack(template=test_template_wc_count)
-        wc.WaitCondition._create_timeout().AndReturn(eventlet.Timeout(5))
         wc.WaitConditionHandle.get_status().AndReturn([])
         eventlet.sleep(1).AndReturn(None)
         wc.WaitConditionHandle.get_status().AndReturn(['SUCCESS'])
@@ -218,21 +212,20 @@ class WaitConditionTest(unittest.TestCase):
     @stack_delete_after
     def test_timeout(self):
         self.stack = self.create_stack()
-        tmo = eventlet.Timeout(6)
-        wc.WaitCondition._create_timeout().AndReturn(tmo)
         wc.WaitConditionHandle.get_status().AndReturn([])
         eventlet.sleep(1).AndReturn(None)
         wc.WaitConditionHandle.get_status().AndReturn([])
-        eventlet.sleep(1).AndRaise(tmo)
 
         self.m.ReplayAll()
 
-        self.stack.create()
-
         resource = self.stack.resources['WaitForTheHandle']
+        resource.create_timeout = 0
+        self.stack.create()
 
         self.assertEqual(resource.state,
                          'CREATE_FAILED')
+        self.assertTrue(resource.state_description.startswith(
+            'Timed out waiting for'))
         self.assertEqual(wc.WaitCondition.UPDATE_REPLACE,
                          resource.handle_update({}))
         self.m.VerifyAll()
@@ -240,7 +233,6 @@ class WaitConditionTest(unittest.TestCase):
     @stack_delete_after
     def test_FnGetAtt(self):
         self.stack = self.create_stack()
-        wc.WaitCondition._create_timeout().AndReturn(eventlet.Timeout(5))
         wc.WaitConditionHandle.get_status().AndReturn(['SUCCESS'])
 
         self.m.ReplayAll()
@@ -406,8 +398,6 @@ class WaitConditionHandleTest(unittest.TestCase):
         # Stub waitcondition status so all goes CREATE_COMPLETE
         self.m.StubOutWithMock(wc.WaitConditionHandle, 'get_status')
         wc.WaitConditionHandle.get_status().AndReturn(['SUCCESS'])
-        self.m.StubOutWithMock(wc.WaitCondition, '_create_timeout')
-        wc.WaitCondition._create_timeout().AndReturn(eventlet.Timeout(5))
 
         # Stub keystone() with fake client
         self.m.StubOutWithMock(wc.WaitConditionHandle, 'keystone')
@@ -448,6 +438,19 @@ class WaitConditionHandleTest(unittest.TestCase):
         self.assertEqual(resource.UPDATE_REPLACE, resource.handle_update({}))
         self.m.VerifyAll()
 
+    @stack_delete_after
+    def test_handle_url_stored(self):
+        resource = self.stack.resources['WaitHandle']
+        url = resource.FnGetRefId()
+
+        # The stored URL is used without fetching the credentials again
+        self.m.StubOutWithMock(self.fc, 'get_ec2_keypair')
+        self.m.ReplayAll()
+
+        stack = parser.Stack.load(self.stack.context, stack_id=self.stack.id)
+        self.assertEqual(url, stack.resources['WaitHandle'].FnGetRefId())
+        self.m.VerifyAll()
+
     @stack_delete_after
     def test_metadata_update(self):
         resource = self.stack.resources['WaitHandle']
@@ -462,6 +465,40 @@ class WaitConditionHandleTest(unittest.TestCase):
         self.assertEqual(resource.metadata, handle_metadata)
         self.m.VerifyAll()
 
+    @stack_delete_after
+    def test_metadata_update_concurrent(self):
+        resource = self.stack.resources['WaitHandle']
+        self.assertEqual(resource.metadata, {})
+
+        # Another request signals the handle meanwhile
+        other = parser.Stack.load(self.stack.context, stack_id=self.stack.id)
+        other.resources['WaitHandle'].metadata_update(
+            {'Data': 'foo', 'Reason': 'bar',
+             'Status': 'SUCCESS', 'UniqueId': '1'})
+
+        resource.metadata_update({'Data': 'baz', 'Reason': 'qux',
+                                  'Status': 'SUCCESS', 'UniqueId': '2'})
+        self.assertEqual(sorted(resource.metadata.keys()), ['1', '2'])
+        self.m.VerifyAll()
+
+    @stack_delete_after
+    def test_signal_while_polling(self):
+        self.m.UnsetStubs()
+        self.m.StubOutWithMock(wc.WaitConditionHandle, 'keystone')
+        wc.WaitConditionHandle.keystone().MultipleTimes().AndReturn(self.fc)
+        self.m.ReplayAll()
+
+        handle = self.stack.resources['WaitHandle']
+        waiter = self.stack.resources['WaitForTheHandle']
+        self.assertFalse(waiter.check_create_complete(handle))
+
+        other = parser.Stack.load(self.stack.context, stack_id=self.stack.id)
+        other.resources['WaitHandle'].metadata_update(
+            {'Data': 'foo', 'Reason': 'bar',
+             'Status': 'SUCCESS', 'UniqueId': '1'})
+
+        self.assertTrue(waiter.check_create_complete(handle))
+
     @stack_delete_after
     def test_metadata_update_invalid(self):
         resource = self.stack.resources['WaitHandle']